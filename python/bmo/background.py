@@ -0,0 +1,467 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# background.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import threading
+import time
+import warnings
+
+import numpy as np
+
+import bmo
+from bmo.exceptions import BMOError, BMOMissingImportWarning
+
+try:
+    from astropy.stats import SigmaClip
+    from photutils.background import Background2D, MedianBackground
+except Exception:
+    warnings.warn('photutils is missing. The photutils background engine will not work.',
+                  BMOMissingImportWarning)
+    Background2D = None
+
+try:
+    from scipy.interpolate import RectBivariateSpline
+except ImportError:
+    RectBivariateSpline = None
+
+
+__all__ = ('BackgroundModel', 'BackgroundEngine', 'PhotutilsBackgroundEngine',
+           'BlockBackgroundEngine', 'get_background_engine', 'BackgroundCache')
+
+
+class BackgroundModel(object):
+    """A 2D background model.
+
+    Exposes the subset of the `photutils.background.Background2D` attributes
+    that BMO uses, regardless of the engine that produced the model.
+
+    Parameters:
+        background (`numpy.ndarray`):
+            The background model, with the same shape as the image.
+        mesh (`numpy.ndarray`):
+            The low-resolution background mesh from which ``background`` was
+            interpolated.
+        engine (`.BackgroundEngine`):
+            The engine that produced the model.
+        fitted_at (float or None):
+            The time at which the model was fitted from a single frame. If
+            ``None``, the current time.
+        n_updates (int):
+            The number of frames that have been used to update the model
+            since it was fitted.
+
+    """
+
+    def __init__(self, background, mesh, engine, fitted_at=None, n_updates=0):
+
+        self.background = background
+        self.mesh = mesh
+        self.engine = engine
+
+        self.fitted_at = fitted_at or time.time()
+        self.n_updates = n_updates
+
+    @property
+    def age(self):
+        """Seconds since the model was fitted."""
+
+        return time.time() - self.fitted_at
+
+    @property
+    def background_median(self):
+        """The median value of the background mesh."""
+
+        return np.median(self.mesh)
+
+    @property
+    def box_size(self):
+        return self.engine.box_size
+
+    @property
+    def filter_size(self):
+        return self.engine.filter_size
+
+    @property
+    def sigma(self):
+        return self.engine.sigma
+
+    @property
+    def iters(self):
+        return self.engine.iters
+
+
+class BackgroundEngine(object):
+    """Base class for the background engines.
+
+    Parameters:
+        box_size (tuple):
+            The size of the box, along the y and x axes, in which the
+            background is estimated.
+        filter_size (tuple):
+            The window size of the 2D median filter applied to the mesh.
+        sigma (float):
+            The sigma used for sigma clipping.
+        iters (int):
+            The number of iterations for sigma clipping.
+
+    """
+
+    name = None
+
+    def __init__(self, box_size=(50, 50), filter_size=(3, 3), sigma=3, iters=3):
+
+        self.box_size = tuple(box_size)
+        self.filter_size = tuple(filter_size)
+        self.sigma = sigma
+        self.iters = iters
+
+    def __repr__(self):
+
+        return '<{0} (box_size={1!r}, filter_size={2!r})>'.format(
+            self.__class__.__name__, self.box_size, self.filter_size)
+
+    def fit(self, data):
+        """Fits the background of ``data``. Returns a `.BackgroundModel`."""
+
+        raise NotImplementedError('fit must be overridden by subclasses.')
+
+
+class PhotutilsBackgroundEngine(BackgroundEngine):
+    """A background engine that uses `photutils.background.Background2D`."""
+
+    name = 'photutils'
+
+    def __init__(self, *args, **kwargs):
+
+        if Background2D is None:
+            raise BMOError('photutils has not been installed.')
+
+        super(PhotutilsBackgroundEngine, self).__init__(*args, **kwargs)
+
+        self.sigma_clip = SigmaClip(sigma=self.sigma, iters=self.iters)
+        self.bkg_estimator = MedianBackground()
+
+    def fit(self, data):
+
+        bkg = Background2D(data, self.box_size, filter_size=self.filter_size,
+                           sigma_clip=self.sigma_clip, bkg_estimator=self.bkg_estimator)
+
+        return BackgroundModel(bkg.background, bkg.background_mesh, self)
+
+
+class BlockBackgroundEngine(BackgroundEngine):
+    """A vectorised NumPy background engine.
+
+    The image is reshaped into blocks of ``box_size`` and the background of
+    each block is estimated in a single NumPy call. Pixels beyond the last
+    full block along each axis are not used to build the mesh, but the
+    background is extrapolated to them. The mesh is median-filtered and
+    then interpolated to the full image.
+
+    Parameters:
+        statistic (str):
+            How to estimate the background of each block. Either ``'median'``
+            or ``'sigma_clipped_mean'``.
+        interpolation (str):
+            How to upsample the mesh to the image size. Either ``'bilinear'``
+            or ``'spline'``. The latter requires scipy.
+        args, kwargs:
+            Arguments to pass to `.BackgroundEngine`.
+
+    """
+
+    name = 'block'
+
+    def __init__(self, *args, **kwargs):
+
+        self.statistic = kwargs.pop('statistic', 'median')
+        self.interpolation = kwargs.pop('interpolation', 'bilinear')
+
+        assert self.statistic in ['median', 'sigma_clipped_mean'], \
+            'invalid statistic {0!r}'.format(self.statistic)
+        assert self.interpolation in ['bilinear', 'spline'], \
+            'invalid interpolation {0!r}'.format(self.interpolation)
+
+        if self.interpolation == 'spline' and RectBivariateSpline is None:
+            raise BMOError('scipy is needed for spline interpolation.')
+
+        super(BlockBackgroundEngine, self).__init__(*args, **kwargs)
+
+    def get_mesh(self, data):
+        """Returns the low-resolution background mesh for ``data``."""
+
+        box_y, box_x = self.box_size
+        n_y, n_x = data.shape[0] // box_y, data.shape[1] // box_x
+
+        assert n_y > 0 and n_x > 0, 'the image is smaller than the box size.'
+
+        blocks = data[:n_y * box_y, :n_x * box_x].reshape(n_y, box_y, n_x, box_x)
+
+        if self.statistic == 'median':
+            return np.median(blocks, axis=(1, 3))
+
+        values = blocks.swapaxes(1, 2).reshape(n_y, n_x, box_y * box_x).astype(np.float64)
+
+        mask = np.ones(values.shape, dtype=bool)
+        for __ in range(self.iters):
+            n_values = mask.sum(axis=-1)
+            mean = np.where(mask, values, 0).sum(axis=-1) / n_values
+            residuals = values - mean[..., np.newaxis]
+            std = np.sqrt(np.where(mask, residuals**2, 0).sum(axis=-1) / n_values)
+            new_mask = np.abs(residuals) <= self.sigma * std[..., np.newaxis]
+            if np.array_equal(new_mask, mask):
+                break
+            mask = new_mask
+
+        return np.where(mask, values, 0).sum(axis=-1) / mask.sum(axis=-1)
+
+    def filter_mesh(self, mesh):
+        """Applies a median filter of size ``filter_size`` to the mesh."""
+
+        f_y, f_x = self.filter_size
+        if f_y <= 1 and f_x <= 1:
+            return mesh
+
+        padded = np.pad(mesh, ((f_y // 2, f_y // 2), (f_x // 2, f_x // 2)), mode='edge')
+        windows = [padded[ii:ii + mesh.shape[0], jj:jj + mesh.shape[1]]
+                   for ii in range(f_y) for jj in range(f_x)]
+
+        return np.median(windows, axis=0)
+
+    def _get_mesh_centres(self, n_boxes, box):
+        """Returns the pixel coordinates of the centres of the mesh boxes."""
+
+        return (np.arange(n_boxes) + 0.5) * box - 0.5
+
+    @staticmethod
+    def _get_interp_matrix(n_pixels, centres):
+        """Returns a matrix that linearly interpolates from ``centres`` to pixels.
+
+        Pixels outside the range of ``centres`` are extrapolated from the two
+        closest centres.
+
+        """
+
+        matrix = np.zeros((n_pixels, len(centres)))
+
+        if len(centres) == 1:
+            matrix[:, 0] = 1
+            return matrix
+
+        pixels = np.arange(n_pixels)
+        idx = np.clip(np.searchsorted(centres, pixels) - 1, 0, len(centres) - 2)
+        weight = (pixels - centres[idx]) / (centres[idx + 1] - centres[idx])
+
+        matrix[pixels, idx] = 1 - weight
+        matrix[pixels, idx + 1] = weight
+
+        return matrix
+
+    def upsample(self, mesh, shape):
+        """Interpolates ``mesh`` to an image of ``shape``."""
+
+        centres_y = self._get_mesh_centres(mesh.shape[0], self.box_size[0])
+        centres_x = self._get_mesh_centres(mesh.shape[1], self.box_size[1])
+
+        if self.interpolation == 'spline' and min(mesh.shape) > 3:
+            # Cubic splines diverge quickly outside the mesh so, beyond the
+            # outer box centres, the background is kept constant.
+            spline = RectBivariateSpline(centres_y, centres_x, mesh)
+            pixels_y = np.clip(np.arange(shape[0]), centres_y[0], centres_y[-1])
+            pixels_x = np.clip(np.arange(shape[1]), centres_x[0], centres_x[-1])
+            return spline(pixels_y, pixels_x)
+
+        # Bilinear interpolation on a regular grid is separable so it can be
+        # written as two matrix products.
+        matrix_y = self._get_interp_matrix(shape[0], centres_y)
+        matrix_x = self._get_interp_matrix(shape[1], centres_x)
+
+        return matrix_y.dot(mesh).dot(matrix_x.T)
+
+    def fit(self, data):
+
+        mesh = self.filter_mesh(self.get_mesh(data))
+
+        return BackgroundModel(self.upsample(mesh, data.shape), mesh, self)
+
+
+ENGINES = {PhotutilsBackgroundEngine.name: PhotutilsBackgroundEngine,
+           BlockBackgroundEngine.name: BlockBackgroundEngine}
+
+
+def get_background_engine(name=None, config=None):
+    """Returns a background engine.
+
+    Parameters:
+        name (str or None):
+            The name of the engine. If ``None``, the engine in the
+            configuration is used.
+        config (dict or None):
+            The ``image.background`` section of the configuration. If
+            ``None``, uses the BMO configuration.
+
+    """
+
+    config = config or bmo.config['image']['background']
+    name = name or config.get('engine', PhotutilsBackgroundEngine.name)
+
+    if name not in ENGINES:
+        raise BMOError('invalid background engine {0!r}'.format(name))
+
+    kwargs = dict(box_size=config.get('box_size', (50, 50)),
+                  filter_size=config.get('filter_size', (3, 3)),
+                  sigma=config['sigma_clip']['sigma'],
+                  iters=config['sigma_clip']['iters'])
+
+    if name == BlockBackgroundEngine.name:
+        kwargs['statistic'] = config.get('statistic', 'median')
+        kwargs['interpolation'] = config.get('interpolation', 'bilinear')
+
+    return ENGINES[name](**kwargs)
+
+
+class BackgroundCache(object):
+    """A cache of background models per camera and exposure time.
+
+    The first frame for a camera and exposure time is fitted with the
+    configured engine. Following frames update the cached model using a
+    `.BlockBackgroundEngine` on an image decimated by ``decimate``, which is
+    much faster than a full fit. Depending on ``mode``, the update is:
+
+    - ``'ema'``: each frame updates the model as an exponential moving
+      average, ``(1 - alpha) * model + alpha * new``.
+    - ``'refit'``: the model is replaced every ``refit_every`` frames.
+
+    Models older than ``max_age`` seconds are evicted and fitted again with
+    the full engine. Models for a camera can also be evicted explicitly, for
+    example when the exposure time changes.
+
+    Parameters:
+        engine (`.BackgroundEngine` or None):
+            The engine used for full fits. If ``None``, uses the engine
+            defined in the configuration.
+        mode (str):
+            Either ``'ema'`` or ``'refit'``.
+        alpha (float):
+            The weight of the new frame in ``'ema'`` mode.
+        refit_every (int):
+            The number of frames between updates in ``'refit'`` mode.
+        decimate (int):
+            The decimation factor applied to the image for updates.
+        max_age (float):
+            The maximum age of a model, in seconds.
+        max_entries (int):
+            The maximum number of models to keep. When exceeded, the oldest
+            model is evicted.
+
+    """
+
+    def __init__(self, engine=None, mode='ema', alpha=0.2, refit_every=10, decimate=2,
+                 max_age=600, max_entries=8):
+
+        assert mode in ['ema', 'refit'], 'invalid mode {0!r}'.format(mode)
+        assert 0 < alpha <= 1, 'alpha must be in the range (0, 1].'
+
+        self.engine = engine or get_background_engine()
+
+        self.mode = mode
+        self.alpha = alpha
+        self.refit_every = refit_every
+        self.decimate = decimate
+        self.max_age = max_age
+        self.max_entries = max_entries
+
+        box_y, box_x = self.engine.box_size
+        self.update_engine = BlockBackgroundEngine(
+            box_size=(max(box_y // decimate, 1), max(box_x // decimate, 1)),
+            filter_size=self.engine.filter_size,
+            sigma=self.engine.sigma, iters=self.engine.iters,
+            statistic=getattr(self.engine, 'statistic', 'median'))
+
+        # Used to upsample the decimated mesh back to the full image.
+        self.upsample_engine = BlockBackgroundEngine(
+            box_size=(self.update_engine.box_size[0] * decimate,
+                      self.update_engine.box_size[1] * decimate),
+            interpolation=getattr(self.engine, 'interpolation', 'bilinear'))
+
+        self.models = {}
+        self._frames = {}
+
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Creates a cache using the ``image.background`` section of the configuration."""
+
+        config = config or bmo.config['image']['background']
+        cache_config = config.get('cache', {})
+
+        return cls(engine=get_background_engine(config=config), **cache_config)
+
+    def _fit_decimated(self, data):
+        """Returns a background fitted on the decimated image."""
+
+        decimated = data[::self.decimate, ::self.decimate]
+        mesh = self.update_engine.filter_mesh(self.update_engine.get_mesh(decimated))
+
+        return self.upsample_engine.upsample(mesh, data.shape), mesh
+
+    def get(self, camera_type, exposure_time, data):
+        """Returns the background model for ``data``, updating the cache.
+
+        This method can be called from multiple threads at the same time.
+
+        """
+
+        key = (camera_type, np.round(exposure_time, 3))
+
+        with self._lock:
+            model = self.models.get(key, None)
+            if model is not None and self.max_age and model.age > self.max_age:
+                self.models.pop(key)
+                model = None
+            n_frames = self._frames[key] = self._frames.get(key, 0) + 1
+
+        if model is None:
+            model = self.engine.fit(data)
+        elif self.mode == 'ema':
+            background, mesh = self._fit_decimated(data)
+            if mesh.shape == model.mesh.shape:
+                mesh = (1 - self.alpha) * model.mesh + self.alpha * mesh
+            model = BackgroundModel((1 - self.alpha) * model.background + self.alpha * background,
+                                    mesh, model.engine, fitted_at=model.fitted_at,
+                                    n_updates=model.n_updates + 1)
+        elif n_frames % self.refit_every == 0:
+            background, mesh = self._fit_decimated(data)
+            model = BackgroundModel(background, mesh, model.engine,
+                                    fitted_at=model.fitted_at, n_updates=model.n_updates + 1)
+        else:
+            return model
+
+        with self._lock:
+            self.models[key] = model
+            while len(self.models) > self.max_entries:
+                oldest = min(self.models, key=lambda kk: self.models[kk].fitted_at)
+                self.evict(*oldest)
+
+        return model
+
+    def evict(self, camera_type=None, exposure_time=None):
+        """Evicts models for a camera and/or exposure time. By default, evicts all."""
+
+        with self._lock:
+            for key in list(self.models):
+                if camera_type is not None and key[0] != camera_type:
+                    continue
+                if exposure_time is not None and key[1] != np.round(exposure_time, 3):
+                    continue
+                self.models.pop(key, None)
+                self._frames.pop(key, None)
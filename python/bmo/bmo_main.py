@@ -14,20 +14,24 @@ import json
 import sys
 import traceback
 
-from click.testing import CliRunner
+import click
 
 from RO.StringUtil import strFromException
 from twistedActor import BaseActor, CommandError, UserCmd
 
 from bmo import __version__
-from bmo.cmds.cmd_parser import bmo_parser
+from bmo.background import BackgroundCache
+from bmo.charts import ChartCache
+from bmo.cmds.camera import ExposureSequence
+from bmo.cmds.cmd_parser import bmo_parser, dispatcher
 from bmo.devices.tcc_device import TCCDevice
 from bmo.devices.manta import MantaCameraSet
 from bmo.logger import log
-
-
-LCOTCC_HOST = '10.1.1.20'
-LCOTCC_PORT = 25000
+from bmo.pipeline import ImagePipeline
+from bmo.plates import PlateCache
+from bmo.profiler import ReactorProfiler
+from bmo.timing import StageTimings
+from bmo.writer import FITSWriter
 
 
 class BMOActor(BaseActor):
@@ -49,11 +53,24 @@ class BMOActor(BaseActor):
 
         self.controller = controller
 
-        log.info('connecting to TCC host={!r}, port={}.'.format(LCOTCC_HOST, LCOTCC_PORT))
-        self.tccActor = TCCDevice('tcc', LCOTCC_HOST, LCOTCC_PORT)
+        self.pipeline = ImagePipeline.from_config(config)
+        self.writer = FITSWriter.from_config(config)
+        self.background_cache = BackgroundCache.from_config(config['image']['background'])
+        self.frame_timings = StageTimings.from_config(config)
+        self.profiler = ReactorProfiler.from_config(config, log.log_filename.parent)
+        self.plate_cache = PlateCache()
+        self.chart_cache = ChartCache.from_config(config)
+
+        self.exposure_sequence = ExposureSequence(config['cameras']['save_path'])
+        self.exposure_sequence.seed()
+
+        tcc_host, tcc_port = config['tcc']['host'], config['tcc']['port']
+        log.info('connecting to TCC host={!r}, port={}.'.format(tcc_host, tcc_port))
+        self.tccActor = TCCDevice('tcc', tcc_host, tcc_port)
         self.tccActor.dev_state.plateid_callback = self._plateid_change
         self.tccActor.writeToUsers = self.writeToUsers
         self.tccActor.connect()
+        self.tccActor.connection_manager.start()
 
         log.info('starting BMO actor version={!r} in port={}'
                  .format(__version__, kwargs['userPort']))
@@ -70,31 +87,28 @@ class BMOActor(BaseActor):
             cmd_ds9 = UserCmd(cmdStr='ds9 connect')
             self.parseAndDispatchCmd(cmd_ds9)
 
+        if config['snapshot']['export_on_startup']:
+            log.debug('exporting the plate snapshot.')
+            cmd_snapshot = UserCmd(cmdStr='snapshot export')
+            self.parseAndDispatchCmd(cmd_snapshot)
+
+        # Keeps the DSS charts of the plugged plates in memory.
+        self.chart_cache.start()
+
+    def _write_text(self, cmd, text):
+        """Outputs a multi-line text to the users, one ``text`` keyword per line."""
+
+        for line in text.splitlines():
+            line = json.dumps(line).replace(';', '')
+            cmd.writeToUsers('w', 'text={0}'.format(line))
+
     def parseAndDispatchCmd(self, cmd):
-        """Dispatch the user command."""
-
-        def test_cmd(args):
-
-            result = CliRunner().invoke(bmo_parser, args)
-            if result.exit_code > 0:
-                # If code > 0, there was an error. We fail the command and inform the users.
-                textMsg = result.output
-                for line in textMsg.splitlines():
-                    line = json.dumps(line).replace(';', '')
-                    cmd.writeToUsers('w', 'text={0}'.format(line))
-                cmd.setState(cmd.Failed)
-                return False
-            else:
-                if '--help' in args:
-                    # If help was in the args, we just want to print the usage to the users.
-                    textMsg = result.output
-                    for line in textMsg.splitlines():
-                        line = json.dumps(line).replace(';', '')
-                        cmd.writeToUsers('w', 'text={0}'.format(line))
-                    cmd.setState(cmd.Done)
-                    return False
-
-                return True
+        """Dispatch the user command.
+
+        The command is parsed once by the `.CommandDispatcher`. Usage errors
+        are output to the users and fail the command.
+
+        """
 
         if not cmd.cmdBody:
             # echo to show alive
@@ -103,11 +117,24 @@ class BMOActor(BaseActor):
 
         cmd.setState(cmd.Running)
 
+        args = cmd.cmdBody.split()
+
         try:
-            result = test_cmd(cmd.cmdBody.split())
-            if result is False:
+            if '--help' in args:
+                # If help was in the args, we just want to print the usage to the users.
+                self._write_text(cmd, dispatcher.get_help(args))
+                cmd.setState(cmd.Done)
                 return
-            bmo_parser(cmd.cmdBody.split(), obj=dict(actor=self, cmd=cmd))
+            ctx = dispatcher.make_context(args, obj=dict(actor=self, cmd=cmd))
+        except click.UsageError as ee:
+            if ee.ctx is not None:
+                self._write_text(cmd, ee.ctx.get_usage())
+            self._write_text(cmd, 'Error: {0}'.format(ee.format_message()))
+            cmd.setState(cmd.Failed)
+            return
+
+        try:
+            dispatcher.invoke(ctx)
         except CommandError as ee:
             cmd.setState('failed', textMsg=strFromException(ee))
             return
@@ -118,7 +145,7 @@ class BMOActor(BaseActor):
             hubMsg = 'Exception={0}'.format(ee.__class__.__name__)
             cmd.setState("failed", textMsg=textMsg, hubMsg=hubMsg)
         except BaseException:
-            # This catches the SystemExit that Click insists in returning.
+            # This catches a SystemExit raised by a command.
             pass
 
     def _plateid_change(self, plate_id):
@@ -129,5 +156,8 @@ class BMOActor(BaseActor):
 
         log.info('detected new plate {}. Showing charts.'.format(plate_id), self)
 
+        # Loads the plate metadata so that the exposure loop does not query the DB.
+        self.plate_cache.refresh(plate_id)
+
         cmd_chart = UserCmd(cmdStr='ds9 show_chart {0}'.format(plate_id))
         self.parseAndDispatchCmd(cmd_chart)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# centroid.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import warnings
+
+import numpy as np
+
+from bmo import config
+from bmo.exceptions import BMOError, BMOMissingImportWarning
+
+try:
+    import PyGuide
+except ImportError:
+    PyGuide = None
+
+
+__all__ = ('Centroid', 'CentroidBackend', 'PyGuideBackend', 'NumpyBackend',
+           'get_centroid_backend')
+
+
+FOCAL_SCALE = config['telescope']['focal_scale']
+PIXEL_SIZE = config['cameras']['pixel_scale']
+
+GAUSSIAN_SIGMA_TO_FWHM = 2. * np.sqrt(2. * np.log(2.))
+
+
+class Centroid(object):
+    """A star centroid.
+
+    Provides the same attributes as ``PyGuide.Centroid.CentroidData`` that
+    BMO uses. Positions follow the PyGuide convention, in which the centre of
+    the lower-left pixel is ``(0.5, 0.5)``.
+
+    Parameters:
+        xyCtr (tuple):
+            The ``(x, y)`` position of the centroid, in pixels.
+        rad (int):
+            The radius of the star, in pixels.
+        counts (float):
+            The total counts of the star above the background.
+        pix (int):
+            The number of pixels in the star.
+
+    """
+
+    def __init__(self, xyCtr, rad, counts=None, pix=None):
+
+        self.xyCtr = xyCtr
+        self.rad = rad
+        self.counts = counts
+        self.pix = pix
+
+    def __repr__(self):
+
+        return '<Centroid (xyCtr=({0:.2f}, {1:.2f}), rad={2})>'.format(self.xyCtr[0],
+                                                                        self.xyCtr[1],
+                                                                        self.rad)
+
+
+class CentroidBackend(object):
+    """Base class for the centroid backends."""
+
+    name = None
+
+    def find(self, image, return_fwhm=False):
+        """Returns the brightest centroid in ``image``.
+
+        If ``return_fwhm=True``, returns a tuple with the centroid and the
+        FWHM of the star, in arcsec. Raises an `AssertionError` if no
+        centroid can be found.
+
+        """
+
+        raise NotImplementedError('find must be overridden by subclasses.')
+
+
+class PyGuideBackend(CentroidBackend):
+    """A centroid backend that uses ``PyGuide.findStars``."""
+
+    name = 'pyguide'
+
+    def __init__(self):
+
+        if PyGuide is None:
+            raise BMOError('PyGuide cannot be imported.')
+
+    def find(self, image, return_fwhm=False):
+
+        mask = np.zeros(image.shape, dtype=bool)
+
+        # Masking to the right part of the image until we understand the origin of
+        # the weird illumination pattern.
+        # mask[:, 1900:] = 1
+
+        ccdInfo = PyGuide.CCDInfo(np.median(image), 5, 5)
+        stars = PyGuide.findStars(image, mask, None, ccdInfo)
+
+        centroids = stars[0]
+        assert len(centroids) > 0, 'no centroids found.'
+
+        if not return_fwhm:
+            return centroids[0]
+
+        shape = PyGuide.StarShape.starShape(image.astype(np.float32), mask,
+                                            stars[0][0].xyCtr, 100)
+
+        if shape.fwhm:
+            fwhm = float(shape.fwhm) * PIXEL_SIZE * FOCAL_SCALE
+        else:
+            fwhm = -999.
+
+        return (centroids[0], fwhm)
+
+
+class NumpyBackend(CentroidBackend):
+    """A vectorised NumPy centroid backend.
+
+    Pixels more than ``threshold`` times the noise above the background are
+    grouped in 8-connected components. The brightest component with at least
+    ``min_pixels`` pixels is selected and its centroid is calculated as the
+    flux-weighted first moment of its pixels. The FWHM is derived from the
+    second moments, assuming a Gaussian profile.
+
+    Parameters:
+        threshold (float):
+            The detection threshold, in units of the image noise.
+        min_pixels (int):
+            The minimum number of pixels for a component to be considered a
+            star.
+
+    """
+
+    name = 'numpy'
+
+    def __init__(self, threshold=5., min_pixels=5):
+
+        self.threshold = threshold
+        self.min_pixels = min_pixels
+
+    @staticmethod
+    def get_background(image, step=4):
+        """Returns the median and robust standard deviation of the image.
+
+        The image is subsampled by ``step`` along each axis for speed.
+
+        """
+
+        sample = image[::step, ::step]
+
+        median = np.median(sample)
+        noise = 1.4826 * np.median(np.abs(sample - median))
+
+        return median, noise
+
+    @staticmethod
+    def get_runs(mask):
+        """Returns the row, start, and end column of each run of ``True`` in ``mask``."""
+
+        padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = mask
+
+        diff = np.diff(padded, axis=1)
+
+        rows, starts = np.nonzero(diff == 1)
+        __, ends = np.nonzero(diff == -1)
+
+        return rows, starts, ends
+
+    @staticmethod
+    def label_runs(rows, starts, ends):
+        """Groups runs into 8-connected components.
+
+        Returns an array with the component label of each run.
+
+        """
+
+        parents = np.arange(len(rows))
+
+        def find(ii):
+            while parents[ii] != ii:
+                parents[ii] = parents[parents[ii]]
+                ii = parents[ii]
+            return ii
+
+        row_bounds = np.searchsorted(rows, np.arange(rows.max() + 2)) if len(rows) else []
+
+        for row in np.unique(rows):
+
+            this = slice(row_bounds[row], row_bounds[row + 1])
+            below = slice(row_bounds[row + 1], row_bounds[row + 2]) if row + 2 < len(row_bounds) \
+                else slice(0, 0)
+
+            if below.stop <= below.start:
+                continue
+
+            # Two runs in consecutive rows touch (including diagonally) if
+            # each one starts before the other one ends.
+            overlap = ((starts[this][:, np.newaxis] <= ends[below][np.newaxis, :]) &
+                       (starts[below][np.newaxis, :] <= ends[this][:, np.newaxis]))
+
+            for ii, jj in zip(*np.nonzero(overlap)):
+                root_ii, root_jj = find(this.start + ii), find(below.start + jj)
+                if root_ii != root_jj:
+                    parents[max(root_ii, root_jj)] = min(root_ii, root_jj)
+
+        return np.array([find(ii) for ii in range(len(rows))], dtype=int)
+
+    def find(self, image, return_fwhm=False):
+
+        background, noise = self.get_background(image)
+
+        rows, starts, ends = self.get_runs(image > background + self.threshold * max(noise, 1e-6))
+        assert len(rows) > 0, 'no centroids found.'
+
+        labels = self.label_runs(rows, starts, ends)
+
+        # Expands the runs into the list of pixels and their component labels.
+        lengths = ends - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        pix_x = offsets + np.arange(lengths.sum())
+        pix_y = np.repeat(rows, lengths)
+        pix_labels = np.repeat(labels, lengths)
+
+        values = image[pix_y, pix_x].astype(np.float64) - background
+
+        n_pix = np.bincount(pix_labels)
+        flux = np.bincount(pix_labels, weights=values)
+        flux[n_pix < self.min_pixels] = 0
+
+        assert flux.max() > 0, 'no centroids found.'
+        brightest = np.argmax(flux)
+
+        selected = pix_labels == brightest
+        weights = values[selected] / flux[brightest]
+
+        x_ctr = np.sum(weights * pix_x[selected])
+        y_ctr = np.sum(weights * pix_y[selected])
+
+        centroid = Centroid((x_ctr + 0.5, y_ctr + 0.5),
+                            int(np.ceil(np.sqrt(n_pix[brightest] / np.pi))),
+                            counts=flux[brightest], pix=n_pix[brightest])
+
+        if not return_fwhm:
+            return centroid
+
+        variance = 0.5 * (np.sum(weights * (pix_x[selected] - x_ctr)**2) +
+                          np.sum(weights * (pix_y[selected] - y_ctr)**2))
+
+        if variance > 0:
+            fwhm = GAUSSIAN_SIGMA_TO_FWHM * np.sqrt(variance) * PIXEL_SIZE * FOCAL_SCALE
+        else:
+            fwhm = -999.
+
+        return (centroid, float(fwhm))
+
+
+BACKENDS = {PyGuideBackend.name: PyGuideBackend,
+            NumpyBackend.name: NumpyBackend}
+
+
+def get_centroid_backend(name=None, centroid_config=None):
+    """Returns a centroid backend.
+
+    Parameters:
+        name (str or None):
+            The name of the backend. If ``None``, the backend in the
+            configuration is used. If the backend is ``'pyguide'`` but PyGuide
+            cannot be imported, falls back to the NumPy backend.
+        centroid_config (dict or None):
+            The ``centroid`` section of the configuration. If ``None``, uses
+            the BMO configuration.
+
+    """
+
+    centroid_config = centroid_config or config['centroid']
+    name = name or centroid_config.get('backend', PyGuideBackend.name)
+
+    if name not in BACKENDS:
+        raise BMOError('invalid centroid backend {0!r}'.format(name))
+
+    if name == PyGuideBackend.name and PyGuide is None:
+        warnings.warn('PyGuide cannot be imported. Using the NumPy centroid backend.',
+                      BMOMissingImportWarning)
+        name = NumpyBackend.name
+
+    if name == NumpyBackend.name:
+        return NumpyBackend(**centroid_config.get('numpy', {}))
+
+    return BACKENDS[name]()
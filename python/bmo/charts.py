@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# charts.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import collections
+
+from astropy.io import fits
+from twisted.internet import defer, task, threads
+
+from bmo.db import run_query
+from bmo.exceptions import BMOError
+from bmo.logger import log
+from bmo.utils import get_acquisition_dss_path, get_plugged_plates
+
+
+__all__ = ('ChartCache', 'load_charts')
+
+
+CAMERAS = ('center', 'offaxis')
+
+# These parameters can be overridden by the actor configuration.
+MAX_PLATES = 16             # Maximum number of plates whose charts are kept in memory.
+PREFETCH_INTERVAL = 600     # Seconds between prefetches of the plugged plates.
+
+
+def load_charts(plate_id):
+    """Reads and decodes the DSS finding charts of a plate.
+
+    Returns a dictionary of `~astropy.io.fits.HDUList`, keyed by camera, with
+    the data loaded in memory. Raises `.BMOError` if a chart is missing.
+    This function blocks and should be run in a thread.
+
+    """
+
+    charts = {}
+
+    for camera in CAMERAS:
+
+        dss_path = get_acquisition_dss_path(plate_id, camera=camera)
+        if not dss_path.exists():
+            raise BMOError('{0} does not exist.'.format(dss_path))
+
+        hdulist = fits.open(str(dss_path), memmap=False)
+        for hdu in hdulist:
+            hdu.data  # Forces the data to be read before the file is closed.
+        hdulist.close()
+
+        charts[camera] = hdulist
+
+    return charts
+
+
+class ChartCache(object):
+    """Keeps the DSS finding charts of the plugged plates in memory.
+
+    The charts are read in a thread, so that the reactor is not blocked by a
+    slow platelist mount, and kept until ``max_plates`` plates are cached,
+    at which point the least recently used plate is dropped. `.start`
+    prefetches the charts of the plates in the active pluggings every
+    ``prefetch_interval`` seconds, so that they are in memory when the plate
+    changes.
+
+    Parameters:
+        max_plates (int):
+            The maximum number of plates kept in memory.
+        prefetch_interval (float):
+            The number of seconds between prefetches of the plugged plates.
+
+    """
+
+    def __init__(self, max_plates=MAX_PLATES, prefetch_interval=PREFETCH_INTERVAL):
+
+        self.max_plates = max_plates
+        self.prefetch_interval = prefetch_interval
+
+        self.charts = collections.OrderedDict()
+        self.loading = {}
+
+        self._prefetch_loop = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates a cache using the ``charts`` section of the configuration."""
+
+        charts_config = config.get('charts', {})
+
+        return cls(max_plates=charts_config.get('max_plates', MAX_PLATES),
+                   prefetch_interval=charts_config.get('prefetch_interval', PREFETCH_INTERVAL))
+
+    def get(self, plate_id):
+        """Returns the charts of ``plate_id``, keyed by camera, or ``None``."""
+
+        if plate_id not in self.charts:
+            return None
+
+        # Marks the plate as recently used.
+        charts = self.charts.pop(plate_id)
+        self.charts[plate_id] = charts
+
+        return charts
+
+    def load(self, plate_id):
+        """Loads the charts of ``plate_id`` in a thread.
+
+        Returns a deferred that fires with the charts. If the charts are
+        already cached or being loaded, does not load them again. Must be
+        called from the reactor thread.
+
+        """
+
+        if plate_id in self.charts:
+            return defer.succeed(self.get(plate_id))
+
+        if plate_id in self.loading:
+            loaded = defer.Deferred()
+            self.loading[plate_id].append(loaded)
+            return loaded
+
+        self.loading[plate_id] = []
+
+        def _loaded(charts):
+
+            self.charts[plate_id] = charts
+            while len(self.charts) > self.max_plates:
+                self.charts.popitem(last=False)
+
+            log.debug('loaded DSS charts for plate {0}.'.format(plate_id))
+
+            for waiting in self.loading.pop(plate_id):
+                waiting.callback(charts)
+
+            return charts
+
+        def _failed(failure):
+
+            for waiting in self.loading.pop(plate_id):
+                waiting.errback(failure)
+
+            return failure
+
+        return threads.deferToThread(load_charts, plate_id).addCallbacks(_loaded, _failed)
+
+    def prefetch(self, plate_ids):
+        """Loads the charts of ``plate_ids``. Failures are logged."""
+
+        def _failed(failure, plate_id):
+            log.warning('failed to prefetch DSS charts for plate {0}: '
+                        '{1}'.format(plate_id, failure.getErrorMessage()))
+
+        prefetched = []
+
+        for plate_id in plate_ids[:self.max_plates]:
+            loaded = self.load(plate_id)
+            loaded.addErrback(_failed, plate_id)
+            prefetched.append(loaded)
+
+        return defer.DeferredList(prefetched)
+
+    def prefetch_plugged(self):
+        """Loads the charts of the plates in the active pluggings."""
+
+        def _failed(failure):
+            log.warning('failed to get the plugged plates: {0}'.format(failure.getErrorMessage()))
+
+        return run_query(get_plugged_plates).addCallbacks(self.prefetch, _failed)
+
+    def start(self):
+        """Prefetches the plugged plates now and every ``prefetch_interval`` seconds."""
+
+        if self._prefetch_loop is not None and self._prefetch_loop.running:
+            return
+
+        self._prefetch_loop = task.LoopingCall(self.prefetch_plugged)
+        self._prefetch_loop.start(self.prefetch_interval, now=True)
+
+    def stop(self):
+        """Stops the periodic prefetch."""
+
+        if self._prefetch_loop is not None and self._prefetch_loop.running:
+            self._prefetch_loop.stop()
@@ -10,64 +10,185 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import absolute_import
 
+import functools
 import glob
 import os
+import re
+import threading
 
 import astropy.io.fits
 import click
 
-from twisted.internet import reactor
+from twisted.internet import defer, reactor
 
 from bmo.cmds import bmo_context
 from bmo.logger import log
-
-from bmo.utils import show_in_ds9, get_sjd, get_camera_coordinates
+from bmo.timing import FrameTimer, monotonic
+from bmo.utils import get_centroid, get_sjd
 
 __all__ = ['camera']
 
 
-def display_image(image, camera_type, actor, cmd):
-    """Displays image in DS9 and gets centroids."""
+def display_image(actor, image, camera_type, centroid=None, timer=None):
+    """Displays image in DS9 with the centroid.
+
+    The image is sent to DS9 through the actor `~bmo.display.DS9Proxy`, so
+    this function does not block. Only the newest image for each DS9 frame is
+    kept if DS9 is slow. Returns a deferred that fires when the image has
+    been displayed, or ``None`` if DS9 is not connected.
+
+    """
 
     frame = 1 if camera_type == 'on' else 3
 
-    try:
-        centroid = show_in_ds9(image, frame=frame, ds9=actor.ds9)
-    except Exception as ee:
-        log.warning('failed to show image in DS9: {0}'.format(ee), actor)
-        return False
+    def _failed(failure):
+        log.warning('failed to show image in DS9: {0}'.format(failure.getErrorMessage()), actor)
+
+    if actor.ds9 is None:
+        log.warning('failed to show image in DS9: no DS9 connection available. '
+                    'Have you run bmo ds9 connect?', actor)
+        return
+
+    displayed = actor.ds9.display(image, centroid=centroid, frame=frame, timer=timer)
+
+    return displayed.addErrback(_failed)
+
+
+class ExposureSequence(object):
+    """Keeps track of the exposure sequence number for each SJD.
+
+    The last ``bimg-NNNN`` number is read from disk only once, when the
+    sequence is seeded at startup or when the SJD rolls over. After that, the
+    next number is kept in memory and persisted atomically to a
+    ``.bimg_sequence`` file in the SJD directory. Paths for both cameras can
+    be requested at the same time from different threads.
+
+    Parameters:
+        save_path (str):
+            The root directory in which the SJD directories are created.
+
+    """
+
+    state_file = '.bimg_sequence'
+
+    def __init__(self, save_path):
+
+        self.save_path = save_path
+
+        self.sjd = None
+        self.last_no = None
+
+        self._lock = threading.Lock()
+
+    def _seed(self, dirname):
+        """Returns the last sequence number in ``dirname``."""
+
+        numbers = [0]
+
+        for path in glob.glob(os.path.join(dirname, 'bimg-*.fits*')):
+            match = re.match(r'bimg-([0-9]+)\.fits', os.path.basename(path))
+            if match:
+                numbers.append(int(match.group(1)))
+
+        state_path = os.path.join(dirname, self.state_file)
+        if os.path.exists(state_path):
+            try:
+                numbers.append(int(open(state_path).read().strip()))
+            except ValueError:
+                log.warning('cannot parse {0}. Ignoring it.'.format(state_path), actor=False)
+
+        return max(numbers)
+
+    def _persist(self, dirname):
+        """Atomically writes the last sequence number to disk."""
+
+        state_path = os.path.join(dirname, self.state_file)
+        tmp_path = state_path + '.tmp'
+
+        with open(tmp_path, 'w') as tmp:
+            tmp.write('{0}\n'.format(self.last_no))
+
+        os.rename(tmp_path, state_path)
+
+    def seed(self, sjd=None):
+        """Reads the last sequence number for ``sjd`` from disk."""
+
+        sjd = sjd or get_sjd()
+
+        with self._lock:
+            self.sjd = sjd
+            self.last_no = self._seed(os.path.join(self.save_path, str(sjd)))
+
+        return self.last_no
+
+    def next_path(self, sjd=None):
+        """Returns the dirname and basename of the next valid exposure path."""
+
+        sjd = sjd or get_sjd()
+
+        dirname = os.path.join(self.save_path, str(sjd))
+
+        with self._lock:
+
+            if not os.path.exists(dirname):
+                os.makedirs(dirname)
+
+            if sjd != self.sjd or self.last_no is None:
+                self.sjd = sjd
+                self.last_no = self._seed(dirname)
+
+            self.last_no += 1
+            self._persist(dirname)
+
+            return dirname, 'bimg-{0:04d}.fits'.format(self.last_no)
+
+
+def process_exposure(image, camera_type, background_cache=None, previous=None,
+                     writer=None, save_path=None, timer=None, saved=None):
+    """Processes an exposure.
 
-    if not centroid:
-        actor.writeToUsers('i', 'text="no centroid detected for '
-                                '{0}-axis camera."'.format(camera_type))
-    else:
-        xx, yy, __, fwhm = centroid
-        actor.writeToUsers('d', 'text="{0}-axis camera centroid detected '
-                                'at ({1:.1f}, {2:.1f}) with fwhm {3:.2f} arcsec"'
-                                .format(camera_type, xx, yy, fwhm))
-        actor.centroids[camera_type] = (xx, yy)
-        actor.fwhm[camera_type] = fwhm
+    If a `~bmo.background.BackgroundCache` is passed, subtracts the
+    background. Then calculates the centroid, searching first around the
+    ``previous`` centroid, if provided. If a `~bmo.writer.FITSWriter` is
+    passed, queues the image to be saved in ``save_path``, the ``(dirname,
+    basename)`` of the exposure or a function that returns it, which is
+    called in the writer thread. ``saved`` is passed to `.FITSWriter.put`.
+    The duration of each stage is recorded in ``timer``.
 
-    return True
+    This function runs in a worker thread of the image pipeline so it must not
+    write to the actor users.
 
+    Returns a dictionary with the ``background`` model, the ``centroid``, and
+    a list of ``warnings`` to output.
 
-def create_exposure_path(actor):
-    """Returns the dirname and basename of the next valid exposure path."""
+    """
+
+    timer = timer or FrameTimer()
+
+    result = {'background': None, 'centroid': None, 'warnings': []}
 
-    sjd = get_sjd()
+    if background_cache is not None:
+        with timer.span('background'):
+            background = background_cache.get(camera_type, image.exposure_time, image.data)
+            result['background'] = image.subtract_background(background)
 
-    dirname = os.path.join(actor.config['cameras']['save_path'], str(sjd))
-    if not os.path.exists(dirname):
-        os.makedirs(dirname)
+    with timer.span('centroid'):
+        try:
+            centroid, fwhm = get_centroid(image.data, return_fwhm=True, previous=previous)
+            result['centroid'] = (centroid.xyCtr[0], centroid.xyCtr[1], centroid.rad, fwhm)
+        except AssertionError:
+            pass
 
-    files = sorted(glob.glob(os.path.join(dirname, '*.fits*')))
+    fwhm = result['centroid'][3] if result['centroid'] else None
+    fwhm = float('{:.2f}'.format(fwhm)) if fwhm else -999.
+    image.header['STARFWHM'] = (fwhm, 'Star FWHM measurement [arcsec]')
 
-    if len(files) == 0:
-        last_no = 0
-    else:
-        last_no = int(files[-1].split('.')[0].split('-')[-1])
+    if writer is not None:
+        if not writer.put(image, save_path, timer=timer, saved=saved, compress=True):
+            result['warnings'].append('writer queue is full. '
+                                      '{0}-axis image not saved.'.format(camera_type))
 
-    return dirname, 'bimg-{0:04d}.fits'.format(last_no + 1)
+    return result
 
 
 def do_expose(actor, cmd, camera_type, one=False, subtract_background=True):
@@ -76,6 +197,10 @@ def do_expose(actor, cmd, camera_type, one=False, subtract_background=True):
     We keep this function separated because reactor.callLater does not seem to
     work with click.
 
+    Each new frame is submitted to the actor image pipeline and processed in a
+    worker thread. The next exposure is started as soon as there is room in
+    the pipeline queue for the camera.
+
     """
 
     if one:
@@ -89,8 +214,69 @@ def do_expose(actor, cmd, camera_type, one=False, subtract_background=True):
     if camera.state != 'exposing':
         camera.state = 'exposing'
 
-    def _process_image(image):
-        """Callback to be called when an exposure completes."""
+    timer = actor.frame_timings.get_timer(camera_type)
+
+    def _report_timing(__):
+        """Outputs the frame timing once the image has been displayed and saved."""
+
+        log.debug('{0}-axis frame timing: {1}'.format(camera_type, timer), actor=False)
+        actor.frame_timings.update_keywords(actor, camera_type=camera_type)
+
+    def _report(result, image, saved):
+        """Outputs the results of processing a frame. Called in the reactor thread."""
+
+        displayed = display_image(actor, image.data, camera_type,
+                                  centroid=result['centroid'], timer=timer)
+
+        finished = [dd for dd in (displayed, saved) if dd is not None]
+        defer.DeferredList(finished, consumeErrors=True).addCallback(_report_timing)
+
+        for warning in result['warnings']:
+            log.warning(warning, actor)
+
+        if result['background'] is not None:
+            log.debug('background mean: {0:.3f}'.format(result['background'].background_median),
+                      actor)
+
+        centroid = result['centroid']
+        if not centroid:
+            actor.writeToUsers('i', 'text="no centroid detected for '
+                                    '{0}-axis camera."'.format(camera_type))
+        else:
+            xx, yy, __, fwhm = centroid
+            actor.writeToUsers('d', 'text="{0}-axis camera centroid detected '
+                                    'at ({1:.1f}, {2:.1f}) with fwhm {3:.2f} arcsec"'
+                                    .format(camera_type, xx, yy, fwhm))
+            actor.centroids[camera_type] = (xx, yy)
+            actor.fwhm[camera_type] = fwhm
+
+    def _failed(failure):
+        """Handles a frame that failed processing."""
+
+        log.warning('failed to process {0}-axis image: {1}'
+                    .format(camera_type, failure.getErrorMessage()), actor)
+        log.warning('stopping cameras now. Consider rerunning with --no-background')
+        actor.stop_exposure = True
+
+    def _next_exposure(__=None):
+        """Starts the next exposure or stops the camera."""
+
+        if not actor.stop_exposure:
+            reactor.callLater(0.1, do_expose, actor, cmd, camera_type, one=False,
+                              subtract_background=subtract_background)
+        elif actor.pipeline.get_depth(camera_type) > 0:
+            # Waits until all the frames for this camera have been processed.
+            actor.pipeline.wait(camera_type, empty=True).addCallback(_next_exposure)
+        else:
+            log.info('stopping {0}-axis camera.'.format(camera_type))
+            camera.state = 'idle'
+            if not cmd.isDone:
+                cmd.setState(cmd.Done)
+
+    def _process_image(image, received):
+        """Processes a completed exposure. Called in the reactor thread."""
+
+        timer.add('capture', received - capture_start)
 
         # If the image is False something went wrong. We reconnect the cameras to
         if image is False:
@@ -101,61 +287,57 @@ def do_expose(actor, cmd, camera_type, one=False, subtract_background=True):
                               subtract_background=subtract_background)
             return
 
-        # Substracts the background. Stores it for the next iteration.
-        if subtract_background is True:
-            try:
-                camera.background = image.subtract_background(camera.background)
-            except Exception as error:
-                log.warning('failed to subtract background: {}'.format(error))
-                log.warning('stopping cameras now. Consider rerunning with --no-background')
-                actor.stop_exposure = True
-                return
-
-            log.debug('background mean: {0:.3f}'.format(camera.background.background_median),
-                      actor)
-
-        # Tries to display the image.
-        display_image(image.data, camera_type, actor, cmd)
-
-        camera_ra = camera_dec = None
+        with timer.span('header'):
 
-        if actor.tccActor.dev_state.plate_id is not None:
-            camera_ra, camera_dec = get_camera_coordinates(
+            # The coordinates come from the plate cache, which is filled in a
+            # thread when the plate changes. They are None until it is loaded.
+            camera_ra, camera_dec = actor.plate_cache.get_camera_coordinates(
                 actor.tccActor.dev_state.plate_id,
                 camera='center' if camera_type == 'on' else 'offaxis')
 
-        image.set_hole_radec(camera_ra, camera_dec)
+            image.set_hole_radec(camera_ra, camera_dec)
 
-        fwhm = actor.fwhm[camera_type]
-        fwhm = float('{:.2f}'.format(fwhm)) if fwhm else -999.
+            # The TCC state is recorded when the frame is received, not when it is saved.
+            extra_header = astropy.io.fits.Header(
+                [('ALT', actor.tccActor.dev_state.tcc_pos[1], 'Telescope ALT'),
+                 ('AZ', actor.tccActor.dev_state.tcc_pos[0], 'Telescope AZ'),
+                 ('ROT', actor.tccActor.dev_state.tcc_pos[2], 'Telescope ROT'),
+                 ('CARTID', actor.tccActor.dev_state.instrumentNum, 'Cartridge ID'),
+                 ('PLATEID', actor.tccActor.dev_state.plate_id, 'Currently loaded plate'),
+                 ('CAMTYPE', camera_type + '-axis', 'Camera position (on/off-axis)'),
+                 ('SECORIEN', actor.tccActor.dev_state.secOrient, 'Secondary orientation')])
 
-        extra_header = astropy.io.fits.Header(
-            [('ALT', actor.tccActor.dev_state.tcc_pos[1], 'Telescope ALT'),
-             ('AZ', actor.tccActor.dev_state.tcc_pos[0], 'Telescope AZ'),
-             ('ROT', actor.tccActor.dev_state.tcc_pos[2], 'Telescope ROT'),
-             ('CARTID', actor.tccActor.dev_state.instrumentNum, 'Cartridge ID'),
-             ('PLATEID', actor.tccActor.dev_state.plate_id, 'Currently loaded plate'),
-             ('CAMTYPE', camera_type + '-axis', 'Camera position (on/off-axis)'),
-             ('SECORIEN', actor.tccActor.dev_state.secOrient, 'Secondary orientation'),
-             ('STARFWHM', fwhm, 'Star FWHM measurement [arcsec]')])
+            image.header.extend(extra_header)
 
-        image.header.extend(extra_header)
+        # Fires when the image has been saved.
+        saved = defer.Deferred()
 
-        dirname, basename = create_exposure_path(actor)
-        fn = image.save(dirname=dirname, basename=basename, compress=True)
+        # The exposure number is assigned and persisted in the writer thread.
+        processed = actor.pipeline.submit(camera_type, process_exposure, image, camera_type,
+                                          background_cache=(actor.background_cache
+                                                            if subtract_background else None),
+                                          previous=actor.centroids[camera_type],
+                                          writer=actor.writer,
+                                          save_path=functools.partial(
+                                              actor.exposure_sequence.next_path, sjd=get_sjd()),
+                                          timer=timer, saved=saved)
+        processed.addCallbacks(_report, _failed, callbackArgs=(image, saved))
 
-        log.debug('saved {0}-axis image {1}'.format(camera_type, fn))
+        # Waits until there is room in the pipeline queue for this camera.
+        actor.pipeline.wait(camera_type).addCallback(_next_exposure)
 
-        if not actor.stop_exposure:
-            reactor.callLater(0.1, do_expose, actor, cmd, camera_type, one=False,
-                              subtract_background=subtract_background)
-        else:
-            log.info('stopping {0}-axis camera.'.format(camera_type))
-            camera.state = 'idle'
-            if not cmd.isDone:
-                cmd.setState(cmd.Done)
+    def _frame_received(image):
+        """Callback called by the camera, in the Vimba thread, when an exposure completes.
+
+        The image pipeline and the actor state are only modified in the reactor
+        thread, so the frame is handed over to it.
+
+        """
 
-    camera.expose(_process_image)
+        reactor.callFromThread(_process_image, image, monotonic())
+
+    capture_start = monotonic()
+    camera.expose(_frame_received)
 
 
 @click.group()
@@ -254,7 +436,9 @@ def exptime(actor, cmd, exptime, camera_type):
             continue
 
         camera.camera.ExposureTimeAbs = 1e6 * exptime
-        camera.background = None  # Clears background since it now needs to be recalculated.
+
+        # Evicts the background models since they need to be recalculated.
+        actor.background_cache.evict(camera_type)
 
         log.info('{0}-axis camera exptime set to {1:.1f}'.format(camera_type, exptime))
 
@@ -34,10 +34,6 @@ def centre_up(actor, cmd, translate, dryrun):
 
     def apply_offsets(status_cmd):
 
-        ra_offset = None
-        dec_offset = None
-        rot_offset = None
-
         if not status_cmd.isDone:
             return
 
@@ -45,6 +41,9 @@ def centre_up(actor, cmd, translate, dryrun):
             cmd.setState(cmd.Failed, 'TCC status command failed. Cannot output status.')
             return
 
+        on_centroid = centroids['on']
+        off_centroid = centroids['off']
+
         if on_centroid is None:
             cmd.setState(cmd.Failed, 'Undefined on-axis centroid.')
             return
@@ -58,64 +57,96 @@ def centre_up(actor, cmd, translate, dryrun):
         log.warning('translation offset: (RA, Dec)=({0:.1f}, {1:.1f})'
                     .format(ra_offset, dec_offset), actor)
 
-        if off_centroid is not None:
-            plate_id = bmo.utils.get_plateid(actor.tccActor.dev_state.instrumentNum)
-            rot_offset = bmo.utils.get_rotation_offset(plate_id, off_centroid,
-                                                       translation_offset=(ra_offset, dec_offset))
+        if off_centroid is None:
+            log.warning('no off-axis centroid. Not calculating rotation.', actor)
+            send_offsets(ra_offset, dec_offset, None)
+            return
+
+        def get_focal(plate_id):
+            """Returns the off-axis xyfocal from the plate cache or the database."""
+
+            metadata = actor.plate_cache.get(plate_id)
+            if metadata is not None and metadata.focal.get('offaxis', None):
+                return (plate_id, metadata.focal['offaxis'])
+
+            focal = bmo.utils.get_camera_focal_async(plate_id, camera='offaxis')
+            return focal.addCallback(lambda xy_focal: (plate_id, xy_focal))
+
+        def apply_rotation(result):
+
+            plate_id, xy_focal = result
+
+            rot_offset = bmo.utils.get_rotation_offset(
+                plate_id, off_centroid, translation_offset=(ra_offset, dec_offset),
+                xy_focal=xy_focal)
             rot_msg = ' (not applying it)' if translate else ''
             log.warning('measured rotation offset: {0:.1f}{1}'.format(rot_offset, rot_msg), actor)
-        else:
-            log.warning('no off-axis centroid. Not calculating rotation.', actor)
+
+            send_offsets(ra_offset, dec_offset, rot_offset)
+
+        def rotation_failed(failure):
+
+            cmd.setState(cmd.Failed, 'failed calculating the rotation offset: '
+                                     '{0}'.format(failure.getErrorMessage()))
+
+        plate_id = bmo.utils.get_plateid_async(actor.tccActor.dev_state.instrumentNum)
+        plate_id.addCallback(get_focal).addCallback(apply_rotation).addErrback(rotation_failed)
+
+    def send_offsets(ra_offset, dec_offset, rot_offset):
 
         if not dryrun:
             actor.tccActor.offset(ra=ra_offset, dec=dec_offset, rot=rot_offset)
+            # The stars will move so we stop tracking the previous centroids.
+            actor.centroids = {'on': None, 'off': None}
         else:
             log.warning('this is a dry-run of centre_up. Not applying offsets.', actor)
 
         cmd.setState(cmd.Done)
 
-        return
-
     if actor.ds9 is None:
         cmd.setState(cmd.Failed, 'no DS9 instance connected.')
         return
 
-    on_centroid = None
-    off_centroid = None
+    def read_regions(ds9):
+        """Reads the regions in the DS9 thread."""
 
-    for ct in FRAMES:
+        return dict((ct, bmo.utils.read_ds9_regions(ds9, frame=FRAMES[ct]))
+                    for ct in FRAMES if not (ct == 'off' and translate is True))
 
-        if ct == 'off' and translate is True:
-            continue
+    def regions_read(regions):
 
-        try:
-            result = bmo.utils.read_ds9_regions(actor.ds9, frame=FRAMES[ct])
-        except Exception as ee:
-            cmd.setState(cmd.Failed, 'failed retrieving centroids: {0!r}'.format(ee))
-            return
+        for ct in regions:
+
+            result = regions[ct]
 
-        if result[0] is False:
-            if actor.centroids[ct] is not None:
-                log.warning('cannot read centroid region for {0}-axis camera. '
-                            'Using previous value.'.format(ct), actor)
-                result = [True, np.array(actor.centroids[ct])]
-            else:
-                cmd.setState(cmd.Failed, 'failed retrieving centroids: {0!r}'.format(result[1]))
-                return
-
-        if ct == 'on':
-            on_centroid = result[1][0:2]
+            if result[0] is False:
+                if actor.centroids[ct] is not None:
+                    log.warning('cannot read centroid region for {0}-axis camera. '
+                                'Using previous value.'.format(ct), actor)
+                    result = [True, np.array(actor.centroids[ct])]
+                else:
+                    cmd.setState(cmd.Failed,
+                                 'failed retrieving centroids: {0!r}'.format(result[1]))
+                    return
+
+            centroids[ct] = result[1][0:2]
+
+            log.info('{0}-axis camera: selected centroid at ({1:.1f}, {2:.1f})'
+                     .format(ct, result[1][0], result[1][1]), actor)
+
+        status_cmd = actor.tccActor.get_status()
+        if status_cmd is not False:
+            status_cmd.addCallback(apply_offsets)
         else:
-            off_centroid = result[1][0:2]
+            cmd.setState(cmd.Failed,
+                         'failed retrieving TCC status. TCC may be dead or disconnected.')
 
-        log.info('{0}-axis camera: selected centroid at ({1:.1f}, {2:.1f})'
-                 .format(ct, result[1][0], result[1][1]), actor)
+    def regions_failed(failure):
 
-    status_cmd = actor.tccActor.update_status()
-    if status_cmd is not False:
-        status_cmd.addCallback(apply_offsets)
-    else:
-        cmd.setState(cmd.Failed, 'failed retrieving TCC status. TCC may be dead or disconnected.')
-        return
+        cmd.setState(cmd.Failed, 'failed retrieving centroids: {0!r}'.format(failure.value))
+
+    centroids = {'on': None, 'off': None}
+
+    actor.ds9.call(read_regions).addCallbacks(regions_read, regions_failed)
 
     return False
@@ -17,12 +17,14 @@ from bmo.cmds.centre_up import centre_up
 from bmo.cmds.ds9 import ds9
 from bmo.cmds.help import help
 from bmo.cmds.ping import ping
+from bmo.cmds.profile import profile
+from bmo.cmds.snapshot import snapshot
 from bmo.cmds.status import status
 from bmo.cmds.tcc import tcc
 from bmo.cmds.version import version
 
 
-__all__ = ('bmo_parser')
+__all__ = ('bmo_parser', 'CommandDispatcher', 'dispatcher')
 
 
 @click.group()
@@ -36,10 +38,148 @@ bmo_parser.add_command(centre_up)
 bmo_parser.add_command(ds9)
 bmo_parser.add_command(help)
 bmo_parser.add_command(ping)
+bmo_parser.add_command(profile)
+bmo_parser.add_command(snapshot)
 bmo_parser.add_command(status)
 bmo_parser.add_command(tcc)
 bmo_parser.add_command(version)
 
 
+class CommandDispatcher(object):
+    """Parses and invokes actor commands in a single pass.
+
+    The commands and subcommands of ``group`` are resolved from a table
+    built once, keyed by the tuple of command names (e.g.,
+    ``('ds9', 'connect')``), instead of walking the group for every
+    command. The arguments are parsed only once and usage errors are
+    raised as `click.UsageError`, so that the caller can fail the actor
+    command, instead of being printed and turned into ``SystemExit``.
+
+    Parameters:
+        group (`click.Group`):
+            The root group of the commands.
+        prog_name (str):
+            The name of the root group, as shown in the usage.
+
+    """
+
+    def __init__(self, group, prog_name='bmo'):
+
+        self.group = group
+        self.prog_name = prog_name
+
+        self.table = {}
+        self._add_commands(group, ())
+
+        self.max_depth = max(len(path) for path in self.table)
+
+    def _add_commands(self, group, chain):
+        """Adds the commands of ``group`` to the table, recursively."""
+
+        for name, command in group.commands.items():
+
+            command_chain = chain + (command, )
+            self.table[tuple(cc.name for cc in command_chain)] = command_chain
+
+            if isinstance(command, click.Group):
+                self._add_commands(command, command_chain)
+
+    def _get_root_context(self, obj=None, resilient_parsing=False):
+        """Returns a context for the root group."""
+
+        return click.Context(self.group, info_name=self.prog_name, obj=obj,
+                             resilient_parsing=resilient_parsing)
+
+    def resolve(self, args):
+        """Returns the chain of commands of the longest table path that starts ``args``.
+
+        Raises `click.UsageError` if the command does not exist.
+
+        """
+
+        for depth in range(min(self.max_depth, len(args)), 0, -1):
+            chain = self.table.get(tuple(args[:depth]), None)
+            if chain is not None:
+                return chain
+
+        if len(args) == 0:
+            raise click.UsageError('Missing command.', ctx=self._get_root_context())
+
+        raise click.UsageError('No such command {0!r}.'.format(args[0]),
+                               ctx=self._get_root_context())
+
+    def make_context(self, args, obj=None, resilient_parsing=False):
+        """Parses ``args`` and returns the context of the command, ready to be invoked.
+
+        Parameters:
+            args (list):
+                The command split in words.
+            obj (object):
+                The object passed to the commands as ``ctx.obj``.
+            resilient_parsing (bool):
+                If True, the arguments are not validated. Used to get the help.
+
+        """
+
+        chain = self.resolve(args)
+        n_names = len(chain)
+
+        ctx = self._get_root_context(obj=obj, resilient_parsing=resilient_parsing)
+
+        for name, command in zip(args[:n_names - 1], chain[:-1]):
+            ctx = click.Context(command, info_name=name, parent=ctx,
+                                resilient_parsing=resilient_parsing)
+
+        command = chain[-1]
+        name = args[n_names - 1]
+
+        if (isinstance(command, click.Group) and len(args) == n_names and
+                not resilient_parsing):
+            raise click.UsageError('Missing command.',
+                                   ctx=click.Context(command, info_name=name, parent=ctx))
+
+        # If the last command is a group, the subcommand is not in the table
+        # and the group itself reports the error when invoked.
+        return command.make_context(name, list(args[n_names:]), parent=ctx,
+                                    resilient_parsing=resilient_parsing)
+
+    def get_help(self, args):
+        """Returns the help of the command in ``args``, or of all the commands."""
+
+        args = [arg for arg in args if arg != '--help']
+
+        if len(args) == 0:
+            ctx = self._get_root_context()
+        else:
+            ctx = self.make_context(args, resilient_parsing=True)
+
+        return ctx.get_help()
+
+    def invoke(self, ctx):
+        """Invokes the command of ``ctx`` after the callbacks of its parent groups."""
+
+        parents = []
+        parent = ctx.parent
+        while parent is not None:
+            parents.insert(0, parent)
+            parent = parent.parent
+
+        for parent in parents:
+            with parent:
+                click.Command.invoke(parent.command, parent)
+
+        with ctx:
+            return ctx.command.invoke(ctx)
+
+    def __call__(self, args, obj=None):
+        """Parses and invokes a command. Raises `click.UsageError` if the command is invalid."""
+
+        return self.invoke(self.make_context(args, obj=obj))
+
+
+#: Dispatches commands to `.bmo_parser`. See `.CommandDispatcher`.
+dispatcher = CommandDispatcher(bmo_parser)
+
+
 if __name__ == '__main__':
     bmo_parser()
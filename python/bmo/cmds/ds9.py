@@ -11,18 +11,13 @@ from __future__ import print_function
 from __future__ import absolute_import
 
 import click
-import warnings
+
+from twisted.internet import defer
 
 from bmo.cmds import bmo_context
-from bmo.exceptions import BMOError, BMOUserWarning
+from bmo.display import DS9Proxy
 from bmo.logger import log
-from bmo.utils import get_camera_coordinates, get_acquisition_dss_path
-
-try:
-    import pyds9
-except ImportError:
-    warnings.warn('cannot import pyds9. DS9 features will not work!!', BMOUserWarning)
-    pyds9 = None
+from bmo.utils import get_camera_coordinates_async
 
 __all__ = ('ds9')
 
@@ -46,7 +41,7 @@ def prepare_ds9(ds9, only_delete=False):
     ds9.set('tile yes')
 
 
-def display_dss_from_server(coords, frame, ds9, camera_type, plate_id, width=3, height=3):
+def display_dss_from_server(ds9, coords, frame, camera_type, plate_id, width=3, height=3):
     """Displays a DSS image from the internet in a DS9 frame."""
 
     ds9.set('frame {0}'.format(frame))
@@ -72,21 +67,17 @@ def display_dss_from_server(coords, frame, ds9, camera_type, plate_id, width=3,
     return
 
 
-def display_dss_from_file(ds9, acq_dss_path, camera_type, plate_id, frame=1):
-    """Displays a DSS image from a file."""
+def display_dss_from_memory(ds9, hdulist, camera_type, plate_id, frame=1):
+    """Displays a DSS image already loaded in memory."""
 
     ds9.set('frame {0}'.format(frame))
-    ds9.set('fits {0}'.format(acq_dss_path))
+    ds9.send_fits(hdulist)
     ds9.set('wcs append', 'OBJECT = \'{0}axis_{1}\''.format(camera_type, plate_id))
 
-    width = ds9.get('fits width')
-    centre_w = int(width) / 2
-
-    height = ds9.get('fits height')
-    centre_h = int(height) / 2
+    width, height = ds9.get_shape(frame)
 
-    ds9.set('regions command {{point({0}, {1}) # point=cross 20, color=blue}}'.format(centre_w,
-                                                                                      centre_h))
+    ds9.set('regions command {{point({0}, {1}) # point=cross 20, color=blue}}'.format(width / 2,
+                                                                                      height / 2))
 
     ds9.set('zoom to fit')
     ds9.set('minmax')
@@ -98,55 +89,68 @@ def display_dss_from_file(ds9, acq_dss_path, camera_type, plate_id, frame=1):
 def display_dss(cmd, actor, plate_id, try_server=False):
     """Displays DSS images in DS9.
 
-    It first tries to use the FITS files from platelist. If that fails and
-    ``try_server=True``, will try to use the DS9 DSS image server.
+    It first tries to use the FITS files from platelist, which are taken from
+    the chart cache or read in a thread, and sent to DS9 from memory. If that
+    fails and ``try_server=True``, will try to use the DS9 DSS image server.
+    Returns a deferred that fires with ``True`` if the images were displayed.
 
     """
 
-    try:
+    def _display(charts):
+        return defer.gatherResults(
+            [actor.ds9.call(display_dss_from_memory, charts['center'], 'on', plate_id,
+                            frame=2),
+             actor.ds9.call(display_dss_from_memory, charts['offaxis'], 'off', plate_id,
+                            frame=4)], consumeErrors=True)
 
-        acq_dss_centre_path = get_acquisition_dss_path(plate_id)
-        acq_dss_off_path = get_acquisition_dss_path(plate_id, 'offaxis')
+    def _file_failed(failure):
+        failure = getattr(failure.value, 'subFailure', failure)
+        log.warning('failed to display DSS images from file: '
+                    '{0}'.format(failure.getErrorMessage()), actor)
+        # If try_server=False, returns here and fails.
+        return display_dss_from_server_all(cmd, actor, plate_id) if try_server else False
 
-        if acq_dss_centre_path.exists() and acq_dss_off_path.exists():
-            display_dss_from_file(actor.ds9, acq_dss_centre_path, 'on', plate_id, frame=2)
-            display_dss_from_file(actor.ds9, acq_dss_off_path, 'off', plate_id, frame=4)
-            return True
+    displayed = actor.chart_cache.load(plate_id).addCallback(_display)
 
-    except (BMOError, AssertionError) as ee:
+    return displayed.addCallbacks(lambda __: True, _file_failed)
 
-        log.warning('failed to display DSS images from file: {0}'.format(ee), actor)
 
-    # If try_server=False, returns here and fails.
-    if not try_server:
-        return False
+def display_dss_from_server_all(cmd, actor, plate_id):
+    """Displays the DSS images for both cameras from the DS9 DSS image server."""
 
     # Tries to use DS9 DSS image server
 
     log.warning('cannot find DSS images for plate {0}. '
                 'Using DSS server."'.format(plate_id), actor)
 
-    # Normally, if the images do not exist in platelist, the offaxis coordinates
-    # cannot be obtained because they are calculated from the DSS image.
-    for camera in ['center', 'offaxis']:
-
-        try:
-            coords = get_camera_coordinates(plate_id, camera=camera)
-        except (BMOError, AssertionError) as ee:
-            log.warning('failed to get {0} camera '
-                        'coordinates: {1}"'.format(camera, str(ee)), actor)
-            continue
+    def _display(coords, camera):
 
         if not all(coords):
             log.warning('failed to get {0} camera coordinates.'.format(camera), actor)
-            continue
+            return
 
         if camera == 'center':
-            display_dss_from_server(coords, 2, actor.ds9, 'on', plate_id)
+            return actor.ds9.call(display_dss_from_server, coords, 2, 'on', plate_id)
         else:
-            display_dss_from_server(coords, 4, actor.ds9, 'off', plate_id)
+            return actor.ds9.call(display_dss_from_server, coords, 4, 'off', plate_id)
+
+    def _failed(failure, camera):
+
+        log.warning('failed to get {0} camera '
+                    'coordinates: {1}"'.format(camera, failure.getErrorMessage()), actor)
+
+    displayed = []
 
-    return True
+    # Normally, if the images do not exist in platelist, the offaxis coordinates
+    # cannot be obtained because they are calculated from the DSS image.
+    for camera in ['center', 'offaxis']:
+
+        coords = get_camera_coordinates_async(plate_id, camera=camera)
+        coords.addCallbacks(_display, _failed, callbackArgs=(camera,), errbackArgs=(camera,))
+
+        displayed.append(coords)
+
+    return defer.gatherResults(displayed, consumeErrors=True).addCallback(lambda __: True)
 
 
 @click.group()
@@ -167,17 +171,24 @@ def connect(actor, cmd, address):
                                    actor.config['ds9']['port'])
         log.debug('using DS9 address from config: {0}'.format(address), actor)
 
-    try:
-        actor.ds9 = pyds9.DS9(address)
-    except:
-        cmd.setState(cmd.Failed, 'cannot connect to {0}'.format(address))
-        return
+    proxy = DS9Proxy.from_config(actor.config)
 
-    log.info('connected to DS9 {0}'.format(address), actor)
+    def _connected(__):
+        if actor.ds9 is not None:
+            actor.ds9.stop()
+        actor.ds9 = proxy
+        log.info('connected to DS9 {0}'.format(address), actor)
+        return proxy.call(prepare_ds9)
 
-    prepare_ds9(actor.ds9)
+    def _failed(failure):
+        if actor.ds9 is not proxy:
+            proxy.stop()
+        cmd.setState(cmd.Failed, 'cannot connect to {0}: {1}'.format(address,
+                                                                     failure.getErrorMessage()))
 
-    cmd.setState(cmd.Done)
+    connected = proxy.connect(address)
+    connected.addCallback(_connected)
+    connected.addCallbacks(lambda __: cmd.setState(cmd.Done), _failed)
 
     return False
 
@@ -206,18 +217,25 @@ def show_chart(actor, cmd, plate):
             cmd.setState(cmd.Failed, 'plate_id is None.')
             return
 
-        result = display_dss(cmd, actor, plate_id)
+        def _displayed(result):
+            if result:
+                cmd.setState(cmd.Done,
+                             'DSS finding charts displayed for plate {0}.'.format(plate_id))
+            else:
+                cmd.setState(cmd.Failed, 'failed finding charts for plate {0}'.format(plate_id))
 
-        if result:
-            cmd.setState(cmd.Done, 'DSS finding charts displayed for plate {0}.'.format(plate_id))
-        else:
-            cmd.setState(cmd.Failed, 'failed finding charts for plate {0}'.format(plate_id))
+        def _failed(failure):
+            failure = getattr(failure.value, 'subFailure', failure)
+            cmd.setState(cmd.Failed, 'failed finding charts for plate {0}: {1}'.format(
+                plate_id, failure.getErrorMessage()))
+
+        display_dss(cmd, actor, plate_id).addCallbacks(_displayed, _failed)
 
     if plate is not None:
         show_chart_cb()
         return False
 
-    status_cmd = actor.tccActor.update_status()
+    status_cmd = actor.tccActor.get_status()
     if status_cmd is not False:
         status_cmd.addCallback(show_chart_cb)
 
@@ -234,9 +252,11 @@ def reset(actor, cmd):
         return
 
     log.info('reseting DS9', actor)
-    prepare_ds9(actor.ds9)
 
-    cmd.setState(cmd.Done)
+    actor.ds9.call(prepare_ds9).addCallbacks(
+        lambda __: cmd.setState(cmd.Done),
+        lambda failure: cmd.setState(cmd.Failed, 'failed to reset DS9: {0}'.format(
+            failure.getErrorMessage())))
 
     return False
 
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# profile.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import click
+
+from twisted.internet import reactor
+
+from bmo.cmds import bmo_context
+from bmo.exceptions import BMOError
+from bmo.logger import log
+
+
+__all__ = ('profile')
+
+
+# The delayed call that stops a timed profile and the command that started it.
+_timed = {'call': None, 'cmd': None}
+
+
+def report_profile(actor, cmd):
+    """Stops the profiler and outputs the top functions."""
+
+    path, stats = actor.profiler.stop()
+
+    cmd.writeToUsers('i', 'profileFile="{0}"'.format(path))
+
+    for function, n_calls, total_time, cumulative_time in actor.profiler.get_top(stats):
+        cmd.writeToUsers('i', 'profileFunction="{0}",{1},{2:.1f},{3:.1f}'.format(
+            function, n_calls, total_time * 1000., cumulative_time * 1000.))
+
+    log.info('profile saved to {0}'.format(path), actor=False)
+
+
+def _finish_timed(actor):
+    """Stops a timed profile and finishes the command that started it."""
+
+    cmd = _timed['cmd']
+
+    _timed['call'] = _timed['cmd'] = None
+
+    report_profile(actor, cmd)
+    cmd.setState(cmd.Done)
+
+
+@click.group()
+def profile():
+    """Profiles the reactor thread of the running actor."""
+    pass
+
+
+@profile.command()
+@click.option('-s', '--seconds', type=float, default=None,
+              help='stops the profiler and reports after this many seconds.')
+@bmo_context
+def start(actor, cmd, seconds):
+    """Starts the profiler."""
+
+    try:
+        actor.profiler.start()
+    except BMOError as ee:
+        cmd.setState(cmd.Failed, str(ee))
+        return False
+
+    if seconds is None:
+        cmd.setState(cmd.Done, 'profiler started.')
+        return False
+
+    log.info('profiling for {0:.1f} seconds.'.format(seconds), actor)
+
+    _timed['cmd'] = cmd
+    _timed['call'] = reactor.callLater(seconds, _finish_timed, actor)
+
+    return False
+
+
+@profile.command()
+@bmo_context
+def stop(actor, cmd):
+    """Stops the profiler and outputs the top functions by cumulative time."""
+
+    if not actor.profiler.is_running:
+        cmd.setState(cmd.Failed, 'the profiler is not running.')
+        return False
+
+    if _timed['call'] is not None and _timed['call'].active():
+        _timed['call'].cancel()
+        _finish_timed(actor)
+    else:
+        report_profile(actor, cmd)
+
+    cmd.setState(cmd.Done)
+
+    return False
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# snapshot.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import click
+
+from twisted.internet import threads
+
+from bmo.cmds import bmo_context
+from bmo.db import run_query
+from bmo.logger import log
+from bmo.snapshot import export_snapshot
+from bmo.utils import PLATE_SNAPSHOT
+
+
+__all__ = ('snapshot')
+
+
+def output_snapshot(cmd):
+    """Outputs the ``plateSnapshot`` keyword."""
+
+    age = PLATE_SNAPSHOT.age
+
+    cmd.writeToUsers('i', 'plateSnapshot="{0}",{1:.0f},{2},{3}'.format(
+        PLATE_SNAPSHOT.path, age if age is not None else -999,
+        len(PLATE_SNAPSHOT.pluggings), len(PLATE_SNAPSHOT.pointings)))
+
+
+@click.group()
+def snapshot():
+    """Handles the offline plate snapshot."""
+    pass
+
+
+@snapshot.command()
+@click.argument('plates', metavar='PLATES', nargs=-1, type=click.INT)
+@bmo_context
+def export(actor, cmd, plates):
+    """Exports the plugged plates, and PLATES, from the database."""
+
+    def _exported(result):
+        n_carts, n_plates = result
+        log.info('exported {0} cartridges and {1} plates to {2}.'.format(
+            n_carts, n_plates, PLATE_SNAPSHOT.path), actor)
+        return run_query(PLATE_SNAPSHOT.load)
+
+    def _loaded(__):
+        output_snapshot(cmd)
+        actor.chart_cache.prefetch_plugged()
+        cmd.setState(cmd.Done)
+
+    def _failed(failure):
+        cmd.setState(cmd.Failed, 'failed to export the plate snapshot: '
+                                 '{0}'.format(failure.getErrorMessage()))
+
+    # A full export takes longer than the query timeout of the database pool,
+    # so it runs in its own thread instead of holding a pool thread.
+    exported = threads.deferToThread(export_snapshot, PLATE_SNAPSHOT.path, plate_ids=plates)
+    exported.addCallback(_exported).addCallbacks(_loaded, _failed)
+
+    return False
+
+
+@snapshot.command()
+@bmo_context
+def status(actor, cmd):
+    """Outputs the path, age, and number of cartridges and plates in the snapshot."""
+
+    output_snapshot(cmd)
+    cmd.setState(cmd.Done)
+
+    return False
@@ -52,12 +52,15 @@ def status(actor, cmd):
 
     cmd.linkCommands([tcc_status_cmd, camera_status_cmd])
 
-    actor.tccActor.update_status(tcc_status_cmd)
+    actor.tccActor.get_status(tcc_status_cmd)
     if tcc_status_cmd is not False:
         tcc_status_cmd.addCallback(broadcast_status)
     else:
         tcc_status_cmd.setState(tcc_status_cmd.Done)
 
     actor.manta_cameras.update_keywords()
+    actor.writer.update_keywords(actor)
+    actor.frame_timings.update_keywords(actor)
+    actor.tccActor.connection_manager.update_keywords(actor)
 
     return False
@@ -39,8 +39,11 @@ def tcc(actor, cmd, command):
 
     elif command == 'connect':
         actor.tccActor.connect()
+        actor.tccActor.connection_manager.start()
 
     elif command == 'disconnect':
+        # Stops the manager first so that it does not reconnect.
+        actor.tccActor.connection_manager.stop()
         actor.tccActor.disconnect()
 
     cmd.setState(cmd.Done)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# db.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from twisted.internet import reactor, threads
+from twisted.python.threadpool import ThreadPool
+
+from bmo import config
+
+
+__all__ = ('DatabasePool', 'run_query')
+
+
+# These parameters can be overridden by the actor configuration.
+POOL_SIZE = 2       # Maximum number of threads querying the database.
+TIMEOUT = 10        # Seconds after which a query fails.
+
+
+class DatabasePool(object):
+    """A bounded pool of threads that run the database queries.
+
+    Queries run in at most ``pool_size`` threads. The threads are reused, so
+    each one keeps its own database connection open between queries. The
+    pool starts with the first query and stops when the reactor shuts down.
+
+    Parameters:
+        pool_size (int):
+            The maximum number of threads.
+        timeout (float):
+            The number of seconds after which the deferred of a query fails
+            with a `~twisted.internet.defer.TimeoutError`. The query itself
+            cannot be interrupted and keeps its thread until it completes.
+
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, timeout=TIMEOUT):
+
+        self.timeout = timeout
+
+        self.pool = ThreadPool(minthreads=1, maxthreads=pool_size, name='bmo-db')
+
+        reactor.addSystemEventTrigger('during', 'shutdown', self.pool.stop)
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates a pool using the ``DB`` section of the configuration."""
+
+        db_config = config.get('DB', {})
+
+        return cls(pool_size=db_config.get('pool_size', POOL_SIZE),
+                   timeout=db_config.get('timeout', TIMEOUT))
+
+    def run(self, func, *args, **kwargs):
+        """Runs ``func`` in the pool. Returns a deferred with the result.
+
+        Must be called from the reactor thread.
+
+        """
+
+        if not self.pool.started:
+            self.pool.start()
+
+        queried = threads.deferToThreadPool(reactor, self.pool, func, *args, **kwargs)
+
+        return queried.addTimeout(self.timeout, reactor)
+
+
+db_pool = DatabasePool.from_config(config)
+
+
+def run_query(func, *args, **kwargs):
+    """Runs ``func`` in the BMO database pool. See `.DatabasePool.run`."""
+
+    return db_pool.run(func, *args, **kwargs)
@@ -28,6 +28,8 @@ class VimbaFrame(object):
 
         self.camera = camera
 
+        self.width, self.height = config['cameras']['image_shape']
+
     def announceFrame(self):
         """Announces the frame."""
 
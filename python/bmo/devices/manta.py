@@ -27,28 +27,20 @@ import numpy as np
 
 import bmo
 
-from bmo.exceptions import BMOUserWarning, BMOMissingImportWarning, MantaError
+from bmo.background import BackgroundModel, get_background_engine
+from bmo.exceptions import BMOUserWarning, MantaError
 from bmo.devices.fake_vimba import Vimba as FakeVimba
 from bmo.logger import log
 from bmo.utils import PIXEL_SIZE, FOCAL_SCALE
 
 from twistedActor.device import expandUserCmd
 
-try:
-    from astropy.stats import SigmaClip
-    from photutils.background import Background2D, MedianBackground
-    sigma_clip = SigmaClip(sigma=bmo.config['image']['background']['sigma_clip']['sigma'],
-                           iters=bmo.config['image']['background']['sigma_clip']['iters'])
-    bkg_estimator = MedianBackground()
-except Exception:
-    warnings.warn('photutils is missing. Background subtraction will not work.',
-                  BMOMissingImportWarning)
-    Background2D = None
-
 
 # These parameters can be overridden by the actor configuration.
 UPDATE_INTERVAL = 3          # How frequently the available cameras will be checked.
 EXTRA_EXPOSURE_DELAY = 1000  # How much extra time to wait for waitFrameCapture (ms).
+N_FRAMES = 3                 # Number of Vimba frames announced to each camera.
+N_BUFFERS = 8                # Number of preallocated image buffers per camera.
 
 
 def get_list_devices(config):
@@ -77,6 +69,60 @@ def get_camera_position(device, config):
         return None
 
 
+class FrameRing(object):
+    """A ring of preallocated image buffers.
+
+    Frame data is copied from the Vimba frame buffer into the next array in
+    the ring, so that the Vimba frame can be requeued immediately and each
+    exposure handed downstream owns its own buffer. Arrays are reused in
+    round-robin order, so an array is only overwritten after ``n_buffers``
+    new frames have been received. Nothing tracks who holds an array, so
+    ``n_buffers`` must be larger than the number of frames that can be in use
+    downstream at the same time.
+
+    Parameters:
+        n_buffers (int):
+            The number of arrays in the ring.
+        shape (tuple):
+            The shape of the image, as ``(height, width)``.
+        dtype (`numpy.dtype`):
+            The data type of the image buffers.
+        max_in_flight (int):
+            The maximum number of frames that can be referenced downstream at
+            the same time. Raises `.MantaError` if ``n_buffers`` is not larger.
+
+    """
+
+    def __init__(self, n_buffers, shape, dtype=np.uint16, max_in_flight=0):
+
+        assert n_buffers > 0, 'the ring needs at least one buffer.'
+
+        if n_buffers <= max_in_flight:
+            raise MantaError('n_buffers={0} would overwrite frames still in use. It must be '
+                             'larger than {1}.'.format(n_buffers, max_in_flight))
+
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+
+        self.buffers = [np.zeros(self.shape, dtype=self.dtype) for __ in range(n_buffers)]
+        self._index = 0
+
+    def __len__(self):
+
+        return len(self.buffers)
+
+    def copy(self, buffer):
+        """Copies ``buffer`` into the next array in the ring and returns it."""
+
+        array = self.buffers[self._index]
+        self._index = (self._index + 1) % len(self.buffers)
+
+        np.copyto(array, np.frombuffer(buffer, dtype=self.dtype,
+                                       count=array.size).reshape(self.shape))
+
+        return array
+
+
 class MantaExposure(object):
     """A Manta camera exposure."""
 
@@ -132,23 +178,29 @@ class MantaExposure(object):
         if value is None:
             self._background = None
         else:
-            assert isinstance(value, Background2D), 'background must be a Background2D object'
+            assert isinstance(value, BackgroundModel), \
+                'background must be a BackgroundModel object'
             self._background = value
 
-    def subtract_background(self, background=None, sigma_clip=sigma_clip,
-                            bkg_estimator=bkg_estimator, box_size=(50, 50),
-                            filter_size=(3, 3)):
-        """Fits a 2D background."""
+    def subtract_background(self, background=None, engine=None):
+        """Fits and subtracts a 2D background.
+
+        Parameters:
+            background (`~bmo.background.BackgroundModel` or None):
+                A background model to subtract. If ``None``, the background
+                is fitted.
+            engine (`~bmo.background.BackgroundEngine` or None):
+                The engine used to fit the background. If ``None``, uses the
+                engine defined in the configuration.
+
+        """
 
         if self.background is not None:
             raise ValueError('background has already been subtracted.')
 
-        if Background2D is None:
-            raise ImportError('photutils has not been installed.', BMOUserWarning)
-
         if background is None:
-            self.background = Background2D(self.data, box_size, filter_size=filter_size,
-                                           sigma_clip=sigma_clip, bkg_estimator=bkg_estimator)
+            engine = engine or get_background_engine()
+            self.background = engine.fit(self.data)
         else:
             self.background = background
 
@@ -187,6 +239,9 @@ class MantaExposure(object):
 
         cards = fits.Header([
             ('BACKGR', False, 'Was a background subtracted?'),
+            ('BACKGENG', '', 'The engine used to fit the background'),
+            ('BACKGAGE', '', 'Seconds since the background model was fitted'),
+            ('BACKGNUP', '', 'Frames used to update the model since fitted'),
             ('SIGMA', '', 'The sigma value used for sigma clipping'),
             ('SIGMAIT', '', 'The number of iterations for sigma clipping'),
             ('BACKBOXX', '', 'The box size along axis x'),
@@ -200,8 +255,11 @@ class MantaExposure(object):
             return cards
 
         cards['BACKGR'] = True
-        cards['SIGMA'] = sigma_clip.sigma
-        cards['SIGMAIT'] = sigma_clip.iters
+        cards['BACKGENG'] = self.background.engine.name
+        cards['BACKGAGE'] = round(self.background.age, 1)
+        cards['BACKGNUP'] = self.background.n_updates
+        cards['SIGMA'] = self.background.sigma
+        cards['SIGMAIT'] = self.background.iters
         cards['BACKBOXX'] = self.background.box_size[0]
         cards['BACKBOXY'] = self.background.box_size[1]
         cards['BACKFILX'] = self.background.filter_size[0]
@@ -300,16 +358,16 @@ class MantaExposure(object):
         new_object.hole_dec = header['HOLEDEC']
 
         if header['BACKGR'] is True:
-            image_sigma_clip = SigmaClip(sigma=header['SIGMA'],
-                                         iters=header['ITERS'])
+            # The engines build their sigma clipping when created, so the
+            # header parameters must be passed to the constructor.
+            config = dict(bmo.config['image']['background'],
+                          box_size=(header['BACKBOXX'], header['BACKBOXY']),
+                          filter_size=(header['BACKFILX'], header['BACKFILY']),
+                          sigma_clip={'sigma': header['SIGMA'], 'iters': header['SIGMAIT']})
 
-            box_size = (header['BACKBOXX'], header['BACKBOXY'])
-            filter_size = (header['BACKFILX'], header['BACKFILY'])
+            engine = get_background_engine(header.get('BACKGENG', 'photutils'), config=config)
 
-            new_object.background = Background2D(new_object.data, box_size,
-                                                 filter_size=filter_size,
-                                                 sigma_clip=image_sigma_clip,
-                                                 bkg_estimator=bkg_estimator)
+            new_object.background = engine.fit(new_object.data)
 
             new_object._raw = new_object.data + new_object.background.background
 
@@ -531,8 +589,10 @@ class MantaCamera(object):
         self.camera = None
         self._camera_type = None
 
+        self.frames = []
+        self.frame_ring = None
+
         self._last_exposure = None
-        self.background = None
 
         self.init_camera(camera_id)
 
@@ -540,8 +600,9 @@ class MantaCamera(object):
         """Initialises the camera.
 
         Gets the camera from the Vimba API, opens it, and sets the default
-        configuration. It then creates a frame and announces and queues it
-        to the camera. Finally, starts the capture mode.
+        configuration. It then creates ``n_frames`` frames, announces and
+        queues them to the camera, and preallocates a `.FrameRing` into which
+        the frame data will be copied. Finally, starts the capture mode.
 
         """
 
@@ -560,14 +621,29 @@ class MantaCamera(object):
         self.open = True
         self.camera_id = camera_id
 
-        self.frame = self.camera.getFrame()
-        log.debug('got new frame.')
+        n_frames = N_FRAMES
+        n_buffers = N_BUFFERS
+        max_in_flight = 0
+        if self.actor:
+            n_frames = self.actor.config['cameras'].get('n_frames', N_FRAMES)
+            n_buffers = self.actor.config['cameras'].get('n_buffers', N_BUFFERS)
+            # The frames in the pipeline plus the one being handed to the reactor.
+            max_in_flight = self.actor.pipeline.queue_depth + 1
+
+        self.frames = [self.camera.getFrame() for __ in range(n_frames)]
+        log.debug('got {} new frames.'.format(n_frames))
 
-        self.frame.announceFrame()
-        log.debug('announced frame.')
+        for frame in self.frames:
+            frame.announceFrame()
+        log.debug('announced frames.')
 
-        self.frame.queueFrameCapture(self.frame_callback)
-        log.debug('queued frame.')
+        self.frame_ring = FrameRing(n_buffers, (self.frames[0].height, self.frames[0].width),
+                                    max_in_flight=max_in_flight)
+        log.debug('allocated {} image buffers.'.format(n_buffers))
+
+        for frame in self.frames:
+            frame.queueFrameCapture(self.frame_callback)
+        log.debug('queued frames.')
 
         self.camera.startCapture()
         log.debug('starting camera capture.')
@@ -612,8 +688,9 @@ class MantaCamera(object):
         """Frame callback that gets caled when the frame is filled.
 
         This callback is called when ``ExposureTimeAbs`` has passed and the
-        frame is filled. It retrieves the image data and creates a
-        ``MantaExposure`` object. It then requeues the frame for future use.
+        frame is filled. It copies the image data into the next buffer of the
+        `.FrameRing` and creates a ``MantaExposure`` object. It then requeues
+        the frame for future use.
 
         If ``MantaCamera.exposure`` has been called with a ``call_back_func``,
         it calls that function and passes it the ``MantaExposure`` object.
@@ -622,16 +699,14 @@ class MantaCamera(object):
 
         # log.debug('frame callback called. Processing image.')
 
-        img_buffer = frame.getBufferByteData()
-        img_data_array = np.ndarray(buffer=img_buffer,
-                                    dtype=np.uint16,
-                                    shape=(frame.height, frame.width))
+        img_data_array = self.frame_ring.copy(frame.getBufferByteData())
+
+        # The data has been copied so the frame can be given back to the camera.
+        frame.queueFrameCapture(self.frame_callback)
 
         self._last_exposure = MantaExposure(img_data_array,
                                             self.camera.ExposureTimeAbs / 1e6,
                                             self.camera.cameraIdString)
-
-        self.frame.queueFrameCapture(self.frame_callback)
         # log.debug('requeued frame.')
 
         self.is_busy = False
@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# tcc_connection.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import collections
+import random
+
+from twisted.internet import reactor, task
+
+from bmo.logger import log
+
+
+__all__ = ('ConnectionManager', 'PendingRequest')
+
+
+# These parameters can be overridden by the actor configuration.
+INITIAL_DELAY = 1.      # Seconds before the first reconnection attempt.
+MAX_DELAY = 30.         # Maximum seconds between reconnection attempts.
+FACTOR = 2.             # Factor by which the delay increases after each failed attempt.
+JITTER = 0.25           # Fraction of the delay that is randomised.
+CONNECT_TIMEOUT = 2.    # Seconds to wait for a connection attempt to succeed.
+WATCH_INTERVAL = 5.     # Seconds between checks of the connection.
+QUEUE_SIZE = 8          # Maximum number of requests waiting for the connection.
+STATUS_DEADLINE = 30.   # Seconds during which a status request is kept in the queue.
+OFFSET_DEADLINE = 10.   # Seconds during which an offset is kept in the queue.
+
+
+class PendingRequest(object):
+    """A request to the TCC waiting for the connection.
+
+    Parameters:
+        func (function):
+            The `.TCCDevice` method to call, as ``func(device, user_cmd=user_cmd, **kwargs)``.
+        user_cmd (command):
+            The command of the request. It is failed if the request expires.
+        kwargs (dict):
+            Keyword arguments to pass to ``func``.
+
+    """
+
+    def __init__(self, func, user_cmd, kwargs=None):
+
+        self.func = func
+        self.user_cmd = user_cmd
+        self.kwargs = kwargs or {}
+
+        self.timer = None
+
+    @property
+    def name(self):
+        return self.func.__name__
+
+
+class ConnectionManager(object):
+    """Keeps the connection to the TCC and queues requests while it is down.
+
+    When the connection is lost, reconnects with exponential backoff: the
+    n-th failed attempt is followed by a wait of ``initial_delay * factor**n``
+    seconds, up to ``max_delay``, randomised by ``jitter``. Requests made
+    while disconnected are kept in a bounded queue and replayed in order
+    when the connection is restored. A request that has been in the queue
+    longer than its deadline is failed, so that old offsets are not applied.
+
+    The state of the connection and the queue are output as the
+    ``tccConnection`` and ``tccQueue`` keywords.
+
+    Parameters:
+        device (`.TCCDevice`):
+            The device to connect.
+        initial_delay (float):
+            The seconds before the first reconnection attempt.
+        max_delay (float):
+            The maximum seconds between attempts.
+        factor (float):
+            The factor by which the delay increases after each failed attempt.
+        jitter (float):
+            The fraction of the delay that is randomised.
+        connect_timeout (float):
+            The seconds to wait for an attempt to succeed.
+        watch_interval (float):
+            The seconds between checks of the connection, once `.start` has
+            been called.
+        queue_size (int):
+            The maximum number of requests waiting for the connection.
+        deadlines (dict):
+            The seconds during which each kind of request, keyed by the name
+            of the `.TCCDevice` method, is kept in the queue.
+        clock (object):
+            The object used to schedule calls. Defaults to the reactor.
+
+    """
+
+    def __init__(self, device, initial_delay=INITIAL_DELAY, max_delay=MAX_DELAY, factor=FACTOR,
+                 jitter=JITTER, connect_timeout=CONNECT_TIMEOUT, watch_interval=WATCH_INTERVAL,
+                 queue_size=QUEUE_SIZE, deadlines=None, clock=None):
+
+        self.device = device
+
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.connect_timeout = connect_timeout
+        self.watch_interval = watch_interval
+
+        self.queue_size = queue_size
+        self.deadlines = deadlines or {'update_status': STATUS_DEADLINE,
+                                       'offset': OFFSET_DEADLINE}
+
+        self.clock = clock or reactor
+
+        self.queue = collections.deque()
+
+        self.attempts = 0
+        self.reconnecting = False
+        self.next_attempt = None
+
+        self._watch_loop = None
+        self._last_state = None
+
+    @classmethod
+    def from_config(cls, device, config):
+        """Creates a manager using the ``tcc.reconnect`` section of the configuration."""
+
+        reconnect_config = config.get('tcc', {}).get('reconnect', {})
+
+        deadlines = {'update_status': reconnect_config.get('status_deadline', STATUS_DEADLINE),
+                     'offset': reconnect_config.get('offset_deadline', OFFSET_DEADLINE)}
+
+        return cls(device,
+                   initial_delay=reconnect_config.get('initial_delay', INITIAL_DELAY),
+                   max_delay=reconnect_config.get('max_delay', MAX_DELAY),
+                   factor=reconnect_config.get('factor', FACTOR),
+                   jitter=reconnect_config.get('jitter', JITTER),
+                   connect_timeout=reconnect_config.get('connect_timeout', CONNECT_TIMEOUT),
+                   watch_interval=reconnect_config.get('watch_interval', WATCH_INTERVAL),
+                   queue_size=reconnect_config.get('queue_size', QUEUE_SIZE),
+                   deadlines=deadlines)
+
+    @property
+    def state(self):
+        """The state of the connection: connected, reconnecting, or disconnected."""
+
+        if self.device.isConnected:
+            return 'connected'
+        elif self.reconnecting:
+            return 'reconnecting'
+
+        return 'disconnected'
+
+    def get_delay(self, attempt):
+        """Returns the seconds to wait after ``attempt`` failed attempts."""
+
+        delay = min(self.max_delay, self.initial_delay * self.factor ** attempt)
+
+        return delay * random.uniform(1. - self.jitter, 1. + self.jitter)
+
+    def enqueue(self, func, user_cmd, **kwargs):
+        """Queues a request until the TCC is connected and starts reconnecting.
+
+        Fails ``user_cmd`` if the queue is full. Returns ``user_cmd``.
+
+        """
+
+        if len(self.queue) >= self.queue_size:
+            user_cmd.setState(user_cmd.Failed, 'TCC is disconnected and the request '
+                                               'queue is full.')
+            return user_cmd
+
+        request = PendingRequest(func, user_cmd, kwargs)
+        request.timer = self.clock.callLater(self.deadlines.get(request.name, STATUS_DEADLINE),
+                                             self._expire, request)
+
+        self.queue.append(request)
+        log.warning('TCC is disconnected. Queued {0} ({1} in queue).'.format(request.name,
+                                                                             len(self.queue)))
+
+        self.reconnect()
+        self.update_keywords()
+
+        return user_cmd
+
+    def _expire(self, request):
+        """Fails a request that has been in the queue longer than its deadline."""
+
+        if request in self.queue:
+            self.queue.remove(request)
+
+        request.user_cmd.setState(request.user_cmd.Failed,
+                                  'TCC is disconnected. {0} expired.'.format(request.name))
+
+        self.update_keywords()
+
+    def reconnect(self):
+        """Starts reconnecting, if not already doing it."""
+
+        if self.reconnecting:
+            return
+
+        if self.device.isConnected:
+            self._connected()
+            return
+
+        self.reconnecting = True
+        self.attempts = 0
+
+        self._attempt()
+
+    def _attempt(self):
+        """Tries to connect and checks the result after ``connect_timeout``."""
+
+        self.next_attempt = None
+        self.attempts += 1
+
+        log.info('reconnecting to TCC (attempt {0}).'.format(self.attempts))
+
+        try:
+            self.device.connect()
+        except Exception as ee:
+            log.warning('failed to reconnect to TCC: {0}'.format(ee))
+
+        self.update_keywords()
+
+        self.next_attempt = self.clock.callLater(self.connect_timeout, self._check_attempt)
+
+    def _check_attempt(self):
+        """Replays the queue if connected. Otherwise, schedules the next attempt."""
+
+        self.next_attempt = None
+
+        if self.device.isConnected:
+            self._connected()
+            return
+
+        delay = self.get_delay(self.attempts - 1)
+        log.warning('TCC reconnection attempt {0} failed. '
+                    'Retrying in {1:.1f} s.'.format(self.attempts, delay))
+
+        self.next_attempt = self.clock.callLater(delay, self._attempt)
+        self.update_keywords()
+
+    def _connected(self):
+        """Replays the queued requests."""
+
+        if self.reconnecting:
+            log.info('reconnected to TCC after {0} attempts.'.format(self.attempts))
+
+        self.reconnecting = False
+        self.attempts = 0
+
+        while self.queue:
+
+            request = self.queue.popleft()
+            if request.timer is not None and request.timer.active():
+                request.timer.cancel()
+
+            log.info('replaying queued {0}.'.format(request.name))
+            request.func(self.device, user_cmd=request.user_cmd, **request.kwargs)
+
+        self.update_keywords()
+
+    def _watch(self):
+        """Starts reconnecting if the connection has been lost."""
+
+        if not self.device.isConnected and not self.reconnecting:
+            log.warning('TCC connection lost.')
+            self.reconnect()
+        elif self.state != self._last_state:
+            self.update_keywords()
+
+    def start(self):
+        """Checks the connection every ``watch_interval`` seconds and reconnects it if lost."""
+
+        if self._watch_loop is not None and self._watch_loop.running:
+            return
+
+        self._watch_loop = task.LoopingCall(self._watch)
+        self._watch_loop.clock = self.clock
+        self._watch_loop.start(self.watch_interval, now=False)
+
+    def stop(self):
+        """Stops reconnecting and fails the queued requests."""
+
+        if self._watch_loop is not None and self._watch_loop.running:
+            self._watch_loop.stop()
+
+        if self.next_attempt is not None and self.next_attempt.active():
+            self.next_attempt.cancel()
+
+        self.next_attempt = None
+        self.reconnecting = False
+
+        while self.queue:
+            request = self.queue.popleft()
+            if request.timer is not None and request.timer.active():
+                request.timer.cancel()
+            request.user_cmd.setState(request.user_cmd.Failed, 'TCC connection stopped.')
+
+        self.update_keywords()
+
+    def update_keywords(self, actor=None):
+        """Outputs the ``tccConnection`` and ``tccQueue`` keywords.
+
+        ``tccConnection`` is the state of the connection, the number of
+        reconnection attempts, and the seconds to the next attempt, or -999.
+        ``tccQueue`` is the number of queued requests and the size of the
+        queue. If ``actor`` is not set, the keywords are written through the
+        device, if it is connected to the actor.
+
+        """
+
+        self._last_state = self.state
+
+        writer = actor if actor is not None else self.device
+        if getattr(writer, 'writeToUsers', None) is None:
+            return
+
+        if self.next_attempt is not None and self.next_attempt.active():
+            next_attempt = max(self.next_attempt.getTime() - self.clock.seconds(), 0.)
+        else:
+            next_attempt = -999
+
+        writer.writeToUsers('i', 'tccConnection="{0}",{1},{2:.1f}'.format(
+            self._last_state, self.attempts, next_attempt))
+        writer.writeToUsers('i', 'tccQueue={0},{1}'.format(len(self.queue), self.queue_size))
@@ -10,21 +10,33 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import absolute_import
 
-import re
-
 from twisted.internet import reactor
 
 from twistedActor.device import TCPDevice, expandUserCmd
 
+from bmo import config
 from bmo.logger import log
-from bmo.utils import get_plateid
+from bmo.plates import CartridgeCache
+from bmo.timing import monotonic
 
 from . import check_connection
+from .tcc_connection import ConnectionManager
+from .tcc_keywords import parse_reply
+
+
+# The attributes that update_status waits for.
+STATUS_ATTRIBUTES = ('instrumentNum', 'axis_states', 'tcc_pos')
+
+# These parameters can be overridden by the actor configuration.
+STATUS_MAX_AGE = 2      # Seconds during which the cached status is used.
 
 
 class TCCState(object):
 
-    def __init__(self):
+    def __init__(self, cartridge_cache=None):
+
+        # The cartridge cache is kept when the state is reset.
+        self.cartridge_cache = cartridge_cache or CartridgeCache.from_config(config)
 
         self.myUserID = None
         self._instrumentNum = None
@@ -38,10 +50,13 @@ class TCCState(object):
 
         self.plateid_callback = None
 
+        # attribute -> monotonic time at which it was last received.
+        self.timestamps = {}
+
     def reset(self):
         """Resets the status."""
 
-        self.__init__()
+        self.__init__(cartridge_cache=self.cartridge_cache)
 
     def clear_status(self):
         """Clears status attributes."""
@@ -50,11 +65,61 @@ class TCCState(object):
         self.plate_id = None
         self.axis_states = None
 
-    def is_status_complete(self):
-        """Returns True if all the status attribute have been set."""
-        if self.instrumentNum and self.axis_states and self.tcc_pos:
-            return True
-        return False
+        for attribute in STATUS_ATTRIBUTES:
+            self.timestamps.pop(attribute, None)
+
+    def update(self, attribute, value):
+        """Sets an attribute received from the TCC and records when it was received."""
+
+        setattr(self, attribute, value)
+        self.timestamps[attribute] = monotonic()
+
+    def get_age(self, attribute):
+        """Returns the seconds since ``attribute`` was received, or ``None``."""
+
+        if attribute not in self.timestamps:
+            return None
+
+        return monotonic() - self.timestamps[attribute]
+
+    def is_fresh(self, max_age, attributes=STATUS_ATTRIBUTES):
+        """Returns True if all ``attributes`` were received in the last ``max_age`` seconds.
+
+        ``max_age`` can also be a dictionary of maximum ages keyed by
+        attribute, for keywords that the TCC only outputs when they change.
+        Attributes not in the dictionary use `.STATUS_MAX_AGE`.
+
+        """
+
+        for attribute in attributes:
+
+            age = self.get_age(attribute)
+
+            if isinstance(max_age, dict):
+                attribute_max_age = max_age.get(attribute, STATUS_MAX_AGE)
+            else:
+                attribute_max_age = max_age
+
+            if age is None or age > attribute_max_age:
+                return False
+
+        return True
+
+    def is_status_complete(self, since=None):
+        """Returns True if all the status attributes have been received.
+
+        If ``since`` is set, they must have been received after that
+        monotonic time.
+
+        """
+
+        for attribute in STATUS_ATTRIBUTES:
+            if attribute not in self.timestamps:
+                return False
+            if since is not None and self.timestamps[attribute] < since:
+                return False
+
+        return True
 
     @property
     def instrumentNum(self):
@@ -62,13 +127,21 @@ class TCCState(object):
 
     @instrumentNum.setter
     def instrumentNum(self, value):
-        if value > 0:
+        if value is not None and value > 0:
             self._instrumentNum = value
-            self.plate_id = get_plateid(value)
+            # Served from the cache. If the entry is missing or stale, it is
+            # refreshed in a thread and _cartridge_refreshed updates plate_id.
+            self.plate_id = self.cartridge_cache.get(value, callback=self._cartridge_refreshed)
         else:
             self._instrumentNum = value
             self.plate_id = None
 
+    def _cartridge_refreshed(self, cart_id, plate_id):
+        """Updates the plate_id when the cartridge cache is refreshed."""
+
+        if cart_id == self._instrumentNum:
+            self.plate_id = plate_id
+
     @property
     def plate_id(self):
         return self._plate_id
@@ -102,34 +175,36 @@ class TCCDevice(TCPDevice):
 
         self.dev_state = TCCState()
         self.status_cmd = expandUserCmd(None)
+        self.status_requested = None
         self.actor = actor
 
         TCPDevice.__init__(self, name=name, host=host, port=port, callFunc=callFunc, cmdInfo=())
 
+        self.connection_manager = ConnectionManager.from_config(self, config)
+
     def _check_connection(self, call_func, user_cmd=None, retry=False, **kwargs):
         """Checks the connection.
 
-        If the device is disconnected and retry is False, reconnects and
-        calls itself after a wait period. If it is still disconnected, fails
-        the command.
+        If the device is connected, calls ``call_func``. Otherwise, if
+        ``retry=True``, the request is queued in the `.ConnectionManager`,
+        which reconnects and replays it, or fails it if it cannot reconnect
+        before the deadline of the request. If ``retry=False``, the command
+        is failed.
 
         Parameters:
             call_func (function):
                 The function that will be run if the device is connected.
             user_cmd (command or None):
-                The command to pass to ``call_func``. It is failed if the
-                TCC is disconnected and ``retry=False``.
+                The command to pass to ``call_func``.
             retry (bool):
-                If True, tries to reconnect the TCC. When that happens,
-                `~TCCDevice._check_connection` calls itself with
-                ``retry=False``, which fails the command if the TCC is
-                disconnected
+                If True, queues the request until the TCC is reconnected.
             kwargs (dict):
                 Keyword arguments to pass to ``call_func``.
 
         """
 
-        status_check_cmd = expandUserCmd(user_cmd)
+        if self.isConnected:
+            return call_func(self, user_cmd=user_cmd, **kwargs)
 
         log.debug('TCCDevice isDisconnected={!r}, isConnected={!r}, '
                   'isDisconnecting={!r}, state={!r}'.format(self.isDisconnected,
@@ -137,23 +212,40 @@ class TCCDevice(TCPDevice):
                                                             self.isDisconnecting,
                                                             self.state))
 
-        if self.isDisconnected or self.isDisconnecting:
+        status_check_cmd = expandUserCmd(user_cmd)
 
-            log.warning('TCC is disconnected.', self)
+        if retry:
+            return self.connection_manager.enqueue(call_func, status_check_cmd, **kwargs)
 
-            if retry:
-                log.warning('trying to reconnect to TCC.')
-                self.connect()
-                reactor.callLater(2, self._check_connection, call_func, user_cmd=user_cmd,
-                                  retry=False, **kwargs)
-                return status_check_cmd
-            else:
-                log.warning('failed to reconnect to TCC. Failing command ...')
-                status_check_cmd.setState(status_check_cmd.Failed, 'TCC is disconnected.')
+        log.warning('TCC is disconnected. Failing command ...', self)
+        status_check_cmd.setState(status_check_cmd.Failed, 'TCC is disconnected.')
 
-        else:
+        return status_check_cmd
 
-            return call_func(self, user_cmd=user_cmd, **kwargs)
+    def get_status(self, user_cmd=None, max_age=None):
+        """Returns a command that finishes when the TCC status is up to date.
+
+        If the status attributes were received in the last ``max_age``
+        seconds, for example as unsolicited keywords, the command finishes
+        in the next reactor iteration without querying the TCC. Otherwise,
+        calls `.update_status`. ``max_age`` can be a number or a dictionary
+        keyed by attribute (see `.TCCState.is_fresh`). If ``None``, the
+        ``tcc.status_max_age`` configuration value is used.
+
+        """
+
+        if max_age is None:
+            max_age = config.get('tcc', {}).get('status_max_age', STATUS_MAX_AGE)
+
+        if not self.dev_state.is_fresh(max_age):
+            return self.update_status(user_cmd)
+
+        status_cmd = expandUserCmd(user_cmd)
+
+        # The callbacks are added after this method returns.
+        reactor.callLater(0, status_cmd.setState, status_cmd.Done, 'TCC status is up to date.')
+
+        return status_cmd
 
     @check_connection
     def update_status(self, user_cmd=None, **kwargs):
@@ -163,7 +255,10 @@ class TCCDevice(TCPDevice):
 
         self.status_cmd.setTimeLimit(5)
         self.status_cmd.setState(self.status_cmd.Running)  # must be running to start timer!
-        self.dev_state.clear_status()
+
+        # The cached values are kept. The command finishes when all the
+        # status attributes have been received again.
+        self.status_requested = monotonic()
 
         try:
             self.conn.writeLine('999 device status')
@@ -218,39 +313,17 @@ class TCCDevice(TCPDevice):
 
     def handleReply(self, replyStr):
 
-        # a less fickle TCC KW listener.
-        replyStr = replyStr.strip().lower()  # lower everything to avoid case sensensitivity
-
-        if not replyStr:
-            return  # ignore unsolicited response
-
-        cmdID, userID, tccKWs = replyStr.split(None, 2)
-        cmdID, userID = int(cmdID), int(userID)
-
-        if cmdID == 0 and 'youruserid' in tccKWs:
-            pattern = '.* youruserid=([0-9]+).*'
-            self.dev_state.myUserID = int(re.match(pattern, tccKWs).group(1))
-
-        for tccKW in tccKWs.split(';'):
-
-            if 'instrumentnum' in tccKW:
-                pattern = '.*instrumentnum=(-?[0-9]+).*'
-                instrumentNum = int(re.match(pattern, tccKW, re.IGNORECASE).group(1))
-                self.dev_state.instrumentNum = instrumentNum
+        reply = parse_reply(replyStr)
 
-            elif 'axiscmdstate' in tccKW:
-                axis_states = tccKW.split('=')[1].split(',')
-                axesStates = [xx.strip().lower() for xx in axis_states]
-                self.dev_state.axis_states = axesStates
+        if reply is None:
+            return  # ignore empty or malformed replies
 
-            elif 'secorient' in tccKW:
-                secOrient = tccKW.split('=')[-1]
-                self.dev_state.secOrient = secOrient
+        for attribute, value in reply.values:
+            self.dev_state.update(attribute, value)
 
-            elif 'tccpos' in tccKW:
-                tcc_pos = tccKW.split('=')[1].split(',')
-                tcc_pos = [float(xx.strip().lower()) for xx in tcc_pos]
-                self.dev_state.tcc_pos = tcc_pos
+        for name, value, error in reply.errors:
+            log.debug('cannot parse TCC keyword {0}={1}: {2}'.format(name, value, error))
 
-        if self.dev_state.is_status_complete() and not self.status_cmd.isDone:
+        if (not self.status_cmd.isDone and
+                self.dev_state.is_status_complete(since=self.status_requested)):
             self.status_cmd.setState(self.status_cmd.Done, 'TCC status has been updated.')
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# tcc_keywords.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import collections
+
+
+__all__ = ('Keyword', 'KEYWORDS', 'KeywordParser', 'TCCReply', 'parse_reply')
+
+
+def _to_lower_list(value):
+    """Splits a comma-separated value into stripped, lower-case strings."""
+
+    return [item.strip().lower() for item in value.split(',')]
+
+
+def _to_float_list(value):
+    """Splits a comma-separated value into floats."""
+
+    # float ignores the surrounding whitespace.
+    return [float(item) for item in value.split(',')]
+
+
+def _to_str(value):
+    """Returns the stripped value."""
+
+    return value.strip()
+
+
+#: A keyword from the TCC that updates ``attribute`` in `.TCCState` with the
+#: result of ``parse(value)``.
+Keyword = collections.namedtuple('Keyword', ('name', 'attribute', 'parse'))
+
+#: The keywords used by BMO, keyed by lower-case name. The TCC outputs many
+#: other keywords, which are ignored with a single dictionary lookup.
+KEYWORDS = dict((keyword.name, keyword) for keyword in [
+    Keyword('youruserid', 'myUserID', int),
+    Keyword('instrumentnum', 'instrumentNum', int),
+    Keyword('axiscmdstate', 'axis_states', _to_lower_list),
+    Keyword('secorient', 'secOrient', _to_str),
+    Keyword('tccpos', 'tcc_pos', _to_float_list)])
+
+
+#: A parsed TCC reply. ``values`` is a list of ``(attribute, value)`` in the
+#: order in which the keywords were received, and ``errors`` a list of
+#: ``(keyword, raw value, error message)`` for the values that could not be
+#: parsed.
+TCCReply = collections.namedtuple('TCCReply', ('cmd_id', 'user_id', 'code', 'values', 'errors'))
+
+
+class KeywordParser(object):
+    """Parses TCC replies using a table of keywords.
+
+    Each keyword in a reply is looked up by name in the table with a single
+    dictionary lookup, so the many keywords that BMO does not use are
+    skipped without further work. The values of the known keywords are
+    converted to the type expected by `.TCCState`. Keyword names are
+    case-insensitive and must match exactly.
+
+    Parameters:
+        keywords (dict):
+            A dictionary of `.Keyword`, keyed by lower-case name.
+
+    """
+
+    def __init__(self, keywords=KEYWORDS):
+
+        self.keywords = keywords
+
+    def parse(self, reply):
+        """Parses a TCC reply.
+
+        Returns a `.TCCReply` or ``None`` if the reply is empty or
+        malformed.
+
+        """
+
+        # <cmdID> <userID> <msgCode> <keywords>
+        words = reply.split(None, 3)
+        if len(words) < 3:
+            return None
+
+        try:
+            cmd_id, user_id = int(words[0]), int(words[1])
+        except ValueError:
+            return None
+
+        code = words[2]
+
+        values = []
+        errors = []
+
+        if len(words) == 4:
+
+            get_keyword = self.keywords.get
+
+            for item in words[3].split(';'):
+
+                name, __, value = item.partition('=')
+
+                keyword = get_keyword(name.strip().lower(), None)
+                if keyword is None:
+                    continue
+
+                try:
+                    values.append((keyword.attribute, keyword.parse(value)))
+                except ValueError as ee:
+                    errors.append((keyword.name, value, str(ee)))
+
+        return TCCReply(cmd_id, user_id, code, values, errors)
+
+
+#: Parses a TCC reply with the default keywords. See `.KeywordParser.parse`.
+parse_reply = KeywordParser().parse
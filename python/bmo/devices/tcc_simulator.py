@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# tcc_simulator.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from twisted.internet import reactor, task
+from twisted.internet.protocol import ServerFactory
+from twisted.protocols.basic import LineReceiver
+
+
+__all__ = ('TCCSimulator', 'TCCSimulatorProtocol')
+
+
+class TCCSimulatorProtocol(LineReceiver):
+    """A connection to the `.TCCSimulator`.
+
+    Accepts ``<cmdID> device status`` and ``<cmdID> guideoffset ...``
+    commands and replies with ``<cmdID> <userID> <msgCode> <keywords>``, as
+    the LCO TCC does.
+
+    """
+
+    delimiter = b'\n'
+
+    def connectionMade(self):
+
+        self.user_id = self.factory.add_client(self)
+        self.n_commands = 0
+
+        self.send_reply(0, 'i', ['YourUserID={0}'.format(self.user_id)])
+
+    def connectionLost(self, reason):
+
+        self.factory.remove_client(self)
+
+    def send_reply(self, cmd_id, code, keywords=()):
+        """Sends a reply to the client."""
+
+        reply = '{0} {1} {2} {3}'.format(cmd_id, self.user_id, code, '; '.join(keywords))
+
+        self.sendLine(reply.strip().encode())
+
+    def lineReceived(self, line):
+
+        line = line.decode().strip()
+        if not line:
+            return
+
+        self.n_commands += 1
+
+        try:
+            cmd_id, command = line.split(None, 1)
+            cmd_id = int(cmd_id)
+        except ValueError:
+            self.send_reply(0, 'f', ['Text="cannot parse command {0!r}"'.format(line)])
+            return
+
+        self.factory.commands.append(command)
+
+        if (self.factory.disconnect_after is not None and
+                self.n_commands >= self.factory.disconnect_after):
+            self.transport.loseConnection()
+            return
+
+        self.factory.call_later(self.factory.reply_delay, self.reply, cmd_id, command)
+
+    def reply(self, cmd_id, command):
+        """Replies to a command."""
+
+        if not self.connected:
+            return
+
+        verb = command.split()[0].lower()
+
+        if command.lower() == 'device status':
+            self.send_reply(cmd_id, 'i', self.factory.get_status_keywords())
+            self.send_reply(cmd_id, ':')
+
+        elif verb == 'guideoffset':
+            try:
+                offset = [float(value) for value in command.split(None, 1)[1].split(',')]
+            except (IndexError, ValueError):
+                self.send_reply(cmd_id, 'f', ['Text="invalid guideoffset"'])
+                return
+            self.factory.offsets.append(offset)
+            self.send_reply(cmd_id, ':')
+
+        else:
+            self.send_reply(cmd_id, 'f', ['Text="unknown command {0!r}"'.format(command)])
+
+
+class TCCSimulator(ServerFactory):
+    """A stand-in for the LCO TCC.
+
+    Listens for connections from `.TCCDevice` and replies to the
+    ``device status`` and ``guideoffset`` commands. It can also output
+    unsolicited keywords periodically, delay its replies, and drop the
+    connection after a number of commands, to test the behaviour of the
+    actor with a slow or unreliable TCC.
+
+    Parameters:
+        instrument_num (int):
+            The cartridge loaded.
+        axis_states (list):
+            The ``AxisCmdState`` of the three axes.
+        tcc_pos (list):
+            The az, alt, and rotator positions.
+        sec_orient (list):
+            The orientation of the secondary.
+        reply_delay (float):
+            The number of seconds to wait before replying to a command.
+        stream_interval (float or None):
+            If set, the number of seconds between the outputs of
+            ``stream_keywords`` to all the clients.
+        stream_keywords (list or None):
+            The unsolicited keywords, as ``Name=value`` strings. If
+            ``None``, the ``AxisCmdState`` and ``TCCPos`` keywords are used.
+        disconnect_after (int or None):
+            If set, the connection is dropped when a client sends this many
+            commands.
+
+    """
+
+    protocol = TCCSimulatorProtocol
+
+    def __init__(self, instrument_num=12, axis_states=None, tcc_pos=None, sec_orient=None,
+                 reply_delay=0., stream_interval=None, stream_keywords=None,
+                 disconnect_after=None):
+
+        self.instrument_num = instrument_num
+        self.axis_states = axis_states or ['Tracking', 'Tracking', 'Tracking']
+        self.tcc_pos = tcc_pos or [121.5, 60.25, 15.]
+        self.sec_orient = sec_orient or [1263.5, -0.01, 0., 0., 0.]
+
+        self.reply_delay = reply_delay
+        self.stream_interval = stream_interval
+        self.stream_keywords = stream_keywords
+        self.disconnect_after = disconnect_after
+
+        self.clients = []
+        self.commands = []
+        self.offsets = []
+
+        self._next_user_id = 1
+
+        self.port = None
+        self._stream_loop = None
+        self._delayed_calls = set()
+
+    def call_later(self, delay, func, *args):
+        """Calls ``func`` after ``delay`` seconds. The call is cancelled by `.stop`."""
+
+        def _call():
+            self._delayed_calls.discard(delayed_call)
+            func(*args)
+
+        delayed_call = reactor.callLater(delay, _call)
+        self._delayed_calls.add(delayed_call)
+
+    def add_client(self, client):
+        """Registers a client. Returns its user ID."""
+
+        self.clients.append(client)
+
+        user_id = self._next_user_id
+        self._next_user_id += 1
+
+        return user_id
+
+    def remove_client(self, client):
+        """Unregisters a client."""
+
+        if client in self.clients:
+            self.clients.remove(client)
+
+    def get_status_keywords(self):
+        """Returns the keywords output in reply to ``device status``."""
+
+        return ['InstrumentNum={0}'.format(self.instrument_num),
+                'AxisCmdState={0}'.format(', '.join(self.axis_states)),
+                'TCCPos={0}'.format(', '.join('{0:.6f}'.format(xx) for xx in self.tcc_pos)),
+                'SecOrient={0}'.format(', '.join('{0:.2f}'.format(xx)
+                                                 for xx in self.sec_orient))]
+
+    def broadcast(self, keywords, code='i'):
+        """Outputs unsolicited keywords to all the clients."""
+
+        for client in list(self.clients):
+            client.send_reply(0, code, keywords)
+
+    def set_instrument(self, instrument_num):
+        """Changes the cartridge and outputs ``InstrumentNum``."""
+
+        self.instrument_num = instrument_num
+        self.broadcast(['InstrumentNum={0}'.format(instrument_num)])
+
+    def _stream(self):
+
+        if self.stream_keywords is not None:
+            keywords = self.stream_keywords
+        else:
+            keywords = self.get_status_keywords()[1:3]
+
+        self.broadcast(keywords)
+
+    def start_stream(self, interval):
+        """Outputs the stream keywords every ``interval`` seconds."""
+
+        self.stop_stream()
+
+        self._stream_loop = task.LoopingCall(self._stream)
+        self._stream_loop.start(interval, now=False)
+
+    def stop_stream(self):
+        """Stops the unsolicited keywords."""
+
+        if self._stream_loop is not None and self._stream_loop.running:
+            self._stream_loop.stop()
+
+    def disconnect_all(self):
+        """Drops the connection to all the clients."""
+
+        for client in list(self.clients):
+            client.transport.loseConnection()
+
+    def listen(self, port=0, interface='127.0.0.1'):
+        """Starts listening. Returns the port number, which is random if ``port=0``."""
+
+        self.port = reactor.listenTCP(port, self, interface=interface)
+
+        if self.stream_interval is not None:
+            self.start_stream(self.stream_interval)
+
+        return self.port.getHost().port
+
+    def stop(self):
+        """Disconnects the clients and stops listening. Returns a deferred."""
+
+        self.stop_stream()
+        self.disconnect_all()
+
+        for delayed_call in self._delayed_calls:
+            if delayed_call.active():
+                delayed_call.cancel()
+        self._delayed_calls.clear()
+
+        if self.port is None:
+            return None
+
+        port, self.port = self.port, None
+
+        return port.stopListening()
@@ -0,0 +1,622 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# display.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import collections
+import re
+import threading
+import warnings
+
+import numpy as np
+
+from twisted.internet import defer, reactor
+from twisted.python import failure
+
+from bmo import config
+from bmo.exceptions import BMOError, BMOUserWarning
+from bmo.shm import SharedMemorySegment
+from bmo.timing import monotonic
+
+try:
+    import pyds9
+except ImportError:
+    warnings.warn('cannot import pyds9. DS9 features will not work!!', BMOUserWarning)
+    pyds9 = None
+
+
+__all__ = ('DS9Session', 'DS9Proxy', 'decimate_image')
+
+
+# These parameters can be overridden by the actor configuration.
+TIMEOUT = 10        # Seconds after which a DS9 call fails.
+BINNING = 1         # Binning factor of the images sent to DS9.
+METHOD = 'mean'     # How to bin the images: 'mean' or 'subsample'.
+DTYPE = None        # The dtype of the images sent to DS9. None keeps the image dtype.
+TRANSPORT = 'xpa'   # How to send the images to DS9: 'xpa' or 'shm'.
+
+
+def decimate_image(image, binning=BINNING, method=METHOD, dtype=DTYPE):
+    """Returns a decimated copy of ``image`` for display.
+
+    Parameters:
+        image (`numpy.ndarray`):
+            The image to decimate.
+        binning (int):
+            The binning factor along each axis. If the image shape is not a
+            multiple of ``binning``, the last rows and columns are dropped.
+        method (str):
+            ``'mean'`` to average each block of pixels or ``'subsample'`` to
+            keep one pixel per block.
+        dtype (str or None):
+            The dtype of the output image. If ``'uint16'``, the image is
+            clipped to the valid range before conversion.
+
+    """
+
+    assert method in ['mean', 'subsample'], 'invalid method {0!r}'.format(method)
+
+    if binning > 1:
+        ny, nx = image.shape[0] // binning, image.shape[1] // binning
+        if method == 'subsample':
+            image = image[:ny * binning:binning, :nx * binning:binning]
+        else:
+            # Adding strided views is several times faster than reshaping
+            # and averaging over the block axes.
+            binned = np.zeros((ny, nx), dtype=np.float32 if dtype else np.float64)
+            for yy in range(binning):
+                for xx in range(binning):
+                    binned += image[yy:ny * binning:binning, xx:nx * binning:binning]
+            binned /= binning**2
+            image = binned
+
+    if dtype is not None:
+        dtype = np.dtype(dtype)
+        if dtype == np.uint16:
+            image = np.clip(np.round(image), 0, np.iinfo(np.uint16).max)
+        image = image.astype(dtype, copy=False)
+
+    return image
+
+
+class DS9Session(object):
+    """A DS9 connection that minimises the number of XPA round trips.
+
+    Wraps a ``pyds9.DS9`` instance and keeps track of the state of DS9 so that
+    redundant commands are not sent. The zoom of a frame is only set when it
+    changes, or to fit the first time an image is displayed in it, and all
+    the regions of an image are sent in a single call. If
+    ``cache_frame=True``, ``frame N`` commands are skipped when ``N`` is
+    already the current frame; this is only safe if the operators do not
+    change the current frame from the DS9 window.
+
+    Images can be binned and converted to a smaller dtype before they are
+    sent with `.decimate_image`. The regions are scaled to the binned image,
+    and `.get_binning` returns the factor needed to convert the positions of
+    the regions back to full-resolution pixels.
+
+    Images are sent through XPA (``transport='xpa'``) or, if DS9 runs in the
+    same host, written to a System V shared memory segment for each frame,
+    which DS9 loads with its ``shm`` command (``transport='shm'``). If shared
+    memory is not available, XPA is used.
+
+    `.set` and `.get` can be used as with ``pyds9.DS9``. Commands that
+    modify the frames invalidate the cached state.
+
+    Parameters:
+        ds9 (``pyds9.DS9``):
+            The DS9 connection.
+        cache_frame (bool):
+            Whether to skip ``frame N`` commands if the frame is current. If
+            ``None``, uses the ``ds9.cache_frame`` configuration value.
+        display (dict or None):
+            The ``binning``, ``method``, and ``dtype`` passed to
+            `.decimate_image`, and the ``transport``. If ``None``, uses the
+            ``ds9.display`` configuration section.
+
+    """
+
+    def __init__(self, ds9, cache_frame=None, display=None):
+
+        self.ds9 = ds9
+
+        if cache_frame is None:
+            cache_frame = config['ds9'].get('cache_frame', False)
+
+        if display is None:
+            display = config['ds9'].get('display', {})
+
+        self.cache_frame = cache_frame
+
+        self.binning = display.get('binning', BINNING)
+        self.method = display.get('method', METHOD)
+        self.dtype = display.get('dtype', DTYPE)
+        self.transport = display.get('transport', TRANSPORT)
+
+        assert self.transport in ['xpa', 'shm'], 'invalid transport {0!r}'.format(self.transport)
+
+        self.segments = {}
+
+        self.current_frame = None
+        self.zooms = {}
+        self.shapes = {}
+        self.binnings = {}
+
+        self._lock = threading.RLock()
+
+    def invalidate(self):
+        """Forgets the cached DS9 state."""
+
+        with self._lock:
+            self.current_frame = None
+            self.zooms.clear()
+            self.shapes.clear()
+            self.binnings.clear()
+
+    def set(self, command, *args, **kwargs):
+        """Sends an XPA set command, keeping the cached state up to date."""
+
+        with self._lock:
+
+            frame_match = re.match('^frame ([0-9]+)$', command.strip())
+
+            if frame_match:
+                return self.set_frame(int(frame_match.group(1)))
+
+            if command.startswith('frame'):
+                self.invalidate()
+            elif command.startswith('zoom') and self.current_frame is not None:
+                self.zooms[self.current_frame] = command
+            elif command.startswith(('fits', 'dsseso', 'array')):
+                self.shapes.pop(self.current_frame, None)
+                self.binnings.pop(self.current_frame, None)
+
+            return self.ds9.set(command, *args, **kwargs)
+
+    def get(self, command, *args, **kwargs):
+        """Sends an XPA get command."""
+
+        with self._lock:
+            return self.ds9.get(command, *args, **kwargs)
+
+    def set_frame(self, frame):
+        """Makes ``frame`` the current frame."""
+
+        with self._lock:
+
+            if self.cache_frame and self.current_frame == frame:
+                return
+
+            self.ds9.set('frame {0}'.format(frame))
+            self.current_frame = frame
+
+    def close(self):
+        """Removes the shared memory segments."""
+
+        with self._lock:
+            for segment in self.segments.values():
+                segment.close()
+            self.segments.clear()
+
+    def send_image(self, image, frame):
+        """Sends an image to the current frame using the session transport."""
+
+        with self._lock:
+
+            if self.transport == 'shm':
+
+                segment = self.segments.get(frame, None)
+
+                try:
+                    if segment is None or not segment.fits(image):
+                        if segment is not None:
+                            segment.close()
+                        segment = self.segments[frame] = SharedMemorySegment(image.shape,
+                                                                             image.dtype)
+                except BMOError as ee:
+                    warnings.warn('cannot use shared memory, falling back '
+                                  'to XPA: {0}'.format(ee), BMOUserWarning)
+                    self.transport = 'xpa'
+                else:
+                    segment.write(image)
+                    self.ds9.set(segment.get_ds9_command())
+                    return
+
+            self.ds9.set_np2arr(image)
+
+    def send_fits(self, hdulist):
+        """Sends an in-memory FITS file to the current frame.
+
+        The shape of the image is cached, so `.get_shape` does not query
+        DS9 for it.
+
+        """
+
+        with self._lock:
+
+            self.binnings.pop(self.current_frame, None)
+
+            self.ds9.set_pyfits(hdulist)
+
+            data = hdulist[0].data
+            if data is not None and data.ndim == 2 and self.current_frame is not None:
+                self.shapes[self.current_frame] = (data.shape[1], data.shape[0])
+            else:
+                self.shapes.pop(self.current_frame, None)
+
+    def get_binning(self, frame):
+        """Returns the binning of the image displayed in ``frame``."""
+
+        with self._lock:
+            return self.binnings.get(frame, 1)
+
+    def get_shape(self, frame):
+        """Returns the ``(width, height)`` of the image displayed in ``frame``."""
+
+        with self._lock:
+
+            if frame not in self.shapes:
+                self.set_frame(frame)
+                self.shapes[frame] = (int(self.ds9.get('fits width')),
+                                      int(self.ds9.get('fits height')))
+
+            return self.shapes[frame]
+
+    @staticmethod
+    def get_regions(shape, centroid=None, binning=1):
+        """Returns the regions for an image, in DS9 format.
+
+        Marks the centre of the image and, if ``centroid`` is a tuple with the
+        x, y position of the centroid, the radius, and the FWHM, the centroid
+        and its FWHM. ``shape`` and ``centroid`` are in full-resolution pixels
+        and are converted to the pixels of the image binned by ``binning``.
+        DS9 image coordinates are centred on each pixel, so a full-resolution
+        coordinate ``xx`` is ``(xx - 0.5) / binning + 0.5`` in the binned image.
+
+        """
+
+        def _bin(value):
+            return (value - 0.5) / binning + 0.5
+
+        regions = ['image',
+                   'point({0}, {1}) # point=cross 20 color=blue'.format(
+                       _bin(shape[1] / 2.), _bin(shape[0] / 2.))]
+
+        if centroid:
+            xx, yy, rad, fwhm = centroid
+            xx, yy, rad = _bin(xx), _bin(yy), rad / binning
+            regions.append('circle({0}, {1}, {2}) # color=green'.format(xx, yy, rad))
+            regions.append('text({0}, {1}) # text={{{2:.2f}}} color=green'.format(
+                xx, yy + rad + 30 / binning, fwhm if fwhm else 0.0))
+
+        return '\n'.join(regions) + '\n'
+
+    def display(self, image, centroid=None, frame=1, zoom=None):
+        """Displays an image with regions for the image centre and centroid.
+
+        Sends the frame (if it changed), the decimated array, and the regions.
+        If ``zoom`` is not ``None`` and differs from the last zoom of the
+        frame, sets it. Otherwise, the frame is zoomed to fit the first time
+        an image is displayed in it.
+
+        """
+
+        display_image = decimate_image(image, binning=self.binning,
+                                       method=self.method, dtype=self.dtype)
+
+        with self._lock:
+
+            self.set_frame(frame)
+            self.send_image(display_image, frame)
+            self.shapes[frame] = (display_image.shape[1], display_image.shape[0])
+            self.binnings[frame] = self.binning
+
+            if zoom is not None and self.zooms.get(frame) != zoom:
+                self.ds9.set('zoom {0:.4f}'.format(zoom))
+                self.zooms[frame] = zoom
+            elif zoom is None and frame not in self.zooms:
+                self.ds9.set('zoom to fit')
+                self.zooms[frame] = 'to fit'
+
+            self.ds9.set('regions', self.get_regions(image.shape, centroid,
+                                                     binning=self.binning))
+
+
+class _DS9Task(object):
+    """A call to be run in the DS9 thread."""
+
+    def __init__(self, func, args, kwargs, frame=None):
+
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.frame = frame
+
+        self.cancelled = False
+        self.deferred = defer.Deferred(canceller=self._cancel)
+
+    def _cancel(self, deferred):
+        """Prevents the task from running if it has not started yet."""
+
+        self.cancelled = True
+
+    def fire(self, result):
+        """Fires the deferred, unless it has already timed out. Reactor thread only."""
+
+        if self.deferred.called:
+            return
+
+        if isinstance(result, failure.Failure):
+            self.deferred.errback(result)
+        else:
+            self.deferred.callback(result)
+
+
+class DS9Proxy(object):
+    """Runs the DS9 traffic in a dedicated thread.
+
+    All the calls to DS9 are queued and run, in order, in a single thread, so
+    that a slow or hung DS9 never blocks the reactor. Each call returns a
+    `~twisted.internet.defer.Deferred` that fires in the reactor thread with
+    the result of the call, or errbacks with a
+    `~twisted.internet.defer.TimeoutError` if it does not complete in
+    ``timeout`` seconds. Only the newest pending image is kept for each DS9
+    frame; the deferred of an image that is replaced by a newer one fires with
+    ``None``.
+
+    If a call has been running for longer than ``timeout`` when a new call is
+    made or another call times out, the DS9 thread is considered stuck and is
+    replaced by a new one, which reconnects to DS9 if the proxy was connected
+    with `.connect`. The stuck thread exits when its call returns.
+
+    The methods of the proxy must be called from the reactor thread.
+
+    Parameters:
+        session (`.DS9Session` or None):
+            The DS9 session. If ``None``, `.connect` must be called before
+            other calls are made.
+        timeout (float):
+            The number of seconds after which a call times out.
+
+    """
+
+    def __init__(self, session=None, timeout=TIMEOUT):
+
+        self.session = session
+        self.timeout = timeout
+
+        self.address = None
+
+        self.n_superseded = 0
+        self.n_restarts = 0
+
+        self._tasks = collections.deque()
+        self._displays = {}
+        self._condition = threading.Condition()
+        self._running = True
+
+        self._generation = 0
+        self._started = None  # When the running call started.
+
+        self.thread = None
+        self._start_thread()
+
+        self._shutdown_trigger = reactor.addSystemEventTrigger('during', 'shutdown',
+                                                               self._shutdown)
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates a proxy using the ``ds9`` section of the configuration."""
+
+        return cls(timeout=config['ds9'].get('timeout', TIMEOUT))
+
+    def _start_thread(self):
+        """Starts a DS9 thread for the current generation."""
+
+        self.thread = threading.Thread(target=self._run, args=(self._generation, ),
+                                       name='bmo-ds9')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _submit(self, func, args=(), kwargs=None, frame=None):
+        """Queues a task and returns its deferred."""
+
+        self.check_stuck()
+
+        task = _DS9Task(func, args, kwargs or {}, frame=frame)
+        superseded = None
+
+        with self._condition:
+
+            if frame is not None:
+                superseded = self._displays.get(frame, None)
+                if superseded is not None:
+                    self._tasks.remove(superseded)
+                    self.n_superseded += 1
+                self._displays[frame] = task
+
+            self._tasks.append(task)
+            self._condition.notify()
+
+        if superseded is not None:
+            superseded.cancelled = True
+            superseded.fire(None)
+
+        task.deferred.addTimeout(self.timeout, reactor)
+
+        return task.deferred.addErrback(self._timed_out)
+
+    def _timed_out(self, failure):
+        """Checks whether the DS9 thread is stuck when a call times out."""
+
+        if failure.check(defer.TimeoutError):
+            self.check_stuck()
+
+        return failure
+
+    def _run(self, generation):
+        """Runs the queued tasks until stopped or replaced by a new thread."""
+
+        session = None
+
+        while True:
+
+            with self._condition:
+
+                while (self._running and self._generation == generation and
+                       len(self._tasks) == 0):
+                    self._condition.wait()
+
+                if not self._running or self._generation != generation:
+                    break
+
+                task = self._tasks.popleft()
+                if task.frame is not None and self._displays.get(task.frame) is task:
+                    self._displays.pop(task.frame)
+
+                if task.cancelled:
+                    continue
+
+                session = self.session
+                self._started = monotonic()
+
+            try:
+                result = task.func(session, *task.args, **task.kwargs)
+            except Exception:
+                result = failure.Failure()
+
+            with self._condition:
+                if self._generation == generation:
+                    self._started = None
+
+            reactor.callFromThread(task.fire, result)
+
+        with self._condition:
+            replaced = self._generation != generation
+
+        if not replaced:
+            session = self.session
+
+        # A replaced thread only closes the session if the proxy no longer uses it.
+        if session is not None and (not replaced or session is not self.session):
+            session.close()
+
+    def check_stuck(self):
+        """Replaces the DS9 thread if a call has been running for more than ``timeout``.
+
+        Returns ``True`` if the thread was replaced.
+
+        """
+
+        with self._condition:
+
+            if (not self._running or self._started is None or
+                    monotonic() - self._started < self.timeout):
+                return False
+
+            self._generation += 1
+            self._started = None
+            self.n_restarts += 1
+
+            # The stuck thread may still be using the session, so a new one is
+            # opened if the address is known.
+            if self.address is not None:
+                self.session = None
+                reconnect = _DS9Task(self._open, (), {})
+                reconnect.deferred.addErrback(self._reconnect_failed)
+                self._tasks.appendleft(reconnect)
+
+        warnings.warn('a DS9 call has been running for more than {0} seconds. '
+                      'Replacing the DS9 thread.'.format(self.timeout), BMOUserWarning)
+
+        self._start_thread()
+
+        return True
+
+    def _reconnect_failed(self, failure):
+        """Warns if a new thread cannot reconnect to DS9."""
+
+        warnings.warn('cannot reconnect to DS9 {0}: {1}'.format(
+            self.address, failure.getErrorMessage()), BMOUserWarning)
+
+    def _shutdown(self):
+        """Stops the proxy when the reactor shuts down."""
+
+        self._shutdown_trigger = None
+        self.stop()
+
+    def stop(self):
+        """Stops the DS9 thread. Pending calls are discarded."""
+
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+        if self._shutdown_trigger is not None:
+            reactor.removeSystemEventTrigger(self._shutdown_trigger)
+            self._shutdown_trigger = None
+
+    def _open(self, session):
+        """Opens a new session to `.address`. Runs in the DS9 thread."""
+
+        if pyds9 is None:
+            raise BMOError('pyds9 cannot be imported.')
+
+        if session is not None:
+            session.close()
+
+        self.session = DS9Session(pyds9.DS9(self.address))
+
+        return self.session
+
+    def connect(self, address):
+        """Connects to the DS9 instance at ``address``."""
+
+        self.address = address
+
+        return self._submit(self._open)
+
+    def call(self, func, *args, **kwargs):
+        """Runs ``func(session, *args, **kwargs)`` in the DS9 thread."""
+
+        def _call(session):
+            if session is None:
+                raise BMOError('DS9 is not connected.')
+            return func(session, *args, **kwargs)
+
+        return self._submit(_call)
+
+    def set(self, *args, **kwargs):
+        """Sends an XPA set command. Returns a deferred."""
+
+        return self.call(lambda session: session.set(*args, **kwargs))
+
+    def get(self, *args, **kwargs):
+        """Sends an XPA get command. Returns a deferred."""
+
+        return self.call(lambda session: session.get(*args, **kwargs))
+
+    def display(self, image, centroid=None, frame=1, zoom=None, timer=None):
+        """Displays an image. See `.DS9Session.display`.
+
+        If a `~bmo.timing.FrameTimer` is passed, the time spent sending the
+        image is recorded in it as the ``display`` stage.
+
+        """
+
+        def _display(session):
+            if session is None:
+                raise BMOError('DS9 is not connected.')
+            start = monotonic()
+            session.display(image, centroid=centroid, frame=frame, zoom=zoom)
+            if timer is not None:
+                timer.add('display', monotonic() - start)
+
+        return self._submit(_display, frame=frame)
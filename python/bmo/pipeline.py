@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# pipeline.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from twisted.internet import defer, reactor, threads
+from twisted.python.threadpool import ThreadPool
+
+
+__all__ = ('ImagePipeline')
+
+
+# These parameters can be overridden by the actor configuration.
+WORKERS = 4       # Maximum number of worker threads.
+QUEUE_DEPTH = 2   # Maximum number of frames per camera being processed at the same time.
+
+
+class ImagePipeline(object):
+    """Runs the image processing stages in a pool of worker threads.
+
+    Background fitting, centroiding, DS9 transfer and compression are slow
+    and, if run in the reactor thread, block the TCC replies and the user
+    commands. This class runs them in a `~twisted.python.threadpool.ThreadPool`
+    and returns the results to the reactor as Deferreds. The number of frames
+    that each camera can have in flight is limited to ``queue_depth``.
+
+    Functions submitted to the pipeline run outside the reactor thread and
+    must not write to the actor users or touch the actor state. Those actions
+    should be done in the callbacks of the returned Deferred. `.submit` and
+    `.wait` must be called from the reactor thread; camera callbacks should
+    use `~twisted.internet.interfaces.IReactorThreads.callFromThread`.
+
+    Parameters:
+        workers (int):
+            The maximum number of worker threads.
+        queue_depth (int):
+            The maximum number of frames per camera that can be processed at
+            the same time.
+
+    """
+
+    def __init__(self, workers=WORKERS, queue_depth=QUEUE_DEPTH):
+
+        assert workers > 0, 'the pipeline needs at least one worker.'
+        assert queue_depth > 0, 'queue_depth must be positive.'
+
+        self.queue_depth = queue_depth
+        self.pending = {}
+
+        self.pool = ThreadPool(minthreads=1, maxthreads=workers, name='bmo-pipeline')
+        self.pool.start()
+
+        reactor.addSystemEventTrigger('during', 'shutdown', self.pool.stop)
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates a pipeline using the ``pipeline`` section of the configuration."""
+
+        pipeline_config = config.get('pipeline', {})
+
+        return cls(workers=pipeline_config.get('workers', WORKERS),
+                   queue_depth=pipeline_config.get('queue_depth', QUEUE_DEPTH))
+
+    def get_depth(self, camera_type):
+        """Returns the number of frames being processed for a camera."""
+
+        return len(self.pending.get(camera_type, []))
+
+    def is_full(self, camera_type):
+        """Returns True if no more frames can be submitted for a camera."""
+
+        return self.get_depth(camera_type) >= self.queue_depth
+
+    def submit(self, camera_type, func, *args, **kwargs):
+        """Runs ``func`` in the worker pool.
+
+        Returns a `~twisted.internet.defer.Deferred` that fires in the reactor
+        thread with the value returned by ``func``.
+
+        """
+
+        pending = self.pending.setdefault(camera_type, [])
+
+        deferred = threads.deferToThreadPool(reactor, self.pool, func, *args, **kwargs)
+        pending.append(deferred)
+
+        def _release(result):
+            pending.remove(deferred)
+            return result
+
+        deferred.addBoth(_release)
+
+        return deferred
+
+    def wait(self, camera_type, empty=False):
+        """Returns a Deferred that fires when the camera queue has room.
+
+        If ``empty=True``, the Deferred fires only once all the frames for the
+        camera have been processed.
+
+        """
+
+        pending = self.pending.get(camera_type, [])
+
+        if len(pending) == 0 or (not empty and len(pending) < self.queue_depth):
+            return defer.succeed(None)
+
+        waiter = defer.Deferred()
+
+        def _fire(result):
+            # Called after _release so the queue has already been updated.
+            self.wait(camera_type, empty=empty).chainDeferred(waiter)
+            return result
+
+        pending[0].addBoth(_fire)
+
+        return waiter
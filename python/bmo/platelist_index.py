@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# platelist_index.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import multiprocessing
+import os
+import re
+
+import numpy as np
+from astropy.io import fits
+from astropy.wcs import WCS
+
+from bmo import pathlib
+from bmo.exceptions import BMOError
+
+
+__all__ = ('PlatelistIndex', 'build_index', 'find_plates')
+
+
+# These parameters can be overridden by the actor configuration.
+INDEX_PATH = '~/.bmo/platelist_index.npy'
+
+INDEX_DTYPE = np.dtype([('plate_id', np.int32),
+                        ('center_ra', np.float64), ('center_dec', np.float64),
+                        ('offaxis_ra', np.float64), ('offaxis_dec', np.float64)])
+
+DSS_PATTERN = 'acquisitionDSS-r2-{plate6}-p1-{camera}.fits'
+PLATE_DIR_RE = re.compile(r'^[0-9]{6}$')
+
+
+def find_plates(platelist_dir):
+    """Returns the sorted plate_ids with a directory in ``platelist_dir/plates``."""
+
+    plates_dir = pathlib.Path(platelist_dir) / 'plates'
+
+    if not plates_dir.exists():
+        raise BMOError('{0} does not exist.'.format(plates_dir))
+
+    plate_ids = []
+
+    for group_dir in plates_dir.iterdir():
+        if not group_dir.is_dir():
+            continue
+        for plate_dir in group_dir.iterdir():
+            if PLATE_DIR_RE.match(plate_dir.name):
+                plate_ids.append(int(plate_dir.name))
+
+    return sorted(plate_ids)
+
+
+def get_footprint_centre(dss_path):
+    """Returns the mean RA/Dec of the footprint of a DSS image, or NaNs.
+
+    Only the header is read.
+
+    """
+
+    if not os.path.exists(dss_path):
+        return (np.nan, np.nan)
+
+    try:
+        footprint = WCS(fits.getheader(dss_path)).calc_footprint()
+    except Exception:
+        return (np.nan, np.nan)
+
+    return (footprint[:, 0].mean(), footprint[:, 1].mean())
+
+
+def _index_plate(args):
+    """Returns the index row for a plate. Runs in a worker process."""
+
+    platelist_dir, plate_id = args
+
+    plate6 = str(plate_id).zfill(6)
+    plate_dir = os.path.join(platelist_dir, 'plates', plate6[0:4] + 'XX', plate6)
+
+    row = [plate_id]
+    for camera in ['center', 'offaxis']:
+        dss_path = os.path.join(plate_dir, DSS_PATTERN.format(plate6=plate6, camera=camera))
+        row += get_footprint_centre(dss_path)
+
+    return tuple(row)
+
+
+def build_index(platelist_dir, path, processes=None, chunksize=64):
+    """Builds the coordinate index of the acquisition cameras for all plates.
+
+    Walks ``platelist_dir/plates`` and, in a pool of worker processes,
+    calculates the centre of the footprint of the on-axis and off-axis DSS
+    images of each plate. The result is saved as a ``.npy`` file with one
+    row per plate, sorted by plate_id, that can be memory-mapped. Cameras
+    without a DSS image are saved as NaN.
+
+    Parameters:
+        platelist_dir (str):
+            The path to platelist.
+        path (str):
+            The path of the index file.
+        processes (int):
+            The number of worker processes. Defaults to the number of CPUs.
+        chunksize (int):
+            The number of plates sent to a worker at once.
+
+    Returns:
+        index (`~numpy.ndarray`):
+            The index.
+
+    """
+
+    plate_ids = find_plates(platelist_dir)
+
+    pool = multiprocessing.Pool(processes=processes)
+
+    try:
+        rows = pool.map(_index_plate, [(str(platelist_dir), plate_id) for plate_id in plate_ids],
+                        chunksize=chunksize)
+    finally:
+        pool.close()
+        pool.join()
+
+    index = np.array(rows, dtype=INDEX_DTYPE)
+
+    path = pathlib.Path(path).expanduser()
+    if not path.parent.exists():
+        path.parent.mkdir(parents=True)
+
+    # np.save appends .npy if missing, so we write to a .npy temporary file.
+    tmp_path = str(path) + '.tmp.npy'
+    np.save(tmp_path, index)
+    os.rename(tmp_path, str(path))
+
+    return index
+
+
+class PlatelistIndex(object):
+    """Looks up the acquisition camera coordinates in the platelist index.
+
+    The index written by `.build_index` is memory-mapped, so only the pages
+    touched by the binary search on plate_id are read from disk.
+
+    Parameters:
+        path (str):
+            The path to the index file.
+
+    """
+
+    def __init__(self, path=INDEX_PATH):
+
+        self.path = pathlib.Path(path).expanduser()
+        self.index = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates and loads an index using the ``platelist_index`` configuration section."""
+
+        index_config = config.get('platelist_index', {})
+
+        index = cls(path=index_config.get('path', INDEX_PATH))
+
+        if index.path.exists():
+            try:
+                index.load()
+            except (IOError, ValueError):
+                pass
+
+        return index
+
+    def load(self):
+        """Memory-maps the index."""
+
+        index = np.load(str(self.path), mmap_mode='r')
+
+        if index.dtype != INDEX_DTYPE:
+            raise ValueError('{0} is not a platelist index.'.format(self.path))
+
+        self.index = index
+
+    def __len__(self):
+
+        return 0 if self.index is None else len(self.index)
+
+    def get(self, plate_id, camera='center'):
+        """Returns the ``(RA, Dec)`` of a camera, or ``None`` if not indexed."""
+
+        assert camera in ['center', 'offaxis'], 'invalid camera type.'
+
+        if self.index is None:
+            return None
+
+        position = np.searchsorted(self.index['plate_id'], plate_id)
+        if position >= len(self.index) or self.index['plate_id'][position] != plate_id:
+            return None
+
+        row = self.index[position]
+        ra, dec = float(row[camera + '_ra']), float(row[camera + '_dec'])
+
+        if np.isnan(ra) or np.isnan(dec):
+            return None
+
+        return (ra, dec)
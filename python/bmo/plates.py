@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# plates.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import threading
+
+from twisted.internet import defer
+
+from bmo.db import run_query
+from bmo.logger import log
+from bmo.timing import monotonic
+from bmo.utils import (PLATE_SNAPSHOT, get_acquisition_dss_path, get_camera_coordinates,
+                       get_camera_focal, get_plateid)
+
+
+__all__ = ('PlateMetadata', 'PlateCache', 'CartridgeCache')
+
+
+CAMERAS = ('center', 'offaxis')
+
+# These parameters can be overridden by the actor configuration.
+CARTRIDGE_TTL = 300     # Seconds after which a cartridge lookup is refreshed.
+RETRY_INTERVAL = 10     # Seconds to wait before retrying a failed lookup.
+
+
+class PlateMetadata(object):
+    """The metadata of a plate needed during acquisition.
+
+    Parameters:
+        plate_id (int):
+            The plate_id.
+        coordinates (dict):
+            The ``(RA, Dec)`` of each camera, keyed by ``'center'`` and
+            ``'offaxis'``. ``None`` if they could not be determined.
+        focal (dict):
+            The ``(xfocal, yfocal)`` of each camera.
+        dss_paths (dict):
+            The path of the DSS image of each camera.
+        errors (list):
+            The errors found while loading the metadata.
+
+    """
+
+    def __init__(self, plate_id, coordinates=None, focal=None, dss_paths=None, errors=None):
+
+        self.plate_id = plate_id
+
+        self.coordinates = coordinates or {}
+        self.focal = focal or {}
+        self.dss_paths = dss_paths or {}
+        self.errors = errors or []
+
+    def __repr__(self):
+
+        return '<PlateMetadata (plate_id={0}, coordinates={1!r})>'.format(self.plate_id,
+                                                                           self.coordinates)
+
+    @classmethod
+    def load(cls, plate_id):
+        """Loads the metadata of a plate from the database and platelist.
+
+        Values that cannot be determined are set to ``None`` and the error is
+        recorded in `.errors`. This method blocks and should be run in a
+        thread.
+
+        """
+
+        metadata = cls(plate_id)
+
+        for camera in CAMERAS:
+
+            for attr, func in [('coordinates', get_camera_coordinates),
+                               ('focal', get_camera_focal),
+                               ('dss_paths', get_acquisition_dss_path)]:
+
+                try:
+                    getattr(metadata, attr)[camera] = func(plate_id, camera=camera)
+                except Exception as ee:
+                    getattr(metadata, attr)[camera] = None
+                    metadata.errors.append('failed to get {0} {1}: {2}'.format(camera, attr, ee))
+
+        return metadata
+
+    def get_camera_coordinates(self, camera='center'):
+        """Returns the ``(RA, Dec)`` of a camera or ``(None, None)``."""
+
+        return self.coordinates.get(camera, None) or (None, None)
+
+
+class PlateCache(object):
+    """Keeps the metadata of the loaded plate.
+
+    The metadata is loaded in the database pool when `.refresh` is called,
+    normally when the plate_id changes. `.get` never blocks; it returns
+    ``None`` until the metadata for the requested plate has been loaded.
+
+    """
+
+    def __init__(self):
+
+        self.metadata = None
+        self.loading = None
+
+        self._lock = threading.Lock()
+
+    def refresh(self, plate_id):
+        """Loads the metadata for ``plate_id`` in the database pool.
+
+        Returns a deferred that fires with the `.PlateMetadata`, or ``None``
+        if the query fails, in which case the next call tries again. If the
+        metadata for ``plate_id`` is already loaded or being loaded, does not
+        load it again.
+
+        """
+
+        with self._lock:
+
+            if self.metadata is not None and self.metadata.plate_id == plate_id:
+                return defer.succeed(self.metadata)
+
+            if self.loading is not None and self.loading[0] == plate_id:
+                return self.loading[1]
+
+            loaded = run_query(PlateMetadata.load, plate_id)
+            self.loading = (plate_id, loaded)
+
+        def _loaded(metadata):
+
+            with self._lock:
+                if self.loading is not None and self.loading[0] == plate_id:
+                    self.metadata = metadata
+                    self.loading = None
+
+            for error in metadata.errors:
+                log.warning('plate {0}: {1}'.format(plate_id, error))
+
+            log.debug('loaded metadata for plate {0}.'.format(plate_id))
+
+            return metadata
+
+        def _failed(failure):
+
+            with self._lock:
+                if self.loading is not None and self.loading[0] == plate_id:
+                    self.loading = None
+
+            log.warning('failed to load metadata for plate {0}: '
+                        '{1}'.format(plate_id, failure.getErrorMessage()))
+
+        return loaded.addCallbacks(_loaded, _failed)
+
+    def get(self, plate_id):
+        """Returns the `.PlateMetadata` for ``plate_id`` or ``None``.
+
+        If the metadata is not loaded, starts loading it.
+
+        """
+
+        if plate_id is None:
+            return None
+
+        metadata = self.metadata
+
+        if metadata is not None and metadata.plate_id == plate_id:
+            return metadata
+
+        self.refresh(plate_id)
+
+        return None
+
+    def get_camera_coordinates(self, plate_id, camera='center'):
+        """Returns the ``(RA, Dec)`` of a camera or ``(None, None)`` if not loaded."""
+
+        metadata = self.get(plate_id)
+
+        if metadata is None:
+            return (None, None)
+
+        return metadata.get_camera_coordinates(camera)
+
+    def invalidate(self):
+        """Forgets the loaded metadata."""
+
+        with self._lock:
+            self.metadata = None
+            self.loading = None
+
+
+class CartridgeCache(object):
+    """A cache of the plate plugged in each cartridge.
+
+    Lookups are served from memory. If the entry for a cartridge is missing
+    or older than ``ttl`` seconds, the database is queried in the database
+    pool and the stale value, or ``None``, is returned in the meantime. When
+    the query finishes, ``callback(cart_id, plate_id)`` is called in the
+    reactor thread if the plate_id has changed.
+
+    Parameters:
+        ttl (float):
+            The number of seconds after which an entry is refreshed.
+        retry_interval (float):
+            The number of seconds to wait before retrying a failed query.
+        lookup (function):
+            The function that returns the plate_id for a cartridge. Defaults
+            to `~bmo.utils.get_plateid`.
+        fallback (function or None):
+            A function that returns the plate_id for a cartridge if the
+            lookup times out, or ``None``. The value is kept as stale, so
+            the lookup is retried after ``retry_interval``.
+
+    """
+
+    def __init__(self, ttl=CARTRIDGE_TTL, retry_interval=RETRY_INTERVAL, lookup=None,
+                 fallback=None):
+
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.lookup = lookup or get_plateid
+        self.fallback = fallback
+
+        # cart_id -> (plate_id, monotonic time of the query)
+        self.entries = {}
+
+        self._refreshing = set()
+        self._failed_at = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates a cache using the ``plates`` section of the configuration."""
+
+        plates_config = config.get('plates', {})
+
+        return cls(ttl=plates_config.get('cartridge_ttl', CARTRIDGE_TTL),
+                   retry_interval=plates_config.get('retry_interval', RETRY_INTERVAL),
+                   fallback=PLATE_SNAPSHOT.get_plateid)
+
+    def is_fresh(self, cart_id):
+        """Returns ``True`` if the entry for ``cart_id`` is younger than the TTL."""
+
+        return cart_id in self.entries and monotonic() - self.entries[cart_id][1] < self.ttl
+
+    def get(self, cart_id, callback=None):
+        """Returns the plate_id for ``cart_id``, refreshing it if needed.
+
+        Never blocks. Must be called from the reactor thread.
+
+        """
+
+        plate_id = self.entries[cart_id][0] if cart_id in self.entries else None
+
+        if not self.is_fresh(cart_id):
+            self.refresh(cart_id, callback=callback)
+
+        return plate_id
+
+    def refresh(self, cart_id, callback=None):
+        """Queries the plate_id for ``cart_id`` in the database pool.
+
+        Returns a deferred that fires with the new plate_id, or ``None`` if a
+        query for the cartridge is already running or has recently failed.
+
+        """
+
+        if cart_id in self._refreshing:
+            return None
+
+        if monotonic() - self._failed_at.get(cart_id, -self.retry_interval) < self.retry_interval:
+            return None
+
+        self._refreshing.add(cart_id)
+
+        previous = self.entries[cart_id][0] if cart_id in self.entries else None
+
+        def _refreshed(plate_id):
+
+            self._refreshing.discard(cart_id)
+            self._failed_at.pop(cart_id, None)
+            self.entries[cart_id] = (plate_id, monotonic())
+
+            if callback is not None and plate_id != previous:
+                callback(cart_id, plate_id)
+
+            return plate_id
+
+        def _failed(failure):
+
+            self._refreshing.discard(cart_id)
+            self._failed_at[cart_id] = monotonic()
+
+            log.warning('failed to get the plate for cartridge {0}: '
+                        '{1}'.format(cart_id, failure.getErrorMessage()))
+
+            if self.fallback is None or not failure.check(defer.TimeoutError):
+                return
+
+            plate_id = self.fallback(cart_id)
+            if plate_id is None:
+                return
+
+            # Stored as stale, so that the lookup is retried.
+            self.entries[cart_id] = (plate_id, monotonic() - self.ttl)
+
+            if callback is not None and plate_id != previous:
+                callback(cart_id, plate_id)
+
+        return run_query(self.lookup, cart_id).addCallbacks(_refreshed, _failed)
+
+    def invalidate(self, cart_id=None):
+        """Removes the entry for ``cart_id`` or, if ``None``, all the entries."""
+
+        if cart_id is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(cart_id, None)
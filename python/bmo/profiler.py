@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# profiler.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import cProfile
+import datetime
+import os
+import pstats
+
+from bmo.exceptions import BMOError
+from bmo.timing import monotonic
+
+
+__all__ = ('ReactorProfiler')
+
+
+# These parameters can be overridden by the actor configuration.
+N_FUNCTIONS = 20            # Number of functions reported when the profiler stops.
+SORT = 'cumulative'         # The pstats key used to sort the functions.
+
+
+class ReactorProfiler(object):
+    """Profiles the reactor thread of the running actor with cProfile.
+
+    cProfile only records the thread in which it is enabled. Because commands
+    are dispatched in the reactor thread, `.start` and `.stop` must be called
+    from it; work done in the image pipeline and writer threads is only seen
+    as the time the reactor spends waiting for it.
+
+    Parameters:
+        output_dir (str):
+            The directory in which the ``.pstats`` files are saved.
+        n_functions (int):
+            The number of functions returned by `.get_top`.
+        sort (str):
+            The `pstats.Stats.sort_stats` key used to sort the functions.
+
+    """
+
+    def __init__(self, output_dir, n_functions=N_FUNCTIONS, sort=SORT):
+
+        self.output_dir = str(output_dir)
+        self.n_functions = n_functions
+        self.sort = sort
+
+        self._profile = None
+        self._started_at = None
+
+    @classmethod
+    def from_config(cls, config, output_dir):
+        """Creates a profiler using the ``profile`` section of the configuration."""
+
+        profile_config = config.get('profile', {})
+
+        return cls(output_dir,
+                   n_functions=profile_config.get('n_functions', N_FUNCTIONS),
+                   sort=profile_config.get('sort', SORT))
+
+    @property
+    def is_running(self):
+        """Returns ``True`` if the profiler is enabled."""
+
+        return self._profile is not None
+
+    @property
+    def elapsed(self):
+        """The number of seconds since the profiler was started."""
+
+        if not self.is_running:
+            return 0.
+
+        return monotonic() - self._started_at
+
+    def start(self):
+        """Enables the profiler."""
+
+        if self.is_running:
+            raise BMOError('the profiler is already running.')
+
+        self._profile = cProfile.Profile()
+        self._started_at = monotonic()
+        self._profile.enable()
+
+    def stop(self):
+        """Disables the profiler and saves the statistics.
+
+        Returns the path of the ``.pstats`` file and the `pstats.Stats`
+        instance.
+
+        """
+
+        if not self.is_running:
+            raise BMOError('the profiler is not running.')
+
+        profile = self._profile
+        profile.disable()
+
+        self._profile = None
+        self._started_at = None
+
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+        strtime = datetime.datetime.utcnow().strftime('%Y-%m-%d_%H:%M:%S')
+        path = os.path.join(self.output_dir, 'bmo_profile_{0}.pstats'.format(strtime))
+
+        profile.dump_stats(path)
+
+        return path, pstats.Stats(profile)
+
+    def get_top(self, stats, n_functions=None):
+        """Returns the top functions in ``stats``.
+
+        Returns a list of tuples with the function, as ``file:line(name)``, the
+        number of calls, the total time, and the cumulative time, in seconds.
+
+        """
+
+        n_functions = n_functions or self.n_functions
+
+        stats.sort_stats(self.sort)
+
+        top = []
+        for func in stats.fcn_list[:n_functions]:
+            filename, line, name = func
+            __, n_calls, total_time, cumulative_time, __ = stats.stats[func]
+            top.append(('{0}:{1}({2})'.format(os.path.basename(filename), line, name),
+                        n_calls, total_time, cumulative_time))
+
+        return top
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# shm.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import ctypes
+import ctypes.util
+import sys
+
+import numpy as np
+
+from bmo.exceptions import BMOError
+
+
+__all__ = ('SharedMemorySegment', 'get_ds9_bitpix')
+
+
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+
+# DS9 uses -16 for unsigned 16-bit integers.
+DS9_BITPIX = {np.dtype(np.uint8): 8, np.dtype(np.int16): 16, np.dtype(np.uint16): -16,
+              np.dtype(np.int32): 32, np.dtype(np.int64): 64,
+              np.dtype(np.float32): -32, np.dtype(np.float64): -64}
+
+
+def _get_libc():
+    """Returns the C library with the System V shared memory functions."""
+
+    libc_path = ctypes.util.find_library('c')
+    if libc_path is None:
+        return None
+
+    try:
+        libc = ctypes.CDLL(libc_path, use_errno=True)
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmget.restype = ctypes.c_int
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmdt.restype = ctypes.c_int
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+        libc.shmctl.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        return None
+
+    return libc
+
+
+libc = _get_libc()
+
+
+def get_ds9_bitpix(dtype):
+    """Returns the DS9 ``bitpix`` for a Numpy dtype."""
+
+    dtype = np.dtype(dtype)
+
+    if dtype not in DS9_BITPIX:
+        raise BMOError('dtype {0} cannot be displayed in DS9.'.format(dtype))
+
+    return DS9_BITPIX[dtype]
+
+
+class SharedMemorySegment(object):
+    """A System V shared memory segment that holds an image.
+
+    The segment is private to the process; other processes, such as DS9,
+    attach to it using its `.shmid`. The segment is removed when `.close` is
+    called.
+
+    Parameters:
+        shape (tuple):
+            The shape of the image.
+        dtype (str):
+            The dtype of the image.
+
+    """
+
+    def __init__(self, shape, dtype):
+
+        self.address = None
+
+        if libc is None:
+            raise BMOError('System V shared memory is not available.')
+
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.size = int(np.prod(self.shape)) * self.dtype.itemsize
+
+        self.shmid = libc.shmget(IPC_PRIVATE, self.size, IPC_CREAT | 0o644)
+        if self.shmid < 0:
+            raise BMOError('shmget failed with errno {0}.'.format(ctypes.get_errno()))
+
+        self.address = libc.shmat(self.shmid, None, 0)
+        if self.address is None or self.address == ctypes.c_void_p(-1).value:
+            libc.shmctl(self.shmid, IPC_RMID, None)
+            raise BMOError('shmat failed with errno {0}.'.format(ctypes.get_errno()))
+
+        buffer = (ctypes.c_char * self.size).from_address(self.address)
+        self.array = np.frombuffer(buffer, dtype=self.dtype).reshape(self.shape)
+
+    def fits(self, image):
+        """Returns ``True`` if ``image`` has the shape and dtype of the segment."""
+
+        return image.shape == self.shape and image.dtype == self.dtype
+
+    def write(self, image):
+        """Copies ``image`` into the segment."""
+
+        np.copyto(self.array, image)
+
+    def get_ds9_command(self):
+        """Returns the DS9 command that loads the segment as an array."""
+
+        return 'shm array shmid {0} [xdim={1},ydim={2},bitpix={3},endian={4}]'.format(
+            self.shmid, self.shape[1], self.shape[0], get_ds9_bitpix(self.dtype),
+            'little' if sys.byteorder == 'little' else 'big')
+
+    def close(self):
+        """Detaches and removes the segment."""
+
+        if self.address is None or libc is None:
+            return
+
+        self.array = None
+
+        libc.shmdt(self.address)
+        libc.shmctl(self.shmid, IPC_RMID, None)
+
+        self.address = None
+
+    def __del__(self):
+
+        self.close()
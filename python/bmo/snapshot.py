@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# snapshot.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import sqlite3
+import threading
+import time
+
+from bmo import pathlib
+from bmo.exceptions import BMOError
+
+try:
+    from sdssdb.observatory import database, platedb
+except ImportError:
+    database = platedb = None
+
+
+__all__ = ('PlateSnapshot', 'export_snapshot')
+
+
+# These parameters can be overridden by the actor configuration.
+SNAPSHOT_PATH = '~/.bmo/plates.sqlite'
+PLUGGING_MAX_AGE = 43200    # Seconds after which the snapshot pluggings are not trusted.
+
+SCHEMA = """
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE active_plugging (cart_id INTEGER PRIMARY KEY, plate_id INTEGER);
+CREATE TABLE plate (plate_id INTEGER PRIMARY KEY, center_ra REAL, center_dec REAL);
+CREATE TABLE acquisition_hole (plate_id INTEGER, camera TEXT, xfocal REAL, yfocal REAL,
+                               PRIMARY KEY (plate_id, camera));
+"""
+
+
+def export_snapshot(path, plate_ids=None):
+    """Exports the plate geometry needed by BMO from the database to SQLite.
+
+    Exports the active pluggings and, for the plugged plates and the plates
+    in ``plate_ids``, the centre pointing and the xyfocal of the acquisition
+    holes. The snapshot is written to a temporary file that replaces ``path``
+    when complete. This function blocks and should be run in a thread.
+
+    Returns the number of cartridges and plates exported.
+
+    """
+
+    if platedb is None or database.check_connection() is False:
+        raise BMOError('no database is available.')
+
+    path = pathlib.Path(path).expanduser()
+    if not path.parent.exists():
+        path.parent.mkdir(parents=True)
+
+    pluggings = list(platedb.Plate.select(platedb.ActivePlugging.pk, platedb.Plate.plate_id)
+                     .join(platedb.Plugging).join(platedb.ActivePlugging).tuples())
+
+    plate_ids = set(plate_ids or []) | set(plate_id for __, plate_id in pluggings)
+
+    plates = []
+    holes = []
+
+    for plate_id in sorted(plate_ids):
+
+        plate = platedb.Plate.get(plate_id=plate_id)
+        pointing = plate.plate_pointings[0].pointing
+        plates.append((plate_id, float(pointing.center_ra), float(pointing.center_dec)))
+
+        query = (platedb.PlateHole.select(platedb.PlateHole, platedb.PlateHoleType.label)
+                 .join(platedb.PlateHoleType).switch(platedb.PlateHole)
+                 .join(platedb.PlateHolesFile).join(platedb.Plate)
+                 .where((platedb.Plate.plate_id == plate_id) &
+                        (platedb.PlateHoleType.label << ['ACQUISITION_CENTER',
+                                                         'ACQUISITION_OFFAXIS'])))
+
+        for hole in query:
+            camera = hole.plate_hole_type.label.split('_')[1].lower()
+            holes.append((plate_id, camera, float(hole.xfocal), float(hole.yfocal)))
+
+    tmp_path = str(path) + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    connection = sqlite3.connect(tmp_path)
+
+    with connection:
+        connection.executescript(SCHEMA)
+        connection.execute('INSERT INTO metadata VALUES (?, ?)', ('exported_at', str(time.time())))
+        connection.executemany('INSERT INTO active_plugging VALUES (?, ?)', pluggings)
+        connection.executemany('INSERT INTO plate VALUES (?, ?, ?)', plates)
+        connection.executemany('INSERT INTO acquisition_hole VALUES (?, ?, ?, ?)', holes)
+
+    connection.close()
+
+    os.rename(tmp_path, str(path))
+
+    return len(pluggings), len(plates)
+
+
+class PlateSnapshot(object):
+    """An offline copy of the plate geometry, loaded in memory.
+
+    The SQLite snapshot written by `.export_snapshot` is read into
+    dictionaries so that lookups do not touch the disk. Pluggings change
+    during the night, so `.get_plateid` only uses them if the snapshot is
+    younger than ``plugging_max_age``, and `~bmo.utils.get_plateid` only if
+    the database is not available; pointings and acquisition holes do not
+    change and are always used.
+
+    Parameters:
+        path (str):
+            The path to the SQLite snapshot.
+        plugging_max_age (float):
+            The number of seconds after the export during which the
+            pluggings are trusted.
+
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH, plugging_max_age=PLUGGING_MAX_AGE):
+
+        self.path = pathlib.Path(path).expanduser()
+        self.plugging_max_age = plugging_max_age
+
+        self.exported_at = None
+        self.pluggings = {}
+        self.pointings = {}
+        self.holes = {}
+
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates and loads a snapshot using the ``snapshot`` section of the configuration."""
+
+        snapshot_config = config.get('snapshot', {})
+
+        snapshot = cls(path=snapshot_config.get('path', SNAPSHOT_PATH),
+                       plugging_max_age=snapshot_config.get('plugging_max_age',
+                                                            PLUGGING_MAX_AGE))
+
+        if snapshot.path.exists():
+            try:
+                snapshot.load()
+            except sqlite3.Error:
+                pass
+
+        return snapshot
+
+    def load(self):
+        """Reads the snapshot from disk."""
+
+        connection = sqlite3.connect(str(self.path))
+
+        try:
+            metadata = dict(connection.execute('SELECT key, value FROM metadata'))
+            pluggings = dict(connection.execute('SELECT cart_id, plate_id FROM active_plugging'))
+            pointings = dict((row[0], row[1:]) for row in connection.execute(
+                'SELECT plate_id, center_ra, center_dec FROM plate'))
+            holes = dict(((row[0], row[1]), row[2:]) for row in connection.execute(
+                'SELECT plate_id, camera, xfocal, yfocal FROM acquisition_hole'))
+        finally:
+            connection.close()
+
+        with self._lock:
+            self.exported_at = float(metadata['exported_at'])
+            self.pluggings = pluggings
+            self.pointings = pointings
+            self.holes = holes
+
+    @property
+    def age(self):
+        """The number of seconds since the snapshot was exported."""
+
+        if self.exported_at is None:
+            return None
+
+        return time.time() - self.exported_at
+
+    def get_plateid(self, cart_id):
+        """Returns the plate_id plugged in ``cart_id``, or ``None`` if unknown or too old."""
+
+        if self.exported_at is None or self.age > self.plugging_max_age:
+            return None
+
+        return self.pluggings.get(cart_id, None)
+
+    def get_plugged_plates(self):
+        """Returns the plate_ids of all the plugged plates, or ``None`` if too old."""
+
+        if self.exported_at is None or self.age > self.plugging_max_age:
+            return None
+
+        return sorted(set(self.pluggings.values()))
+
+    def get_pointing(self, plate_id):
+        """Returns the ``(RA, Dec)`` of the centre of the plate, or ``None``."""
+
+        return self.pointings.get(plate_id, None)
+
+    def get_focal(self, plate_id, camera='center'):
+        """Returns the ``(xfocal, yfocal)`` of an acquisition camera, or ``None``."""
+
+        return self.holes.get((plate_id, camera), None)
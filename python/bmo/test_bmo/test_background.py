@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_background.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from unittest import TestCase
+
+import numpy as np
+
+from bmo.background import BackgroundCache, BlockBackgroundEngine, get_background_engine
+
+
+class TestBlockBackground(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.shape = (1216, 1936)
+
+        yy, xx = np.mgrid[0:cls.shape[0], 0:cls.shape[1]]
+        cls.true_background = 1000. + 0.1 * xx + 0.05 * yy
+
+        np.random.seed(42)
+        cls.image = cls.true_background + np.random.normal(0, 5, cls.shape)
+
+        # Adds a bright star.
+        cls.image += 5e4 * np.exp(-((xx - 600)**2 + (yy - 400)**2) / 50.)
+
+    def _check_residuals(self, engine, max_residual, rms=1.):
+
+        model = engine.fit(self.image)
+
+        self.assertEqual(model.background.shape, self.shape)
+
+        # The median filter biases the mesh along the edges so we only check
+        # the maximum residual in the interior of the image.
+        residuals = model.background - self.true_background
+        self.assertLess(residuals.std(), rms)
+        self.assertLess(np.abs(residuals[50:-50, 50:-50]).max(), max_residual)
+
+        return model
+
+    def test_median_bilinear(self):
+
+        self._check_residuals(BlockBackgroundEngine(), 5)
+
+    def test_no_filter(self):
+
+        self._check_residuals(BlockBackgroundEngine(filter_size=(1, 1)), 2, rms=0.2)
+
+    def test_sigma_clipped_mean(self):
+
+        self._check_residuals(BlockBackgroundEngine(statistic='sigma_clipped_mean'), 10)
+
+    def test_spline(self):
+
+        self._check_residuals(BlockBackgroundEngine(interpolation='spline'), 5, rms=2.)
+
+    def test_mesh_shape(self):
+
+        engine = BlockBackgroundEngine(box_size=(50, 50))
+
+        mesh = engine.get_mesh(self.image)
+        self.assertEqual(mesh.shape, (24, 38))
+
+    def test_model_attributes(self):
+
+        engine = BlockBackgroundEngine(box_size=(64, 32), filter_size=(5, 5))
+        model = engine.fit(self.image)
+
+        self.assertEqual(model.box_size, (64, 32))
+        self.assertEqual(model.filter_size, (5, 5))
+        self.assertAlmostEqual(model.background_median, np.median(self.true_background),
+                               delta=5)
+
+    def test_get_engine_from_config(self):
+
+        config = {'engine': 'block', 'box_size': [32, 32], 'statistic': 'sigma_clipped_mean',
+                  'sigma_clip': {'sigma': 2.5, 'iters': 5}}
+
+        engine = get_background_engine(config=config)
+
+        self.assertIsInstance(engine, BlockBackgroundEngine)
+        self.assertEqual(engine.box_size, (32, 32))
+        self.assertEqual(engine.statistic, 'sigma_clipped_mean')
+        self.assertEqual(engine.iters, 5)
+
+
+class TestBackgroundCache(TestCase):
+
+    def setUp(self):
+
+        self.shape = (1216, 1936)
+
+        np.random.seed(42)
+        self.noise = np.random.normal(0, 5, self.shape)
+
+    def test_ema(self):
+
+        cache = BackgroundCache(engine=BlockBackgroundEngine(), mode='ema', alpha=0.5)
+
+        model = cache.get('on', 1., 1000. + self.noise)
+        self.assertEqual(model.n_updates, 0)
+
+        model = cache.get('on', 1., 2000. + self.noise)
+        self.assertEqual(model.n_updates, 1)
+        self.assertAlmostEqual(np.median(model.background), 1500., delta=1)
+
+    def test_refit(self):
+
+        cache = BackgroundCache(engine=BlockBackgroundEngine(), mode='refit', refit_every=3)
+
+        first = cache.get('on', 1., 1000. + self.noise)
+        self.assertIs(cache.get('on', 1., 2000. + self.noise), first)
+
+        model = cache.get('on', 1., 2000. + self.noise)
+        self.assertEqual(model.n_updates, 1)
+        self.assertAlmostEqual(np.median(model.background), 2000., delta=1)
+
+    def test_evict(self):
+
+        cache = BackgroundCache(engine=BlockBackgroundEngine())
+
+        cache.get('on', 1., 1000. + self.noise)
+        cache.get('off', 1., 1000. + self.noise)
+        cache.get('off', 2., 1000. + self.noise)
+
+        cache.evict('off', 2.)
+        self.assertEqual(sorted(cache.models), [('off', 1.), ('on', 1.)])
+
+        cache.evict('on')
+        self.assertEqual(list(cache.models), [('off', 1.)])
+
+    def test_max_age(self):
+
+        cache = BackgroundCache(engine=BlockBackgroundEngine(), max_age=10)
+
+        first = cache.get('on', 1., 1000. + self.noise)
+        first.fitted_at -= 20
+
+        model = cache.get('on', 1., 2000. + self.noise)
+        self.assertEqual(model.n_updates, 0)
+        self.assertAlmostEqual(np.median(model.background), 2000., delta=1)
+
+    def test_ema_convergence(self):
+
+        cache = BackgroundCache(engine=BlockBackgroundEngine(), mode='ema', alpha=0.3)
+
+        cache.get('on', 1., 1000. + self.noise)
+
+        # The difference with the new level decreases by (1 - alpha) each frame.
+        for n_frame in range(1, 16):
+            model = cache.get('on', 1., 2000. + self.noise)
+            expected = 2000. - 1000. * (1 - 0.3)**n_frame
+            self.assertAlmostEqual(np.median(model.background), expected, delta=1)
+
+        self.assertEqual(model.n_updates, 15)
+        self.assertAlmostEqual(np.median(model.background), 2000., delta=5)
+
+    def test_refit_max_age(self):
+
+        engine = BlockBackgroundEngine()
+        cache = BackgroundCache(engine=engine, mode='refit', refit_every=100, max_age=10)
+
+        first = cache.get('on', 1., 1000. + self.noise)
+        self.assertIs(cache.get('on', 1., 2000. + self.noise), first)
+
+        first.fitted_at -= 20
+
+        model = cache.get('on', 1., 2000. + self.noise)
+        self.assertIsNot(model, first)
+        self.assertEqual(model.n_updates, 0)
+        self.assertIs(model.engine, engine)
+        self.assertAlmostEqual(np.median(model.background), 2000., delta=1)
+
+    def test_max_entries(self):
+
+        cache = BackgroundCache(engine=BlockBackgroundEngine(), max_entries=2)
+
+        first = cache.get('on', 1., 1000. + self.noise)
+        first.fitted_at -= 20
+        second = cache.get('on', 2., 1000. + self.noise)
+        second.fitted_at -= 10
+
+        cache.get('off', 1., 1000. + self.noise)
+
+        # The model fitted first is evicted.
+        self.assertEqual(sorted(cache.models), [('off', 1.), ('on', 2.)])
+        self.assertNotIn(('on', 1.), cache._frames)
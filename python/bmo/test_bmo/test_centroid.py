@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_centroid.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+from unittest import TestCase, skipUnless
+
+import astropy.io.fits as fits
+import numpy as np
+
+import bmo.utils
+from bmo.centroid import FOCAL_SCALE, PIXEL_SIZE, GAUSSIAN_SIGMA_TO_FWHM, NumpyBackend
+
+
+def gaussian_image(stars, shape=(1216, 1936), noise=5., seed=42):
+    """Returns an image with Gaussian stars, each defined as ``(x, y, flux, sigma)``."""
+
+    np.random.seed(seed)
+
+    yy, xx = np.mgrid[0:shape[0], 0:shape[1]]
+    image = np.random.normal(100., noise, shape)
+
+    for x_star, y_star, flux, sigma in stars:
+        image += flux * np.exp(-((xx - x_star)**2 + (yy - y_star)**2) / (2 * sigma**2))
+
+    return image
+
+
+ON_AXIS_IMAGE = os.path.join(os.path.dirname(__file__),
+                             '../data/DEV_000F314D46D2_onaxis_180317_194054.fits')
+OFF_AXIS_IMAGE = os.path.join(os.path.dirname(__file__),
+                              '../data/DEV_000F314D434A_offaxis_180317_194057.fits')
+
+
+class TestNumpyBackend(TestCase):
+
+    def setUp(self):
+
+        self.backend = NumpyBackend()
+
+    def test_brightest_star(self):
+
+        image = gaussian_image([(500.3, 300.7, 2000., 3.), (1500.2, 900.1, 8000., 4.)])
+
+        centroid = self.backend.find(image)
+
+        # Positions follow the PyGuide convention.
+        self.assertAlmostEqual(centroid.xyCtr[0], 1500.2 + 0.5, delta=0.1)
+        self.assertAlmostEqual(centroid.xyCtr[1], 900.1 + 0.5, delta=0.1)
+        self.assertGreater(centroid.rad, 0)
+
+    def test_fwhm(self):
+
+        image = gaussian_image([(800., 600., 1e4, 3.)], noise=1.)
+
+        __, fwhm = self.backend.find(image, return_fwhm=True)
+
+        # The wings below the threshold are not included so the FWHM is underestimated.
+        expected = GAUSSIAN_SIGMA_TO_FWHM * 3. * PIXEL_SIZE * FOCAL_SCALE
+        self.assertAlmostEqual(fwhm, expected, delta=0.15 * expected)
+
+    def test_no_stars(self):
+
+        with self.assertRaises(AssertionError):
+            self.backend.find(gaussian_image([]))
+
+    def test_connected_components(self):
+
+        mask = np.zeros((6, 8), dtype=bool)
+        mask[1, 1:3] = True
+        mask[2, 3] = True   # Diagonal to the first run.
+        mask[4, 5:7] = True
+
+        rows, starts, ends = self.backend.get_runs(mask)
+        labels = self.backend.label_runs(rows, starts, ends)
+
+        self.assertEqual(list(rows), [1, 2, 4])
+        self.assertEqual(labels[0], labels[1])
+        self.assertNotEqual(labels[0], labels[2])
+
+    def test_tracking_window(self):
+
+        image = gaussian_image([(500.3, 300.7, 2000., 3.), (1500.2, 900.1, 8000., 4.)])
+
+        centroid = bmo.utils.get_centroid(image, previous=(510, 290), window=100,
+                                          backend=self.backend)
+
+        self.assertAlmostEqual(centroid.xyCtr[0], 500.3 + 0.5, delta=0.1)
+        self.assertAlmostEqual(centroid.xyCtr[1], 300.7 + 0.5, delta=0.1)
+
+    def test_tracking_lost(self):
+
+        image = gaussian_image([(1500.2, 900.1, 8000., 4.)])
+
+        centroid = bmo.utils.get_centroid(image, previous=(200, 200), window=100,
+                                          backend=self.backend)
+
+        self.assertAlmostEqual(centroid.xyCtr[0], 1500.2 + 0.5, delta=0.1)
+
+    @skipUnless(os.path.exists(ON_AXIS_IMAGE) and os.path.exists(OFF_AXIS_IMAGE),
+                'test frames not available.')
+    def test_camera_frames(self):
+
+        # The PyGuide centroids of the frames, as in test_centre_up.
+        for image, expected in [(ON_AXIS_IMAGE, (1752.4199137070332, 454.10706671426425)),
+                                (OFF_AXIS_IMAGE, (1743.8137313138916, 422.2838288383008))]:
+
+            centroid = bmo.utils.get_centroid(fits.getdata(image), backend=self.backend)
+
+            self.assertAlmostEqual(centroid.xyCtr[0], expected[0], delta=1)
+            self.assertAlmostEqual(centroid.xyCtr[1], expected[1], delta=1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_charts.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from unittest import TestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from twisted.internet import defer
+
+from bmo import pathlib
+from bmo.charts import ChartCache, load_charts as bmo_load_charts
+from bmo.exceptions import BMOError
+
+
+def load_charts(plate_id):
+    if plate_id == 9000:
+        raise BMOError('DSS image not found.')
+    return {'center': 'center_{0}'.format(plate_id), 'offaxis': 'offaxis_{0}'.format(plate_id)}
+
+
+@mock.patch('bmo.charts.threads.deferToThread',
+            side_effect=lambda func, *args: defer.maybeDeferred(func, *args))
+@mock.patch('bmo.charts.load_charts', side_effect=load_charts)
+class TestChartCache(TestCase):
+
+    def test_load(self, mock_load, __):
+
+        cache = ChartCache(max_plates=2)
+
+        results = []
+        cache.load(8000).addCallback(results.append)
+        cache.load(8000).addCallback(results.append)
+
+        self.assertEqual(results[0]['center'], 'center_8000')
+        self.assertEqual(mock_load.call_count, 1)
+        self.assertEqual(cache.get(8000), results[0])
+
+    def test_evicts_least_recently_used(self, mock_load, __):
+
+        cache = ChartCache(max_plates=2)
+
+        cache.prefetch([8000, 8001])
+        cache.get(8000)
+        cache.load(8002)
+
+        self.assertEqual(list(cache.charts), [8000, 8002])
+
+    def test_failed(self, mock_load, __):
+
+        cache = ChartCache()
+
+        failures = []
+        cache.load(9000).addErrback(failures.append)
+
+        self.assertEqual(len(failures), 1)
+        self.assertIsNone(cache.get(9000))
+        self.assertEqual(cache.loading, {})
+
+        # Prefetch failures are logged and do not propagate.
+        cache.prefetch([9000, 8000])
+        self.assertEqual(list(cache.charts), [8000])
+
+
+class TestLoadCharts(TestCase):
+
+    @mock.patch('bmo.charts.get_acquisition_dss_path',
+                return_value=pathlib.Path('/nonexistent/acquisitionDSS.fits'))
+    def test_missing_chart(self, __):
+
+        with self.assertRaises(BMOError):
+            bmo_load_charts(8000)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_cmd_parser.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from unittest import TestCase
+
+import click
+
+from bmo.cmds.cmd_parser import bmo_parser, CommandDispatcher
+
+
+class FakeCmd(object):
+
+    Failed = 'failed'
+    Done = 'done'
+
+    def __init__(self):
+        self.state = None
+        self.messages = []
+
+    def setState(self, state, textMsg=None, hubMsg=None):
+        self.state = state
+
+    def writeToUsers(self, msgCode, msgStr):
+        self.messages.append((msgCode, msgStr))
+
+
+class TestCommandDispatcher(TestCase):
+
+    def setUp(self):
+
+        self.dispatcher = CommandDispatcher(bmo_parser)
+        self.cmd = FakeCmd()
+        self.obj = dict(actor=None, cmd=self.cmd)
+
+    def test_table(self):
+
+        self.assertEqual(self.dispatcher.table[('ping', )][-1].name, 'ping')
+        self.assertEqual([command.name for command in self.dispatcher.table[('ds9', 'connect')]],
+                         ['ds9', 'connect'])
+        self.assertEqual(self.dispatcher.max_depth, 2)
+
+    def test_dispatch(self):
+
+        self.dispatcher(['ping'], obj=self.obj)
+        self.assertEqual(self.cmd.state, 'done')
+
+    def test_dispatch_help_command(self):
+
+        self.dispatcher(['help'], obj=self.obj)
+
+        # help uses the context of the root group.
+        self.assertIn('Usage: bmo [OPTIONS] COMMAND [ARGS]...', self.cmd.messages[0][1])
+
+    def test_make_context_subcommand(self):
+
+        ctx = self.dispatcher.make_context(['ds9', 'connect'], obj=self.obj)
+
+        self.assertEqual(ctx.command.name, 'connect')
+        self.assertEqual(ctx.parent.command.name, 'ds9')
+        self.assertEqual(ctx.command_path, 'bmo ds9 connect')
+        self.assertIs(ctx.obj, self.obj)
+
+    def test_usage_errors(self):
+
+        for args, message in [(['foo'], "No such command 'foo'."),
+                              (['ping', 'extra'], 'unexpected extra argument'),
+                              (['ds9'], 'Missing command.'),
+                              (['ds9', 'foo'], "No such command 'foo'."),
+                              (['camera', 'expose', '--bad'], "No such option '--bad'"),
+                              ([], 'Missing command.')]:
+
+            with self.assertRaises(click.UsageError) as cm:
+                self.dispatcher(args, obj=self.obj)
+
+            self.assertIn(message, cm.exception.format_message())
+            self.assertIsNotNone(cm.exception.ctx)
+
+        # The commands are not invoked.
+        self.assertIsNone(self.cmd.state)
+
+    def test_get_help(self):
+
+        self.assertIn('Usage: bmo ping [OPTIONS]', self.dispatcher.get_help(['ping', '--help']))
+        self.assertIn('show-chart', self.dispatcher.get_help(['ds9', '--help']))
+        self.assertIn('centre-up', self.dispatcher.get_help(['--help']))
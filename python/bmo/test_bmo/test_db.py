@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_db.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import time
+
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from bmo.db import DatabasePool
+
+
+class TestDatabasePool(unittest.TestCase):
+
+    def setUp(self):
+
+        self.db_pool = DatabasePool(pool_size=1, timeout=5)
+        self.addCleanup(self.db_pool.pool.stop)
+
+    def test_starts_with_first_query(self):
+
+        # Creating the pool or starting the reactor does not start any thread.
+        self.assertFalse(self.db_pool.pool.started)
+        self.assertEqual(self.db_pool.pool.threads, [])
+
+        queried = self.db_pool.run(lambda value: value * 2, 21)
+
+        self.assertTrue(self.db_pool.pool.started)
+
+        return queried.addCallback(self.assertEqual, 42)
+
+    def test_timeout(self):
+
+        db_pool = DatabasePool(pool_size=1, timeout=0.01)
+        self.addCleanup(db_pool.pool.stop)
+
+        queried = db_pool.run(time.sleep, 0.2)
+
+        return self.assertFailure(queried, defer.TimeoutError)
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_display.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import threading
+import time
+import warnings
+from unittest import TestCase, skipIf
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import numpy as np
+from astropy.io import fits
+
+from twisted.internet import reactor
+
+from bmo.display import DS9Proxy, DS9Session, decimate_image
+from bmo.exceptions import BMOUserWarning
+from bmo.shm import SharedMemorySegment, libc
+from bmo.utils import read_ds9_regions
+
+
+class FakeDS9(object):
+    """Records the XPA commands sent to DS9."""
+
+    def __init__(self):
+        self.commands = []
+        self.regions = 'image\ncircle(100.5,200.5,10)\n'
+
+    def set(self, command, buf=None):
+        self.commands.append(command)
+
+    def set_np2arr(self, arr):
+        self.commands.append('array')
+
+    def set_pyfits(self, hdulist):
+        self.commands.append('pyfits')
+
+    def get(self, command):
+        self.commands.append('get ' + command)
+        if command.startswith('regions'):
+            return self.regions
+        return '0'
+
+
+class TestDS9Session(TestCase):
+
+    def setUp(self):
+
+        self.ds9 = FakeDS9()
+        self.session = DS9Session(self.ds9, cache_frame=True, display={})
+        self.image = np.zeros((1216, 1936))
+
+    def test_display_batches_regions(self):
+
+        self.session.display(self.image, centroid=(100, 200, 10, 1.5), frame=1)
+
+        self.assertEqual(self.ds9.commands, ['frame 1', 'array', 'zoom to fit', 'regions'])
+
+    def test_skips_redundant_commands(self):
+
+        self.session.display(self.image, frame=1)
+        self.ds9.commands = []
+
+        self.session.display(self.image, frame=1)
+        self.assertEqual(self.ds9.commands, ['array', 'regions'])
+
+    def test_no_frame_cache(self):
+
+        session = DS9Session(self.ds9, cache_frame=False, display={})
+
+        session.display(self.image, frame=3)
+        self.ds9.commands = []
+
+        session.display(self.image, frame=3)
+        self.assertEqual(self.ds9.commands, ['frame 3', 'array', 'regions'])
+
+    def test_invalidate_on_frame_delete(self):
+
+        self.session.display(self.image, frame=1)
+        self.session.set('frame delete all')
+        self.ds9.commands = []
+
+        self.session.display(self.image, frame=1)
+        self.assertEqual(self.ds9.commands, ['frame 1', 'array', 'zoom to fit', 'regions'])
+
+    def test_regions(self):
+
+        regions = DS9Session.get_regions(self.image.shape, centroid=(100, 200, 10, 1.5))
+
+        self.assertIn('point(968.0, 608.0)', regions)
+        self.assertIn('circle(100.0, 200.0, 10.0)', regions)
+        self.assertIn('text={1.50}', regions)
+
+    def test_read_regions_uses_cached_shape(self):
+
+        self.session.display(self.image, frame=1)
+        self.ds9.commands = []
+
+        result = read_ds9_regions(self.session, frame=1)
+
+        self.assertEqual(result, (True, (100.5, 200.5, 1936, 1216)))
+        self.assertEqual(self.ds9.commands, ['get regions -format ds9 -system image'])
+
+    def test_send_fits_caches_shape(self):
+
+        hdulist = fits.HDUList([fits.PrimaryHDU(np.zeros((300, 400), dtype=np.float32))])
+
+        self.session.set_frame(2)
+        self.session.send_fits(hdulist)
+
+        self.assertEqual(self.session.get_shape(2), (400, 300))
+        self.assertEqual(self.ds9.commands, ['frame 2', 'pyfits'])
+
+    def test_binned_regions(self):
+
+        session = DS9Session(self.ds9, display={'binning': 4, 'dtype': 'float32'})
+        session.display(self.image, centroid=(100, 200, 10, 1.5), frame=1)
+
+        self.assertEqual(session.get_shape(1), (484, 304))
+
+        regions = DS9Session.get_regions(self.image.shape, centroid=(100, 200, 10, 1.5),
+                                         binning=4)
+        self.assertIn('point(242.375, 152.375)', regions)
+        self.assertIn('circle(25.375, 50.375, 2.5)', regions)
+
+        # Regions read from a binned frame are returned in full-resolution pixels.
+        result = read_ds9_regions(session, frame=1)
+        self.assertEqual(result, (True, (400.5, 800.5, 1936, 1216)))
+
+    def test_binned_regions_pixel_centres(self):
+
+        session = DS9Session(self.ds9, display={'binning': 4, 'dtype': 'float32'})
+        session.display(self.image, frame=1)
+
+        # The first binned pixel covers full-resolution pixels 1 to 4.
+        self.ds9.regions = 'image\ncircle(1,1,5)\n'
+        self.assertEqual(read_ds9_regions(session, frame=1), (True, (2.5, 2.5, 1936, 1216)))
+
+        # A region drawn from a centroid is read back at the same position.
+        regions = DS9Session.get_regions(self.image.shape, centroid=(401.5, 802.5, 10, 1.5),
+                                         binning=4)
+        self.ds9.regions = regions.replace(' ', '')
+        self.assertEqual(read_ds9_regions(session, frame=1), (True, (401.5, 802.5, 1936, 1216)))
+
+
+@skipIf(libc is None, 'System V shared memory is not available.')
+class TestSharedMemory(TestCase):
+
+    def test_segment(self):
+
+        image = np.arange(12, dtype=np.float32).reshape(3, 4)
+
+        segment = SharedMemorySegment(image.shape, image.dtype)
+        segment.write(image)
+
+        np.testing.assert_array_equal(segment.array, image)
+        self.assertTrue(segment.fits(image))
+        self.assertFalse(segment.fits(image.astype(np.float64)))
+        self.assertIn('[xdim=4,ydim=3,bitpix=-32,', segment.get_ds9_command())
+
+        segment.close()
+        self.assertIsNone(segment.address)
+
+    def test_session_reuses_segment(self):
+
+        ds9 = FakeDS9()
+        session = DS9Session(ds9, display={'binning': 2, 'dtype': 'uint16',
+                                           'transport': 'shm'})
+
+        image = np.ones((1216, 1936))
+
+        session.display(image, frame=1)
+        shmid = session.segments[1].shmid
+
+        session.display(image, frame=1)
+        self.assertEqual(session.segments[1].shmid, shmid)
+
+        self.assertNotIn('array', ds9.commands)
+        self.assertIn('shm array shmid {0} [xdim=968,ydim=608,bitpix=-16,'.format(shmid),
+                      ds9.commands[-2])
+        np.testing.assert_array_equal(session.segments[1].array, 1)
+
+        session.close()
+        self.assertEqual(session.segments, {})
+
+
+class TestDecimateImage(TestCase):
+
+    def setUp(self):
+
+        self.image = np.arange(6 * 8, dtype=np.float64).reshape(6, 8) - 10
+
+    def test_mean(self):
+
+        binned = decimate_image(self.image, binning=2, dtype='float32')
+
+        self.assertEqual(binned.shape, (3, 4))
+        self.assertEqual(binned.dtype, np.float32)
+        self.assertAlmostEqual(binned[0, 0], np.mean(self.image[0:2, 0:2]))
+
+    def test_subsample_uint16(self):
+
+        binned = decimate_image(self.image, binning=3, method='subsample', dtype='uint16')
+
+        self.assertEqual(binned.shape, (2, 2))
+        self.assertEqual(binned.dtype, np.uint16)
+        np.testing.assert_array_equal(binned, [[0, 0], [14, 17]])
+
+    def test_no_binning(self):
+
+        self.assertIs(decimate_image(self.image), self.image)
+
+
+class TestDS9Proxy(TestCase):
+
+    def setUp(self):
+
+        self.ds9 = FakeDS9()
+        self.proxy = DS9Proxy(DS9Session(self.ds9, cache_frame=True), timeout=60)
+
+        # Blocks the DS9 thread until the test releases it.
+        self.release = threading.Event()
+        self.proxy.call(lambda session: self.release.wait())
+
+    def tearDown(self):
+
+        self.release.set()
+        self.proxy.stop()
+        self.proxy.thread.join()
+
+    def test_keeps_newest_frame(self):
+
+        results = []
+        image = np.zeros((10, 10))
+
+        for __ in range(3):
+            self.proxy.display(image, frame=1).addCallback(results.append)
+
+        self.proxy.display(image, frame=3)
+
+        # The first two images for frame 1 are superseded and fire with None.
+        self.assertEqual(results, [None, None])
+        self.assertEqual(self.proxy.n_superseded, 2)
+        self.assertEqual(len(self.proxy._tasks), 3)
+
+        done = threading.Event()
+        self.proxy.call(lambda session: done.set())
+
+        self.release.set()
+        self.assertTrue(done.wait(5))
+
+        self.assertEqual(self.ds9.commands.count('array'), 2)
+
+    def _wait_blocked(self):
+        """Waits until the blocking call is running in the DS9 thread."""
+
+        while self.proxy._started is None:
+            time.sleep(0.01)
+
+    def test_replaces_stuck_thread(self):
+
+        stuck_thread = self.proxy.thread
+        self._wait_blocked()
+
+        self.assertFalse(self.proxy.check_stuck())
+
+        self.proxy.timeout = 0.05
+        time.sleep(0.1)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            done = threading.Event()
+            self.proxy.call(lambda session: done.set())
+
+        self.assertEqual(self.proxy.n_restarts, 1)
+        self.assertTrue(issubclass(caught[0].category, BMOUserWarning))
+
+        # The call runs in the new thread while the stuck one is still blocked.
+        self.assertIsNot(self.proxy.thread, stuck_thread)
+        self.assertTrue(done.wait(5))
+        self.assertTrue(stuck_thread.is_alive())
+
+        # The stuck thread exits when its call returns.
+        self.release.set()
+        stuck_thread.join(5)
+        self.assertFalse(stuck_thread.is_alive())
+
+    def test_stop_removes_shutdown_trigger(self):
+
+        trigger = self.proxy._shutdown_trigger
+        self._wait_blocked()
+
+        with mock.patch.object(reactor, 'removeSystemEventTrigger',
+                               wraps=reactor.removeSystemEventTrigger) as remove:
+            self.proxy.stop()
+            self.proxy.stop()
+
+        remove.assert_called_once_with(trigger)
+        self.assertIsNone(self.proxy._shutdown_trigger)
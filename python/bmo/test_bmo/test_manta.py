@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_manta.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from unittest import TestCase, skipIf
+
+import numpy as np
+
+from bmo.exceptions import MantaError
+
+try:
+    from bmo.devices.manta import FrameRing
+except ImportError:
+    FrameRing = None
+
+
+def make_frame(value, shape=(4, 6)):
+    """Returns a Vimba-like frame buffer filled with ``value``."""
+
+    return np.full(shape, value, dtype=np.uint16).tobytes()
+
+
+@skipIf(FrameRing is None, 'twistedActor is not available.')
+class TestFrameRing(TestCase):
+
+    def setUp(self):
+
+        self.ring = FrameRing(3, (4, 6))
+
+    def test_copy(self):
+
+        frame = bytearray(make_frame(7))
+        array = self.ring.copy(frame)
+
+        self.assertEqual(array.shape, (4, 6))
+        self.assertEqual(array.dtype, np.uint16)
+        self.assertTrue(np.all(array == 7))
+
+        # The array does not share memory with the Vimba frame.
+        frame[:] = make_frame(0)
+        self.assertTrue(np.all(array == 7))
+
+    def test_round_robin(self):
+
+        arrays = [self.ring.copy(make_frame(ii)) for ii in range(3)]
+
+        for ii, array in enumerate(arrays):
+            self.assertIs(array, self.ring.buffers[ii])
+            self.assertTrue(np.all(array == ii))
+
+    def test_wrap_around(self):
+
+        first = self.ring.copy(make_frame(1))
+        self.ring.copy(make_frame(2))
+        self.ring.copy(make_frame(3))
+
+        # The fourth frame reuses, and overwrites, the first buffer.
+        fourth = self.ring.copy(make_frame(4))
+
+        self.assertIs(fourth, first)
+        self.assertTrue(np.all(first == 4))
+        self.assertTrue(np.all(self.ring.buffers[1] == 2))
+
+    def test_max_in_flight(self):
+
+        self.assertEqual(len(FrameRing(4, (4, 6), max_in_flight=3)), 4)
+
+        with self.assertRaises(MantaError):
+            FrameRing(3, (4, 6), max_in_flight=3)
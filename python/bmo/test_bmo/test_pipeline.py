@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_pipeline.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import threading
+
+from twisted.trial import unittest
+
+from bmo.pipeline import ImagePipeline
+
+
+class TestImagePipeline(unittest.TestCase):
+
+    def setUp(self):
+
+        self.pipeline = ImagePipeline(workers=2, queue_depth=2)
+        self.addCleanup(self.pipeline.pool.stop)
+
+        # Frames block in the workers until released.
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def _process(self, value):
+
+        self.release.wait(5)
+
+        return value
+
+    def test_depth_limit(self):
+
+        first = self.pipeline.submit('on', self._process, 1)
+        self.pipeline.submit('on', self._process, 2)
+
+        self.assertEqual(self.pipeline.get_depth('on'), 2)
+        self.assertTrue(self.pipeline.is_full('on'))
+
+        # The queues are per camera.
+        self.assertEqual(self.pipeline.get_depth('off'), 0)
+        self.assertFalse(self.pipeline.is_full('off'))
+
+        waiter = self.pipeline.wait('on')
+        self.assertFalse(waiter.called)
+
+        self.release.set()
+
+        def _check(__):
+            self.assertTrue(first.called)
+            self.assertFalse(self.pipeline.is_full('on'))
+
+        return waiter.addCallback(_check)
+
+    def test_wait_room(self):
+
+        self.pipeline.submit('on', self._process, 1)
+
+        # There is room for a second frame.
+        self.assertTrue(self.pipeline.wait('on').called)
+
+    def test_wait_empty(self):
+
+        processed = [self.pipeline.submit('on', self._process, ii) for ii in range(2)]
+
+        waiter = self.pipeline.wait('on', empty=True)
+        self.assertFalse(waiter.called)
+
+        self.release.set()
+
+        def _check(__):
+            self.assertTrue(all(dd.called for dd in processed))
+            self.assertEqual(self.pipeline.get_depth('on'), 0)
+
+        return waiter.addCallback(_check)
+
+    def test_release_on_failure(self):
+
+        def _fail():
+            raise ValueError('bad frame')
+
+        failed = self.pipeline.submit('on', _fail)
+        self.assertEqual(self.pipeline.get_depth('on'), 1)
+
+        def _check(__):
+            self.assertEqual(self.pipeline.get_depth('on'), 0)
+            self.assertTrue(self.pipeline.wait('on', empty=True).called)
+
+        return self.assertFailure(failed, ValueError).addCallback(_check)
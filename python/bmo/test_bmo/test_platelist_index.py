@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_platelist_index.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from astropy.io import fits
+
+from bmo.platelist_index import PlatelistIndex, build_index, find_plates
+
+
+def write_dss(path, ra, dec):
+
+    header = fits.Header()
+    header['CTYPE1'] = 'RA---TAN'
+    header['CTYPE2'] = 'DEC--TAN'
+    header['CRPIX1'] = 5.5
+    header['CRPIX2'] = 5.5
+    header['CRVAL1'] = ra
+    header['CRVAL2'] = dec
+    header['CDELT1'] = -0.001
+    header['CDELT2'] = 0.001
+
+    fits.writeto(path, np.zeros((10, 10), dtype=np.float32), header)
+
+
+class TestPlatelistIndex(TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.platelist = os.path.join(self.tmp_dir, 'platelist')
+
+        for plate_id, offaxis in [(8000, True), (10012, False)]:
+            plate6 = str(plate_id).zfill(6)
+            plate_dir = os.path.join(self.platelist, 'plates', plate6[0:4] + 'XX', plate6)
+            os.makedirs(plate_dir)
+            write_dss(os.path.join(plate_dir, 'acquisitionDSS-r2-{0}-p1-center.fits'
+                                   .format(plate6)), 100., 30.)
+            if offaxis:
+                write_dss(os.path.join(plate_dir, 'acquisitionDSS-r2-{0}-p1-offaxis.fits'
+                                       .format(plate6)), 101., 31.)
+
+        self.path = os.path.join(self.tmp_dir, 'index.npy')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def test_find_plates(self):
+
+        self.assertEqual(find_plates(self.platelist), [8000, 10012])
+
+    def test_build_and_lookup(self):
+
+        index = build_index(self.platelist, self.path, processes=2)
+        self.assertEqual(list(index['plate_id']), [8000, 10012])
+
+        platelist_index = PlatelistIndex(self.path)
+        platelist_index.load()
+
+        self.assertEqual(len(platelist_index), 2)
+        self.assertIsInstance(platelist_index.index, np.memmap)
+
+        np.testing.assert_allclose(platelist_index.get(8000, camera='center'), (100., 30.))
+        np.testing.assert_allclose(platelist_index.get(8000, camera='offaxis'), (101., 31.))
+        np.testing.assert_allclose(platelist_index.get(10012, camera='center'), (100., 30.))
+
+        self.assertIsNone(platelist_index.get(10012, camera='offaxis'))
+        self.assertIsNone(platelist_index.get(9000))
+        self.assertIsNone(platelist_index.get(20000))
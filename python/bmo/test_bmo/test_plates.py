@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_plates.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from unittest import TestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from twisted.internet import defer
+
+from bmo.exceptions import BMOError
+from bmo.plates import CartridgeCache, PlateCache, PlateMetadata
+
+
+def get_camera_coordinates(plate_id, camera='center'):
+    if camera == 'offaxis':
+        raise BMOError('DSS image not found.')
+    return (100., 30.)
+
+
+class TestPlateMetadata(TestCase):
+
+    @mock.patch('bmo.plates.get_camera_focal', return_value=(1., 2.))
+    @mock.patch('bmo.plates.get_acquisition_dss_path', return_value='dss.fits')
+    @mock.patch('bmo.plates.get_camera_coordinates', side_effect=get_camera_coordinates)
+    def test_load(self, *mocks):
+
+        metadata = PlateMetadata.load(8000)
+
+        self.assertEqual(metadata.get_camera_coordinates('center'), (100., 30.))
+        self.assertEqual(metadata.get_camera_coordinates('offaxis'), (None, None))
+        self.assertEqual(metadata.focal, {'center': (1., 2.), 'offaxis': (1., 2.)})
+        self.assertEqual(len(metadata.errors), 1)
+
+
+class TestPlateCache(TestCase):
+
+    def test_get(self):
+
+        cache = PlateCache()
+        cache.metadata = PlateMetadata(8000, coordinates={'center': (100., 30.)})
+
+        self.assertIs(cache.get(8000), cache.metadata)
+        self.assertEqual(cache.get_camera_coordinates(8000, 'center'), (100., 30.))
+        self.assertEqual(cache.get_camera_coordinates(None, 'center'), (None, None))
+
+    def test_refresh_loaded(self):
+
+        cache = PlateCache()
+        cache.metadata = PlateMetadata(8000)
+
+        results = []
+        cache.refresh(8000).addCallback(results.append)
+
+        self.assertEqual(results, [cache.metadata])
+
+    @mock.patch('bmo.plates.run_query')
+    def test_refresh_failed(self, run_query):
+
+        metadata = PlateMetadata(8000, coordinates={'center': (100., 30.)})
+        run_query.side_effect = [defer.fail(BMOError('query timed out.')),
+                                 defer.succeed(metadata)]
+
+        cache = PlateCache()
+
+        results = []
+        cache.refresh(8000).addCallback(results.append)
+
+        self.assertEqual(results, [None])
+        self.assertIsNone(cache.loading)
+
+        # The next get retries the query.
+        self.assertIsNone(cache.get(8000))
+        self.assertEqual(run_query.call_count, 2)
+        self.assertIs(cache.get(8000), metadata)
+        self.assertEqual(cache.get_camera_coordinates(8000, 'center'), (100., 30.))
+
+
+@mock.patch('bmo.plates.run_query',
+            side_effect=lambda func, *args: defer.maybeDeferred(func, *args))
+class TestCartridgeCache(TestCase):
+
+    def setUp(self):
+
+        self.plates = {10: 8000}
+        self.lookup = mock.Mock(side_effect=lambda cart_id: self.plates[cart_id])
+        self.refreshed = []
+
+        self.cache = CartridgeCache(ttl=300, lookup=self.lookup)
+
+    def _callback(self, cart_id, plate_id):
+        self.refreshed.append((cart_id, plate_id))
+
+    def test_miss_then_hit(self, deferToThread):
+
+        # The lookup runs synchronously in this test, but get still returns
+        # the value cached before the refresh.
+        self.assertIsNone(self.cache.get(10, callback=self._callback))
+        self.assertEqual(self.refreshed, [(10, 8000)])
+
+        self.assertEqual(self.cache.get(10, callback=self._callback), 8000)
+        self.assertEqual(self.lookup.call_count, 1)
+
+    def test_stale_while_revalidate(self, deferToThread):
+
+        self.cache.get(10)
+
+        self.plates[10] = 8001
+        self.cache.entries[10] = (8000, self.cache.entries[10][1] - 301)
+
+        self.assertEqual(self.cache.get(10, callback=self._callback), 8000)
+        self.assertEqual(self.refreshed, [(10, 8001)])
+        self.assertEqual(self.cache.get(10), 8001)
+
+    def test_failed_lookup(self, deferToThread):
+
+        self.lookup.side_effect = BMOError('no database is available.')
+
+        self.assertIsNone(self.cache.get(10))
+        self.assertIsNone(self.cache.get(10))
+
+        # The second lookup is not attempted until the retry interval passes.
+        self.assertEqual(self.lookup.call_count, 1)
+
+    def test_timeout_fallback(self, deferToThread):
+
+        cache = CartridgeCache(ttl=300, lookup=self.lookup, fallback={10: 8000}.get)
+
+        with mock.patch('bmo.plates.run_query', return_value=defer.fail(defer.TimeoutError())):
+            self.assertIsNone(cache.get(10, callback=self._callback))
+
+        self.assertEqual(self.refreshed, [(10, 8000)])
+
+        # The fallback value is stale, so the lookup is retried.
+        self.assertFalse(cache.is_fresh(10))
+        self.assertEqual(cache.get(10), 8000)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_profiler.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from bmo.exceptions import BMOError
+from bmo.profiler import ReactorProfiler
+
+
+def busy_function():
+    return sum(ii**2 for ii in range(10000))
+
+
+class TestReactorProfiler(TestCase):
+
+    def setUp(self):
+
+        self.output_dir = tempfile.mkdtemp()
+        self.profiler = ReactorProfiler(os.path.join(self.output_dir, 'logs'), n_functions=5)
+
+    def tearDown(self):
+
+        if self.profiler.is_running:
+            self.profiler.stop()
+
+        shutil.rmtree(self.output_dir)
+
+    def test_start_stop(self):
+
+        self.profiler.start()
+        self.assertTrue(self.profiler.is_running)
+
+        busy_function()
+
+        path, stats = self.profiler.stop()
+        self.assertFalse(self.profiler.is_running)
+
+        self.assertTrue(os.path.exists(path))
+        self.assertTrue(path.endswith('.pstats'))
+
+        top = self.profiler.get_top(stats)
+        self.assertLessEqual(len(top), 5)
+        self.assertTrue(any('busy_function' in function for function, __, __, __ in top))
+
+    def test_invalid_state(self):
+
+        with self.assertRaises(BMOError):
+            self.profiler.stop()
+
+        self.profiler.start()
+
+        with self.assertRaises(BMOError):
+            self.profiler.start()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_sequence.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+from bmo.cmds.camera import ExposureSequence
+
+
+class TestExposureSequence(TestCase):
+
+    def setUp(self):
+
+        self.save_path = tempfile.mkdtemp()
+        self.sjd = 58700
+
+        self.sjd_dir = os.path.join(self.save_path, str(self.sjd))
+        os.makedirs(self.sjd_dir)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.save_path)
+
+    def _touch(self, basename):
+
+        open(os.path.join(self.sjd_dir, basename), 'w').close()
+
+    def test_empty_directory(self):
+
+        sequence = ExposureSequence(self.save_path)
+
+        dirname, basename = sequence.next_path(sjd=self.sjd)
+
+        self.assertEqual(dirname, self.sjd_dir)
+        self.assertEqual(basename, 'bimg-0001.fits')
+
+    def test_seed_from_disk(self):
+
+        self._touch('bimg-0009.fits.fz')
+        self._touch('bimg-0010.fits.fz')
+
+        sequence = ExposureSequence(self.save_path)
+
+        self.assertEqual(sequence.seed(sjd=self.sjd), 10)
+        self.assertEqual(sequence.next_path(sjd=self.sjd)[1], 'bimg-0011.fits')
+        self.assertEqual(sequence.next_path(sjd=self.sjd)[1], 'bimg-0012.fits')
+
+    def test_persisted_state(self):
+
+        sequence = ExposureSequence(self.save_path)
+
+        for __ in range(3):
+            sequence.next_path(sjd=self.sjd)
+
+        # No images have been written, but a new sequence continues the numbering.
+        new_sequence = ExposureSequence(self.save_path)
+        self.assertEqual(new_sequence.next_path(sjd=self.sjd)[1], 'bimg-0004.fits')
+
+    def test_rollover(self):
+
+        self._touch('bimg-0005.fits.fz')
+
+        sequence = ExposureSequence(self.save_path)
+
+        self.assertEqual(sequence.next_path(sjd=self.sjd)[1], 'bimg-0006.fits')
+
+        dirname, basename = sequence.next_path(sjd=self.sjd + 1)
+        self.assertEqual(dirname, os.path.join(self.save_path, str(self.sjd + 1)))
+        self.assertEqual(basename, 'bimg-0001.fits')
+
+    def test_concurrent(self):
+
+        sequence = ExposureSequence(self.save_path)
+        paths = []
+
+        def get_paths():
+            for __ in range(50):
+                paths.append(sequence.next_path(sjd=self.sjd)[1])
+
+        threads = [threading.Thread(target=get_paths) for __ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(paths)), 100)
+        self.assertEqual(sorted(paths)[-1], 'bimg-0100.fits')
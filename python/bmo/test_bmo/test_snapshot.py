@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_snapshot.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest import TestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from twisted.internet import defer
+
+from bmo.exceptions import BMOError
+from bmo.snapshot import SCHEMA, PlateSnapshot
+from bmo.utils import get_camera_focal, get_plateid, get_plateid_async, get_plugged_plates
+
+
+class TestPlateSnapshot(TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'plates.sqlite')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def write_snapshot(self, exported_at):
+
+        connection = sqlite3.connect(self.path)
+
+        with connection:
+            connection.executescript(SCHEMA)
+            connection.execute('INSERT INTO metadata VALUES (?, ?)',
+                               ('exported_at', str(exported_at)))
+            connection.execute('INSERT INTO active_plugging VALUES (?, ?)', (12, 8000))
+            connection.execute('INSERT INTO plate VALUES (?, ?, ?)', (8000, 100., 30.))
+            connection.execute('INSERT INTO acquisition_hole VALUES (?, ?, ?, ?)',
+                               (8000, 'offaxis', 150., -20.))
+
+        connection.close()
+
+    def test_load(self):
+
+        self.write_snapshot(time.time())
+
+        snapshot = PlateSnapshot(self.path)
+        snapshot.load()
+
+        self.assertLess(snapshot.age, 60)
+        self.assertEqual(snapshot.get_plateid(12), 8000)
+        self.assertEqual(snapshot.get_pointing(8000), (100., 30.))
+        self.assertEqual(snapshot.get_focal(8000, camera='offaxis'), (150., -20.))
+
+        self.assertIsNone(snapshot.get_plateid(13))
+        self.assertIsNone(snapshot.get_pointing(9000))
+        self.assertIsNone(snapshot.get_focal(8000, camera='center'))
+
+    def test_old_pluggings(self):
+
+        self.write_snapshot(time.time() - 7200)
+
+        snapshot = PlateSnapshot(self.path, plugging_max_age=3600)
+        snapshot.load()
+
+        self.assertIsNone(snapshot.get_plateid(12))
+        self.assertEqual(snapshot.get_pointing(8000), (100., 30.))
+
+    def test_from_config_missing(self):
+
+        snapshot = PlateSnapshot.from_config({'snapshot': {'path': self.path}})
+
+        self.assertIsNone(snapshot.age)
+        self.assertIsNone(snapshot.get_plateid(12))
+
+
+class TestGetPlateid(TestCase):
+    """Tests that the pluggings are read from the database first."""
+
+    def setUp(self):
+
+        self.snapshot = PlateSnapshot('/nonexistent.sqlite')
+        self.snapshot.exported_at = time.time()
+        self.snapshot.pluggings = {12: 8000}
+
+        self.database = mock.Mock()
+        self.platedb = mock.MagicMock()
+
+        select = self.platedb.Plate.select.return_value
+        self.query = select.join.return_value.join.return_value.where.return_value
+
+        for name, value in [('PLATE_SNAPSHOT', self.snapshot), ('database', self.database),
+                            ('platedb', self.platedb)]:
+            patcher = mock.patch('bmo.utils.' + name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_database_first(self):
+
+        # The cartridge was replugged after the snapshot was exported.
+        self.query.scalar.return_value = 8001
+
+        self.assertEqual(get_plateid(12), 8001)
+
+    def test_database_unavailable(self):
+
+        self.database.check_connection.return_value = False
+
+        self.assertEqual(get_plateid(12), 8000)
+
+        with self.assertRaises(BMOError):
+            get_plateid(13)
+
+    def test_no_database(self):
+
+        # sdssdb is not installed.
+        with mock.patch('bmo.utils.database', None):
+
+            self.assertEqual(get_plateid(12), 8000)
+            self.assertEqual(get_plugged_plates(), [8000])
+
+            with self.assertRaises(BMOError):
+                get_camera_focal(8000)
+
+    @mock.patch('bmo.utils.run_query', return_value=defer.fail(defer.TimeoutError()))
+    def test_async_timeout(self, run_query):
+
+        results = []
+        get_plateid_async(12).addCallback(results.append)
+
+        self.assertEqual(results, [8000])
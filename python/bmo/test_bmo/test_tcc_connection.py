@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_tcc_connection.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from unittest import TestCase
+
+from twisted.internet import task
+
+from bmo.devices.tcc_connection import ConnectionManager
+
+
+class FakeCmd(object):
+
+    Failed = 'failed'
+    Done = 'done'
+
+    def __init__(self):
+        self.state = None
+
+    def setState(self, state, textMsg=None):
+        self.state = state
+
+
+class FakeDevice(object):
+    """A device that connects after a number of attempts."""
+
+    def __init__(self, attempts_to_connect=1):
+
+        self.isConnected = False
+        self.n_connects = 0
+        self.attempts_to_connect = attempts_to_connect
+
+        self.calls = []
+        self.keywords = []
+
+    def connect(self):
+        self.n_connects += 1
+        if self.n_connects >= self.attempts_to_connect:
+            self.isConnected = True
+
+    def writeToUsers(self, code, keywords):
+        self.keywords.append(keywords)
+
+
+def offset(device, user_cmd=None, **kwargs):
+    device.calls.append(('offset', user_cmd, kwargs))
+
+
+def update_status(device, user_cmd=None):
+    device.calls.append(('update_status', user_cmd, {}))
+
+
+class TestConnectionManager(TestCase):
+
+    def get_manager(self, device, **kwargs):
+
+        self.clock = task.Clock()
+
+        kwargs.setdefault('jitter', 0)
+        kwargs.setdefault('connect_timeout', 1)
+
+        return ConnectionManager(device, clock=self.clock, **kwargs)
+
+    def test_get_delay(self):
+
+        manager = self.get_manager(FakeDevice(), initial_delay=1, factor=2, max_delay=10,
+                                   jitter=0.5)
+
+        self.assertEqual(self.get_manager(FakeDevice()).get_delay(2), 4)
+        self.assertEqual(self.get_manager(FakeDevice(), max_delay=10).get_delay(10), 10)
+
+        for __ in range(10):
+            self.assertTrue(2 <= manager.get_delay(2) <= 6)
+
+    def test_replays_in_order(self):
+
+        device = FakeDevice(attempts_to_connect=3)
+        manager = self.get_manager(device)
+
+        status_cmd, offset_cmd = FakeCmd(), FakeCmd()
+        manager.enqueue(update_status, status_cmd)
+        manager.enqueue(offset, offset_cmd, ra=1.)
+
+        self.assertEqual(manager.state, 'reconnecting')
+        self.assertEqual(device.keywords[-1], 'tccQueue=2,8')
+
+        # Attempt 1 fails, waits 1 s; attempt 2 fails, waits 2 s; attempt 3 connects.
+        self.clock.advance(1)
+        self.clock.advance(1)
+        self.clock.advance(1)
+        self.assertEqual(device.calls, [])
+        self.clock.advance(2)
+        self.clock.advance(1)
+
+        self.assertEqual(device.n_connects, 3)
+        self.assertEqual([call[0] for call in device.calls], ['update_status', 'offset'])
+        self.assertEqual(device.calls[1][2], {'ra': 1.})
+        self.assertEqual(len(manager.queue), 0)
+        self.assertEqual(manager.state, 'connected')
+        self.assertEqual(device.keywords[-2], 'tccConnection="connected",0,-999.0')
+
+        # The deadlines were cancelled.
+        self.clock.advance(60)
+        self.assertIsNone(offset_cmd.state)
+
+    def test_deadline(self):
+
+        device = FakeDevice(attempts_to_connect=100)
+        manager = self.get_manager(device, deadlines={'offset': 5, 'update_status': 30})
+
+        offset_cmd, status_cmd = FakeCmd(), FakeCmd()
+        manager.enqueue(offset, offset_cmd)
+        manager.enqueue(update_status, status_cmd)
+
+        self.clock.advance(5)
+
+        self.assertEqual(offset_cmd.state, FakeCmd.Failed)
+        self.assertIsNone(status_cmd.state)
+        self.assertEqual(len(manager.queue), 1)
+
+    def test_queue_full(self):
+
+        manager = self.get_manager(FakeDevice(attempts_to_connect=100), queue_size=1)
+
+        first_cmd, second_cmd = FakeCmd(), FakeCmd()
+        manager.enqueue(offset, first_cmd)
+        manager.enqueue(offset, second_cmd)
+
+        self.assertIsNone(first_cmd.state)
+        self.assertEqual(second_cmd.state, FakeCmd.Failed)
+
+    def test_watch_and_stop(self):
+
+        device = FakeDevice(attempts_to_connect=100)
+        manager = self.get_manager(device, watch_interval=5)
+
+        manager.start()
+        self.clock.advance(5)
+
+        self.assertTrue(manager.reconnecting)
+        self.assertEqual(device.n_connects, 1)
+
+        offset_cmd = FakeCmd()
+        manager.enqueue(offset, offset_cmd)
+        manager.stop()
+
+        self.assertEqual(offset_cmd.state, FakeCmd.Failed)
+        self.assertEqual(manager.state, 'disconnected')
+
+        self.clock.advance(60)
+        self.assertEqual(device.n_connects, 1)
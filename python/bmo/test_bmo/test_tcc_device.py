@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_tcc_device.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from unittest import TestCase, skipIf
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from bmo.plates import CartridgeCache
+
+try:
+    from bmo.devices.tcc_device import TCCState
+except ImportError:
+    TCCState = None
+
+
+@skipIf(TCCState is None, 'twistedActor is not available.')
+class TestTCCState(TestCase):
+
+    def setUp(self):
+
+        self.cartridge_cache = CartridgeCache()
+        self.cartridge_cache.entries[12] = (8000, float('inf'))
+
+        self.state = TCCState(cartridge_cache=self.cartridge_cache)
+
+        self.monotonic = mock.patch('bmo.devices.tcc_device.monotonic', return_value=100.)
+        self.monotonic.start()
+
+    def tearDown(self):
+
+        self.monotonic.stop()
+
+    def set_status(self):
+
+        self.state.update('instrumentNum', 12)
+        self.state.update('axis_states', ['tracking'] * 3)
+        self.state.update('tcc_pos', [121.5, 60.25, 15.])
+
+    def test_update(self):
+
+        self.set_status()
+
+        self.assertEqual(self.state.plate_id, 8000)
+        self.assertEqual(self.state.get_age('tcc_pos'), 0.)
+        self.assertIsNone(self.state.get_age('secOrient'))
+
+    def test_is_fresh(self):
+
+        self.assertFalse(self.state.is_fresh(2))
+
+        self.set_status()
+
+        with mock.patch('bmo.devices.tcc_device.monotonic', return_value=101.):
+            self.assertTrue(self.state.is_fresh(2))
+
+        with mock.patch('bmo.devices.tcc_device.monotonic', return_value=110.):
+            self.assertFalse(self.state.is_fresh(2))
+            self.assertTrue(self.state.is_fresh({'instrumentNum': 600, 'axis_states': 20,
+                                                 'tcc_pos': 20}))
+
+    def test_is_status_complete(self):
+
+        self.set_status()
+
+        self.assertTrue(self.state.is_status_complete())
+        self.assertTrue(self.state.is_status_complete(since=100.))
+        self.assertFalse(self.state.is_status_complete(since=100.5))
+
+        self.state.clear_status()
+        self.assertFalse(self.state.is_status_complete())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_tcc_keywords.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from unittest import TestCase
+
+from bmo.devices.tcc_keywords import parse_reply
+
+
+class TestParseReply(TestCase):
+
+    def test_status(self):
+
+        reply = parse_reply('999 5 i InstrumentNum=12; AxisCmdState=Tracking, Tracking, Halted; '
+                            'TCCPos=121.5, 60.25, NaN; SecOrient=1.0, 2.0; ObjSys=ICRS')
+
+        self.assertEqual((reply.cmd_id, reply.user_id, reply.code), (999, 5, 'i'))
+        self.assertEqual(reply.errors, [])
+
+        values = dict(reply.values)
+        self.assertEqual(values['instrumentNum'], 12)
+        self.assertEqual(values['axis_states'], ['tracking', 'tracking', 'halted'])
+        self.assertEqual(values['tcc_pos'][:2], [121.5, 60.25])
+        self.assertEqual(values['secOrient'], '1.0, 2.0')
+        self.assertEqual(len(values), 4)
+
+    def test_user_id(self):
+
+        reply = parse_reply('0 0 i YourUserID=3')
+
+        self.assertEqual(reply.values, [('myUserID', 3)])
+
+    def test_no_keywords(self):
+
+        reply = parse_reply('1 3 :')
+
+        self.assertEqual((reply.cmd_id, reply.user_id, reply.code), (1, 3, ':'))
+        self.assertEqual(reply.values, [])
+
+    def test_exact_names(self):
+
+        reply = parse_reply('0 1 i GCamInstrumentNum=3; TCCPosExtra=1')
+
+        self.assertEqual(reply.values, [])
+
+    def test_bad_value(self):
+
+        reply = parse_reply('0 1 i InstrumentNum=?; TCCPos=1, 2, 3')
+
+        self.assertEqual(reply.values, [('tcc_pos', [1., 2., 3.])])
+        self.assertEqual(reply.errors[0][0], 'instrumentnum')
+
+    def test_empty(self):
+
+        self.assertIsNone(parse_reply(''))
+        self.assertIsNone(parse_reply('not a reply'))
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_tcc_simulator.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from unittest import skipIf
+
+from twisted.internet import defer, protocol, reactor, task
+from twisted.protocols.basic import LineReceiver
+from twisted.trial import unittest
+
+from bmo.devices.tcc_keywords import parse_reply
+from bmo.devices.tcc_simulator import TCCSimulator
+from bmo.timing import monotonic
+
+try:
+    from twistedActor import UserCmd
+    from bmo.devices.tcc_device import TCCDevice
+    from bmo.plates import CartridgeCache
+except ImportError:
+    TCCDevice = None
+
+
+def sleep(seconds):
+    """Returns a deferred that fires after ``seconds``."""
+
+    return task.deferLater(reactor, seconds, lambda: None)
+
+
+@defer.inlineCallbacks
+def wait_for(condition, timeout=5, interval=0.01):
+    """Waits until ``condition()`` is true. Fails after ``timeout`` seconds."""
+
+    start = monotonic()
+
+    while not condition():
+        if monotonic() - start > timeout:
+            raise defer.TimeoutError('condition not met after {0} s.'.format(timeout))
+        yield sleep(interval)
+
+
+def wait_for_command(cmd):
+    """Returns a deferred that fires with ``cmd`` when it finishes."""
+
+    finished = defer.Deferred()
+
+    def _check(cmd):
+        if cmd.isDone and not finished.called:
+            finished.callback(cmd)
+
+    cmd.addCallback(_check)
+    _check(cmd)
+
+    return finished
+
+
+class TCCClient(LineReceiver):
+    """A minimal TCC client that fires a deferred when a command finishes."""
+
+    delimiter = b'\n'
+
+    def connectionMade(self):
+
+        self.replies = []
+        self.waiting = {}
+        self.lost = defer.Deferred()
+
+        self.factory.connected.callback(self)
+
+    def connectionLost(self, reason):
+
+        self.lost.callback(None)
+
+    def lineReceived(self, line):
+
+        reply = parse_reply(line.decode())
+        self.replies.append(reply)
+
+        if reply.code in (':', 'f') and reply.cmd_id in self.waiting:
+            self.waiting.pop(reply.cmd_id).callback(reply)
+
+    def send_command(self, cmd_id, command):
+
+        self.waiting[cmd_id] = defer.Deferred()
+        self.sendLine('{0} {1}'.format(cmd_id, command).encode())
+
+        return self.waiting[cmd_id]
+
+
+class TestTCCSimulator(unittest.TestCase):
+
+    def connect(self, **kwargs):
+        """Starts a simulator and returns a deferred that fires with a connected client."""
+
+        self.simulator = TCCSimulator(**kwargs)
+        port = self.simulator.listen()
+
+        factory = protocol.ClientFactory()
+        factory.protocol = TCCClient
+        factory.connected = defer.Deferred()
+
+        connector = reactor.connectTCP('127.0.0.1', port, factory)
+        self.addCleanup(connector.disconnect)
+        self.addCleanup(self.simulator.stop)
+
+        return factory.connected
+
+    @defer.inlineCallbacks
+    def test_status(self):
+
+        client = yield self.connect(instrument_num=15)
+        yield client.send_command(999, 'device status')
+
+        self.assertEqual(client.replies[0].values, [('myUserID', 1)])
+
+        values = dict(client.replies[1].values)
+        self.assertEqual(values['instrumentNum'], 15)
+        self.assertEqual(values['axis_states'], ['tracking'] * 3)
+
+    @defer.inlineCallbacks
+    def test_guideoffset(self):
+
+        client = yield self.connect()
+        reply = yield client.send_command(999, 'guideoffset 0.001,-0.002,0.0,0.0,0.0')
+
+        self.assertEqual(reply.code, ':')
+        self.assertEqual(self.simulator.offsets, [[0.001, -0.002, 0., 0., 0.]])
+
+    @defer.inlineCallbacks
+    def test_round_trip_latency(self):
+
+        client = yield self.connect(reply_delay=0.05)
+
+        start = monotonic()
+        for cmd_id in range(5):
+            yield client.send_command(cmd_id + 1, 'device status')
+        latency = (monotonic() - start) / 5
+
+        self.assertGreaterEqual(latency, 0.05)
+        self.assertLess(latency, 0.5)
+
+    @defer.inlineCallbacks
+    def test_stream(self):
+
+        client = yield self.connect(stream_interval=0.01)
+        yield client.send_command(1, 'device status')
+
+        yield sleep(0.1)
+
+        streamed = [reply for reply in client.replies if reply.cmd_id == 0][1:]
+        self.assertGreater(len(streamed), 2)
+
+    @defer.inlineCallbacks
+    def test_disconnect_after(self):
+
+        client = yield self.connect(disconnect_after=2)
+        yield client.send_command(1, 'device status')
+
+        client.sendLine(b'2 device status')
+        yield client.lost
+
+        self.assertEqual(len(self.simulator.commands), 2)
+
+
+@skipIf(TCCDevice is None, 'twistedActor is not available.')
+class TestTCCDevice(unittest.TestCase):
+
+    @defer.inlineCallbacks
+    def setUp(self):
+
+        self.simulator = TCCSimulator(instrument_num=12, reply_delay=0.01)
+        port = self.simulator.listen()
+        self.addCleanup(self.simulator.stop)
+
+        self.device = TCCDevice('tcc', '127.0.0.1', port)
+        self.device.dev_state.cartridge_cache = CartridgeCache(lookup=lambda cart_id: 8000)
+        self.device.connect()
+        self.addCleanup(self.device.disconnect)
+
+        yield wait_for(lambda: self.device.isConnected)
+
+    @defer.inlineCallbacks
+    def test_update_status_latency(self):
+
+        start = monotonic()
+        for __ in range(10):
+            status_cmd = yield wait_for_command(self.device.update_status())
+            self.assertFalse(status_cmd.didFail)
+        latency = (monotonic() - start) / 10
+
+        self.assertLess(latency, 1)
+        self.assertEqual(self.device.dev_state.instrumentNum, 12)
+        self.assertEqual(self.device.dev_state.axis_states, ['tracking'] * 3)
+
+    @defer.inlineCallbacks
+    def test_get_status_uses_cache(self):
+
+        yield wait_for_command(self.device.update_status())
+        n_commands = len(self.simulator.commands)
+
+        status_cmd = yield wait_for_command(self.device.get_status(max_age=60))
+
+        self.assertFalse(status_cmd.didFail)
+        self.assertEqual(len(self.simulator.commands), n_commands)
+
+    @defer.inlineCallbacks
+    def test_offset_latency(self):
+
+        yield wait_for_command(self.device.update_status())
+
+        start = monotonic()
+        self.device.offset(ra=3.6, dec=-3.6)
+        yield wait_for(lambda: len(self.simulator.offsets) > 0)
+
+        self.assertLess(monotonic() - start, 1)
+        self.assertAlmostEqual(self.simulator.offsets[0][0], 0.001)
+
+    @defer.inlineCallbacks
+    def test_status_under_load(self):
+
+        self.simulator.start_stream(0.001)
+
+        status_cmd = yield wait_for_command(self.device.update_status())
+
+        self.assertFalse(status_cmd.didFail)
+
+    @defer.inlineCallbacks
+    def test_reconnect(self):
+
+        self.simulator.disconnect_all()
+        yield wait_for(lambda: self.device.isDisconnected)
+
+        status_cmd = UserCmd()
+        self.device.update_status(status_cmd)
+        yield wait_for_command(status_cmd)
+
+        self.assertFalse(status_cmd.didFail)
+        self.assertTrue(self.device.isConnected)
+
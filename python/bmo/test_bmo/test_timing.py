@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_timing.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from unittest import TestCase
+
+import numpy as np
+
+from bmo.timing import FrameTimer, StageTimings
+
+
+class FakeActor(object):
+
+    def __init__(self):
+        self.messages = []
+
+    def writeToUsers(self, msgCode, msgStr):
+        self.messages.append((msgCode, msgStr))
+
+
+class TestStageTimings(TestCase):
+
+    def test_percentiles(self):
+
+        timings = StageTimings(window=10, percentiles=(50, 90))
+
+        for duration in range(20):
+            timings.add('on', 'centroid', duration / 1000.)
+
+        n_frames, percentiles = timings.get_percentiles('on', 'centroid')
+
+        self.assertEqual(n_frames, 10)
+        np.testing.assert_allclose(percentiles, np.percentile(np.arange(10, 20), (50, 90)))
+
+    def test_timer(self):
+
+        timings = StageTimings()
+        timer = timings.get_timer('off')
+
+        with timer.span('background'):
+            pass
+
+        timer.add('save', 0.0125)
+
+        self.assertEqual(list(timer.spans), ['background', 'save'])
+        self.assertIn('save=12.5ms', str(timer))
+        self.assertEqual(timings.get_percentiles('off', 'save')[0], 1)
+
+    def test_span_records_on_error(self):
+
+        timer = FrameTimer()
+
+        with self.assertRaises(ValueError):
+            with timer.span('centroid'):
+                raise ValueError()
+
+        self.assertIn('centroid', timer.spans)
+
+    def test_keywords(self):
+
+        timings = StageTimings(percentiles=(50, 90, 99))
+        timings.add('on', 'capture', 0.1)
+
+        actor = FakeActor()
+        timings.update_keywords(actor)
+
+        self.assertEqual(actor.messages,
+                         [('i', 'bmoFrameTiming="on","capture",1,100.0,100.0,100.0')])
+
+    def test_keywords_camera(self):
+
+        timings = StageTimings(percentiles=(50, ))
+        timings.add('on', 'capture', 0.1)
+        timings.add('off', 'capture', 0.2)
+
+        actor = FakeActor()
+        timings.update_keywords(actor, camera_type='off')
+
+        self.assertEqual(actor.messages, [('i', 'bmoFrameTiming="off","capture",1,200.0')])
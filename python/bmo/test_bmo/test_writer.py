@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_writer.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import threading
+
+from unittest import TestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import numpy as np
+
+from twisted.internet import defer
+
+from bmo.writer import FITSWriter
+
+
+class FakeExposure(object):
+    """An exposure whose data defaults to the raw frame, as `.MantaExposure`."""
+
+    def __init__(self, raw, saved, release=None):
+
+        self.raw = raw
+        self._data = None
+
+        self.saved = saved
+        self.release = release
+
+    @property
+    def data(self):
+        return self.raw if self._data is None else self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    def save(self, dirname=None, basename=None, **kwargs):
+
+        if self.release is not None:
+            self.release.wait(5)
+
+        self.saved.append(self.data.copy())
+
+        return basename
+
+
+class TestFITSWriter(TestCase):
+
+    def setUp(self):
+
+        self.writer = FITSWriter(queue_size=4)
+        self.saved = []
+
+    def tearDown(self):
+
+        self.writer.stop()
+
+    def test_raw_frame_copied(self):
+
+        ring_buffer = np.zeros((4, 4), dtype=np.uint16)
+        release = threading.Event()
+
+        exposure = FakeExposure(ring_buffer, self.saved, release=release)
+        self.writer.put(exposure, ('/tmp', 'bimg-0001.fits'))
+
+        self.assertIsNot(exposure.data, ring_buffer)
+
+        # The camera reuses the buffer while the exposure is in the queue.
+        ring_buffer[:] = 1
+
+        release.set()
+        self.writer.stop()
+
+        self.assertEqual(len(self.saved), 1)
+        self.assertEqual(self.saved[0].sum(), 0)
+
+    def test_processed_data_not_copied(self):
+
+        exposure = FakeExposure(np.zeros((4, 4), dtype=np.uint16), self.saved)
+
+        processed = np.ones((4, 4))
+        exposure.data = processed
+
+        self.writer.put(exposure, ('/tmp', 'bimg-0001.fits'))
+
+        self.assertIs(exposure.data, processed)
+
+    def test_save_path_assigned_in_writer_thread(self):
+
+        threads = []
+
+        def next_path():
+            threads.append(threading.current_thread())
+            return ('/tmp', 'bimg-0001.fits')
+
+        exposure = FakeExposure(np.zeros((4, 4), dtype=np.uint16), self.saved)
+        self.writer.put(exposure, next_path)
+        self.writer.stop()
+
+        self.assertEqual(threads, [self.writer.thread])
+        self.assertEqual(len(self.saved), 1)
+
+    @mock.patch('bmo.writer.reactor.callFromThread',
+                side_effect=lambda func, *args: func(*args))
+    def test_saved(self, callFromThread):
+
+        saved = defer.Deferred()
+        results = []
+        saved.addCallback(results.append)
+
+        exposure = FakeExposure(np.zeros((4, 4), dtype=np.uint16), self.saved)
+        self.writer.put(exposure, ('/tmp', 'bimg-0001.fits'), saved=saved)
+        self.writer.stop()
+
+        self.assertEqual(results, ['bimg-0001.fits'])
+
+    @mock.patch('bmo.writer.reactor.callFromThread',
+                side_effect=lambda func, *args: func(*args))
+    def test_saved_dropped(self, callFromThread):
+
+        self.writer.stop()
+
+        writer = FITSWriter(queue_size=1, policy='drop')
+        writer.queue.put(None)  # Stops the thread once the queue is drained.
+        writer.thread.join()
+
+        writer.queue.put(('exposure', None, None, None, {}))
+
+        saved = defer.Deferred()
+        results = []
+        saved.addCallback(results.append)
+
+        exposure = FakeExposure(np.zeros((4, 4), dtype=np.uint16), self.saved)
+        self.assertFalse(writer.put(exposure, ('/tmp', 'bimg-0001.fits'), saved=saved))
+
+        self.assertEqual(results, [None])
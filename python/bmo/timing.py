@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# timing.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import collections
+import contextlib
+import threading
+import time
+
+import numpy as np
+
+
+__all__ = ('monotonic', 'FrameTimer', 'StageTimings')
+
+
+# time.monotonic is not available in Python 2.
+monotonic = getattr(time, 'monotonic', time.time)
+
+
+# These parameters can be overridden by the actor configuration.
+WINDOW = 100                  # Number of frames used to calculate the percentiles.
+PERCENTILES = (50, 90, 99)    # Percentiles reported in bmoFrameTiming.
+
+
+class StageTimings(object):
+    """Rolling durations of the exposure loop stages, per camera.
+
+    Durations can be added from any thread.
+
+    Parameters:
+        window (int):
+            The number of durations to keep for each camera and stage.
+        percentiles (tuple):
+            The percentiles to report.
+
+    """
+
+    def __init__(self, window=WINDOW, percentiles=PERCENTILES):
+
+        self.window = window
+        self.percentiles = tuple(percentiles)
+
+        self.durations = collections.OrderedDict()
+
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates the timings using the ``timing`` section of the configuration."""
+
+        timing_config = config.get('timing', {})
+
+        return cls(window=timing_config.get('window', WINDOW),
+                   percentiles=timing_config.get('percentiles', PERCENTILES))
+
+    def add(self, camera_type, stage, duration):
+        """Adds the ``duration``, in seconds, of a ``stage``."""
+
+        with self._lock:
+            key = (camera_type, stage)
+            if key not in self.durations:
+                self.durations[key] = collections.deque(maxlen=self.window)
+            self.durations[key].append(duration)
+
+    def get_timer(self, camera_type):
+        """Returns a `.FrameTimer` that records into these timings."""
+
+        return FrameTimer(self, camera_type)
+
+    def get_percentiles(self, camera_type, stage):
+        """Returns the number of durations and the percentiles, in ms, for a stage."""
+
+        with self._lock:
+            durations = list(self.durations.get((camera_type, stage), []))
+
+        if len(durations) == 0:
+            return 0, [np.nan] * len(self.percentiles)
+
+        return len(durations), list(np.percentile(durations, self.percentiles) * 1000.)
+
+    def update_keywords(self, actor, camera_type=None):
+        """Outputs a ``bmoFrameTiming`` keyword for each camera and stage.
+
+        The values are the camera type, the stage, the number of frames, and
+        the percentiles of the stage duration, in ms. If ``camera_type`` is
+        set, only the stages of that camera are output.
+
+        """
+
+        with self._lock:
+            keys = [key for key in self.durations
+                    if camera_type is None or key[0] == camera_type]
+
+        for camera, stage in keys:
+            n_frames, percentiles = self.get_percentiles(camera, stage)
+            actor.writeToUsers('i', 'bmoFrameTiming="{0}","{1}",{2},{3}'.format(
+                camera, stage, n_frames,
+                ','.join('{0:.1f}'.format(value) for value in percentiles)))
+
+
+class FrameTimer(object):
+    """Measures the duration of the stages of a single frame.
+
+    Durations are recorded both in the timer and in the parent
+    `.StageTimings`, if any.
+
+    """
+
+    def __init__(self, timings=None, camera_type=None):
+
+        self.timings = timings
+        self.camera_type = camera_type
+
+        self.spans = collections.OrderedDict()
+
+    def add(self, stage, duration):
+        """Records the ``duration``, in seconds, of a ``stage``."""
+
+        self.spans[stage] = duration
+
+        if self.timings is not None:
+            self.timings.add(self.camera_type, stage, duration)
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        """Context manager that records the time spent inside it as ``stage``."""
+
+        start = monotonic()
+
+        try:
+            yield
+        finally:
+            self.add(stage, monotonic() - start)
+
+    def __str__(self):
+
+        return ' '.join('{0}={1:.1f}ms'.format(stage, duration * 1000.)
+                        for stage, duration in self.spans.items())
@@ -17,20 +17,23 @@ import warnings
 
 from astropy.wcs import WCS
 import astropy.time as time
+from twisted.internet import defer
 
 from bmo import pathlib, config
+from bmo.centroid import FOCAL_SCALE, PIXEL_SIZE, get_centroid_backend
+from bmo.db import run_query
+from bmo.display import DS9Session
 from bmo.exceptions import BMOError, BMOUserWarning
+from bmo.platelist_index import PlatelistIndex
+from bmo.snapshot import PlateSnapshot
 
 try:
     from sdssdb.observatory import database, platedb
+    from peewee import PeeweeException
 except ImportError:
     warnings.warn('cannot import database connection.', BMOUserWarning)
     database = platedb = None
-
-try:
-    import PyGuide
-except ImportError:
-    PyGuide = None
+    PeeweeException = BMOError
 
 try:
     import pyds9
@@ -41,13 +44,27 @@ except ImportError:
 __all__ = ('FOCAL_SCALE', 'PIXEL_SIZE', 'get_centroid', 'get_plateid',
            'get_camera_focal', 'get_translation_offset', 'get_rotation_offset',
            'show_in_ds9', 'read_ds9_regions', 'get_camera_coordinates', 'get_sjd',
-           'get_acquisition_dss_path')
-
-FOCAL_SCALE = config['telescope']['focal_scale']
-PIXEL_SIZE = config['cameras']['pixel_scale']
+           'get_acquisition_dss_path', 'get_centroid_window', 'display_in_ds9',
+           'get_ds9_session', 'get_plateid_async', 'get_camera_coordinates_async',
+           'get_camera_focal_async')
 
 DEFAULT_IMAGE_SHAPE = config['cameras']['image_shape']
 
+# Size of the window used to track the centroid from the previous position.
+CENTROID_WINDOW = config['centroid']['window'] if config['centroid']['tracking'] else None
+
+CENTROID_BACKEND = get_centroid_backend()
+
+# Offline copy of the plate geometry. Pointings and holes are read from it
+# before querying the database; pluggings only if the database is not available.
+PLATE_SNAPSHOT = PlateSnapshot.from_config(config)
+
+# The errors after which the pluggings are read from the snapshot.
+DB_ERRORS = (BMOError, PeeweeException)
+
+# Acquisition camera coordinates precomputed from the platelist DSS images.
+PLATELIST_INDEX = PlatelistIndex.from_config(config)
+
 
 # Makes sure database points to the right DB profile
 if database:
@@ -55,16 +72,48 @@ if database:
 
 
 def get_plateid(cartID):
-    """Gets the plateID for a certain cartID."""
+    """Gets the plateID for a certain cartID.
+
+    Queries the database. If it is not available, uses the pluggings in the
+    plate snapshot if it is recent enough, since a cartridge can be
+    replugged during the night.
+
+    """
 
     if cartID == 0:
         return None
 
-    if database.check_connection() is False:
-        raise BMOError('no database is available.')
+    try:
+        if database is None or database.check_connection() is False:
+            raise BMOError('no database is available.')
+        return platedb.Plate.select(platedb.Plate.plate_id).join(platedb.Plugging).join(
+            platedb.ActivePlugging).where(platedb.ActivePlugging.pk == cartID).scalar()
+    except DB_ERRORS:
+        plate_id = PLATE_SNAPSHOT.get_plateid(cartID)
+        if plate_id is None:
+            raise
+        return plate_id
+
 
-    return platedb.Plate.select(platedb.Plate.plate_id).join(platedb.Plugging).join(
-        platedb.ActivePlugging).where(platedb.ActivePlugging.pk == cartID).scalar()
+def get_plugged_plates():
+    """Returns the plate_ids of the plates in the active pluggings.
+
+    Queries the database. If it is not available, uses the pluggings in the
+    plate snapshot if it is recent enough.
+
+    """
+
+    try:
+        if database is None or database.check_connection() is False:
+            raise BMOError('no database is available.')
+        query = platedb.Plate.select(platedb.Plate.plate_id).join(platedb.Plugging).join(
+            platedb.ActivePlugging)
+        return sorted(set(plate.plate_id for plate in query))
+    except DB_ERRORS:
+        plate_ids = PLATE_SNAPSHOT.get_plugged_plates()
+        if plate_ids is None:
+            raise
+        return plate_ids
 
 
 def get_acquisition_dss_path(plate_id, camera='center'):
@@ -84,15 +133,29 @@ def get_acquisition_dss_path(plate_id, camera='center'):
 
 
 def get_camera_coordinates(plate_id, camera='center'):
-    """Returns the RA/Dec coordinates for a camera."""
+    """Returns the RA/Dec coordinates for a camera.
 
-    assert camera in ['center', 'offaxis'], 'invalid camera type.'
+    For the on-axis camera, the plate snapshot is used if the plate is in
+    it, then the database and, if the database is not available, the
+    platelist index. The off-axis coordinates are read from the platelist
+    index and, for plates not indexed, calculated from the DSS image.
 
-    if database.check_connection() is False:
-        raise BMOError('no database is available.')
+    """
+
+    assert camera in ['center', 'offaxis'], 'invalid camera type.'
 
     if camera == 'center':
 
+        pointing = PLATE_SNAPSHOT.get_pointing(plate_id)
+        if pointing is not None:
+            return pointing
+
+        if database is None or database.check_connection() is False:
+            pointing = PLATELIST_INDEX.get(plate_id, camera='center')
+            if pointing is not None:
+                return pointing
+            raise BMOError('no database is available.')
+
         plate = platedb.Plate.get(plate_id=plate_id)
 
         if plate is None:
@@ -105,6 +168,10 @@ def get_camera_coordinates(plate_id, camera='center'):
 
     else:
 
+        coordinates = PLATELIST_INDEX.get(plate_id, camera='offaxis')
+        if coordinates is not None:
+            return coordinates
+
         # TODO: a better way of doing this would be to use xyfocal from the DB
         # and convert it to RA/Dec, but that requires rewriting xy2ad in Python.
 
@@ -118,10 +185,21 @@ def get_camera_coordinates(plate_id, camera='center'):
 
 
 def get_camera_focal(plate_id, camera='center'):
-    """Returns the xyfocal coordinates for a camera."""
+    """Returns the xyfocal coordinates for a camera.
+
+    Uses the plate snapshot if the plate is in it.
+
+    """
 
     assert camera in ['center', 'offaxis'], 'invalid camera type.'
 
+    xy_focal = PLATE_SNAPSHOT.get_focal(plate_id, camera)
+    if xy_focal is not None:
+        return xy_focal
+
+    if database is None or database.check_connection() is False:
+        raise BMOError('no database is available.')
+
     hole_type = 'ACQUISITION_{0}'.format(camera.upper())
 
     query = platedb.PlateHole.select().join(platedb.PlateHoleType).switch(
@@ -135,36 +213,92 @@ def get_camera_focal(plate_id, camera='center'):
     return (float(hole.xfocal), float(hole.yfocal))
 
 
-def get_centroid(image, return_fwhm=False):
-    """Uses PyGuide to return the brightest centroid in an array."""
+def get_plateid_async(cartID):
+    """Like `.get_plateid` but runs in the database pool and returns a deferred.
+
+    If the query times out, uses the pluggings in the plate snapshot.
 
-    if PyGuide is None:
-        raise BMOError('PyGuide cannot be imported.')
+    """
 
-    mask = np.zeros(image.shape, dtype=np.bool)
+    def _timed_out(failure):
+        failure.trap(defer.TimeoutError)
+        plate_id = PLATE_SNAPSHOT.get_plateid(cartID)
+        if plate_id is None:
+            return failure
+        return plate_id
 
-    # Masking to the right part of the image until we understand the origin of
-    # the weird illumination pattern.
-    # mask[:, 1900:] = 1
+    return run_query(get_plateid, cartID).addErrback(_timed_out)
 
-    ccdInfo = PyGuide.CCDInfo(np.median(image), 5, 5)
-    stars = PyGuide.findStars(image, mask, None, ccdInfo)
 
-    centroids = stars[0]
-    assert len(centroids) > 0, 'no centroids found.'
+def get_camera_coordinates_async(plate_id, camera='center'):
+    """Like `.get_camera_coordinates` but runs in the database pool and returns a deferred."""
 
-    if not return_fwhm:
-        return centroids[0]
+    return run_query(get_camera_coordinates, plate_id, camera=camera)
 
-    shape = PyGuide.StarShape.starShape(image.astype(np.float32), mask,
-                                        stars[0][0].xyCtr, 100)
 
-    if shape.fwhm:
-        fwhm = float(shape.fwhm) * PIXEL_SIZE * FOCAL_SCALE
-    else:
-        fwhm = -999.
+def get_camera_focal_async(plate_id, camera='center'):
+    """Like `.get_camera_focal` but runs in the database pool and returns a deferred."""
+
+    return run_query(get_camera_focal, plate_id, camera=camera)
 
-    return (centroids[0], fwhm)
+
+def get_centroid_window(shape, centre, window=CENTROID_WINDOW):
+    """Returns the slices of a window of size ``window`` around ``centre``.
+
+    The window is clipped to the limits of an image of ``shape``.
+    ``centre`` is an ``(x, y)`` tuple.
+
+    """
+
+    half = int(window) // 2
+    xx, yy = int(round(centre[0])), int(round(centre[1]))
+
+    y_min, y_max = max(yy - half, 0), min(yy + half, shape[0])
+    x_min, x_max = max(xx - half, 0), min(xx + half, shape[1])
+
+    return slice(y_min, y_max), slice(x_min, x_max)
+
+
+def get_centroid(image, return_fwhm=False, previous=None, window=CENTROID_WINDOW, backend=None):
+    """Returns the brightest centroid in an array.
+
+    Parameters:
+        image (Numpy ndarray):
+            The image in which to look for stars.
+        return_fwhm (bool):
+            If ``True``, returns a tuple with the centroid and the FWHM of the
+            star in arcsec.
+        previous (tuple or None):
+            The ``(x, y)`` position of the star in the previous frame. If
+            provided, the centroid is searched only in a window of size
+            ``window`` around that position. If no star is found there, falls
+            back to searching the full frame.
+        window (int):
+            The size of the search window, in pixels.
+        backend (`~bmo.centroid.CentroidBackend` or None):
+            The backend used to find the centroid. If ``None``, uses the
+            backend defined in the configuration.
+
+    """
+
+    backend = backend or CENTROID_BACKEND
+
+    if previous is not None and window:
+
+        slice_y, slice_x = get_centroid_window(image.shape, previous, window=window)
+
+        try:
+            result = backend.find(image[slice_y, slice_x], return_fwhm=return_fwhm)
+        except AssertionError:
+            result = None
+
+        if result is not None:
+            centroid = result[0] if return_fwhm else result
+            centroid.xyCtr = (centroid.xyCtr[0] + slice_x.start,
+                              centroid.xyCtr[1] + slice_y.start)
+            return result
+
+    return backend.find(image, return_fwhm=return_fwhm)
 
 
 def get_translation_offset(centroid, shape=DEFAULT_IMAGE_SHAPE, img_centre=None):
@@ -206,7 +340,7 @@ def get_translation_offset(centroid, shape=DEFAULT_IMAGE_SHAPE, img_centre=None)
 
 
 def get_rotation_offset(plate_id, centroid, shape=DEFAULT_IMAGE_SHAPE,
-                        translation_offset=None, img_centre=None):
+                        translation_offset=None, img_centre=None, xy_focal=None):
     """Calculates the rotation offset.
 
     The offset signs are selected so that the returned offset is the one the
@@ -231,6 +365,9 @@ def get_rotation_offset(plate_id, centroid, shape=DEFAULT_IMAGE_SHAPE,
             A tuple containing the x and y coordinates of the centre of the
             image. If None, the centre of the array with shape ``shape`` will
             be used.
+        xy_focal (tuple or None):
+            The ``(xfocal, yfocal)`` of the off-axis camera. If ``None``, it
+            is retrieved from the database.
 
     Returns:
         rotation:
@@ -258,7 +395,7 @@ def get_rotation_offset(plate_id, centroid, shape=DEFAULT_IMAGE_SHAPE,
     centroid = np.array(centroid)
     shape = np.array(shape)
 
-    xy_focal = get_camera_focal(plate_id, camera='offaxis')
+    xy_focal = xy_focal or get_camera_focal(plate_id, camera='offaxis')
     if not xy_focal:
         raise ValueError('cannot determine the x/yFocal of the off-axis camera for this plate. '
                          'The rotation offset cannot be calculated.')
@@ -290,7 +427,7 @@ def get_rotation_offset(plate_id, centroid, shape=DEFAULT_IMAGE_SHAPE,
     return rotation
 
 
-def show_in_ds9(image, frame=1, ds9=None, zoom=None):
+def show_in_ds9(image, frame=1, ds9=None, zoom=None, previous=None):
     """Displays an image in DS9, calculating star centroids.
 
     Parameters:
@@ -305,12 +442,15 @@ def show_in_ds9(image, frame=1, ds9=None, zoom=None):
         zoom (int or None):
             The zoom value to set. If ``zoom=None`` and the zoom of the frame
             is 1, the zoom will be set to fit. Otherwise it keep the same zoom.
+        previous (tuple or None):
+            The ``(x, y)`` position of the star in the previous frame, passed
+            to `.get_centroid` to track the star.
 
     Returns:
         result (None or tuple):
             If no centroid has been found for the image, returns ``None``.
             Otherwise, returns a tuple with the x, y position of the centroid,
-            and the radius, as detected by PyGuide.
+            the radius, and the FWHM, as detected by the centroid backend.
 
     Example:
         Opens a FITS file and displays it
@@ -321,48 +461,67 @@ def show_in_ds9(image, frame=1, ds9=None, zoom=None):
 
     """
 
-    if not isinstance(ds9, pyds9.DS9):
-        if ds9 is None:
-            raise ValueError('no DS9 connection available. Have you run bmo ds9 connect?')
-        elif isinstance(ds9, str):
-            ds9 = pyds9.DS9(ds9)
-        else:
-            raise ValueError('incorrect value for ds9 keyword: {0!r}'.format(ds9))
-
     try:
-        centroid, fwhm = get_centroid(image, return_fwhm=True)
-        xx, yy = centroid.xyCtr
-        rad = centroid.rad
+        centroid, fwhm = get_centroid(image, return_fwhm=True, previous=previous)
+        result = (centroid.xyCtr[0], centroid.xyCtr[1], centroid.rad, fwhm)
     except AssertionError:
-        centroid = None
+        result = None
 
-    ds9.set('frame {0}'.format(frame))
-    ds9.set_np2arr(image)
+    display_in_ds9(image, centroid=result, frame=frame, ds9=ds9, zoom=zoom)
 
-    current_zoom = float(ds9.get('zoom'))
+    return result
 
-    if zoom is not None:
-        ds9.set('zoom {0:.4f}'.format(zoom))
-    else:
-        if current_zoom == 1:
-            ds9.set('zoom to fit')
 
-    ds9.set('regions command {{point({0}, {1}) # point=cross 20, color=blue}}'.format(
-        image.shape[1] / 2., image.shape[0] / 2.))
+def display_in_ds9(image, centroid=None, frame=1, ds9=None, zoom=None):
+    """Displays an image in DS9 with regions for the image centre and centroid.
+
+    Parameters:
+        image (Numpy ndarray):
+            A Numpy ndarray containing the image to display.
+        centroid (tuple or None):
+            A tuple with the x, y position of the centroid, the radius, and
+            the FWHM. If ``None``, only the centre of the image is marked.
+        frame, ds9, zoom:
+            See `.show_in_ds9`.
+
+    """
+
+    get_ds9_session(ds9).display(image, centroid=centroid, frame=frame, zoom=zoom)
 
-    if centroid:
-        ds9.set('regions command {{circle({0}, {1}, {2}) # color=green}}'.format(xx, yy, rad))
-        ds9.set('regions command {{text({0}, {1}) # text="{2:.2f}" color=green}}'
-                .format(xx, yy + rad + 30, fwhm if fwhm else 0.0))
-        return (xx, yy, rad, fwhm)
 
-    return None
+def get_ds9_session(ds9):
+    """Returns a `~bmo.display.DS9Session` for ``ds9``.
+
+    ``ds9`` can be a session, a ``pyds9`` object, or a string to be used to
+    create a ``pyds9`` connection.
+
+    """
+
+    if isinstance(ds9, DS9Session):
+        return ds9
+
+    if pyds9 is not None and isinstance(ds9, pyds9.DS9):
+        return DS9Session(ds9)
+    elif ds9 is None:
+        raise ValueError('no DS9 connection available. Have you run bmo ds9 connect?')
+    elif isinstance(ds9, str):
+        return DS9Session(pyds9.DS9(ds9))
+    else:
+        raise ValueError('incorrect value for ds9 keyword: {0!r}'.format(ds9))
 
 
 def read_ds9_regions(ds9, frame=1):
-    """Reads regions from DS9 and returns the region centre and image dimensions."""
+    """Reads regions from DS9 and returns the region centre and image dimensions.
+
+    If the image in the frame was binned for display, the centre and
+    dimensions are returned in full-resolution pixels. The centre of binned
+    pixel ``xx`` is at ``(xx - 0.5) * binning + 0.5`` in the full image.
 
-    ds9.set('frame {0}'.format(frame))
+    """
+
+    ds9 = get_ds9_session(ds9)
+
+    ds9.set_frame(frame)
     regions = ds9.get('regions -format ds9 -system image')
 
     n_circles = regions.count('circle')
@@ -382,12 +541,14 @@ def read_ds9_regions(ds9, frame=1):
         return False, 'problem found while parsing region for frame {0}: {1!r}'.format(frame, ee)
 
     try:
-        height = int(ds9.get('fits height'))
-        width = int(ds9.get('fits width'))
+        width, height = ds9.get_shape(frame)
     except Exception as ee:
         return False, 'problem found while getting shape for frame {0}: {1!r}'.format(frame, ee)
 
-    return True, (xx, yy, width, height)
+    binning = ds9.get_binning(frame)
+
+    return True, ((xx - 0.5) * binning + 0.5, (yy - 0.5) * binning + 0.5,
+                  width * binning, height * binning)
 
 
 def get_sjd(datetime=None):
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# writer.py
+#
+# Created on 18 Oct 2026.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import collections
+import threading
+
+from twisted.internet import reactor
+
+from bmo.logger import log
+from bmo.timing import monotonic
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+__all__ = ('FITSWriter')
+
+
+# These parameters can be overridden by the actor configuration.
+QUEUE_SIZE = 8      # Maximum number of exposures waiting to be written.
+POLICY = 'block'    # What to do when the queue is full: 'block' or 'drop'.
+
+
+class FITSWriter(object):
+    """Saves exposures to disk in a background thread.
+
+    Exposures are put in a bounded queue and written, in order, by a single
+    writer thread.
+
+    Parameters:
+        queue_size (int):
+            The maximum number of exposures waiting to be written.
+        policy (str):
+            What to do when the queue is full. If ``'block'``, `.put` waits
+            until there is room in the queue. If ``'drop'``, the exposure is
+            not saved.
+
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE, policy=POLICY):
+
+        assert policy in ['block', 'drop'], 'invalid policy {0!r}'.format(policy)
+
+        self.policy = policy
+
+        self.queue = queue.Queue(queue_size)
+
+        self.n_written = 0
+        self.n_dropped = 0
+        self.latencies = collections.deque(maxlen=100)
+
+        self.thread = threading.Thread(target=self._run, name='bmo-writer')
+        self.thread.daemon = True
+        self.thread.start()
+
+        reactor.addSystemEventTrigger('during', 'shutdown', self.stop)
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates a writer using the ``writer`` section of the configuration."""
+
+        writer_config = config.get('writer', {})
+
+        return cls(queue_size=writer_config.get('queue_size', QUEUE_SIZE),
+                   policy=writer_config.get('policy', POLICY))
+
+    def put(self, exposure, save_path, timer=None, saved=None, **kwargs):
+        """Queues an exposure to be saved.
+
+        ``save_path`` is a tuple with the ``(dirname, basename)`` of the image
+        or a function that returns it. The function is called in the writer
+        thread, so that assigning the path, for example with
+        `.ExposureSequence.next_path`, does not block the caller.
+        If a `~bmo.timing.FrameTimer` is passed, the write time is recorded
+        in it as the ``save`` stage. Must not be called from the reactor
+        thread if the policy is ``'block'``. ``kwargs`` are passed to
+        `.MantaExposure.save`. Returns ``False`` if the exposure was dropped.
+
+        If ``saved`` is a `~twisted.internet.defer.Deferred`, it is fired in
+        the reactor thread with the path of the image once it has been
+        written, or with ``None`` if the exposure could not be saved or was
+        dropped.
+
+        If the data of the exposure is its raw frame, it is copied before
+        being queued. The raw frame is a buffer of the camera
+        `~bmo.devices.manta.FrameRing`, which is overwritten after
+        ``n_buffers`` frames, possibly before the exposure is written.
+
+        """
+
+        if exposure.data is exposure.raw:
+            exposure.data = exposure.raw.copy()
+
+        item = (exposure, save_path, timer, saved, kwargs)
+
+        if self.policy == 'block':
+            self.queue.put(item)
+            return True
+
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.n_dropped += 1
+            self._fire(saved, None)
+            return False
+
+        return True
+
+    def _run(self):
+        """Writes exposures as they arrive to the queue."""
+
+        while True:
+
+            item = self.queue.get()
+            if item is None:
+                break
+
+            exposure, save_path, timer, saved, kwargs = item
+
+            start = monotonic()
+
+            try:
+                if callable(save_path):
+                    save_path = save_path()
+                dirname, basename = save_path
+                fn = exposure.save(dirname=dirname, basename=basename, **kwargs)
+            except Exception as ee:
+                reactor.callFromThread(log.warning, 'failed to save image: {0}'.format(ee))
+                self._fire(saved, None)
+                continue
+
+            self.latencies.append(monotonic() - start)
+            self.n_written += 1
+
+            if timer is not None:
+                timer.add('save', self.latencies[-1])
+
+            reactor.callFromThread(log.debug, 'saved image {0}'.format(fn))
+            self._fire(saved, fn)
+
+    def _fire(self, saved, result):
+        """Fires the ``saved`` deferred of an exposure in the reactor thread."""
+
+        if saved is not None:
+            reactor.callFromThread(saved.callback, result)
+
+    def stop(self):
+        """Writes all the queued exposures and stops the writer thread."""
+
+        if not self.thread.is_alive():
+            return
+
+        self.queue.put(None)
+        self.thread.join()
+
+    def update_keywords(self, actor):
+        """Outputs the ``bmoWriterQueue`` keyword.
+
+        The values are the number of exposures in the queue, the size of the
+        queue, the number of written and dropped exposures, and the last and
+        mean write latencies in milliseconds.
+
+        """
+
+        latencies = list(self.latencies)
+
+        last_latency = latencies[-1] * 1000. if latencies else -999.
+        mean_latency = sum(latencies) / len(latencies) * 1000. if latencies else -999.
+
+        actor.writeToUsers('i', 'bmoWriterQueue={0},{1},{2},{3},{4:.1f},{5:.1f}'.format(
+            self.queue.qsize(), self.queue.maxsize, self.n_written, self.n_dropped,
+            last_latency, mean_latency))